@@ -1,43 +1,187 @@
+import time
+STARTUP_ORIGIN = time.perf_counter()
 import sys
-import json
 import os
+import threading
+
+
+class ImportProfiler:
+    """Meta-path hook recording -X importtime style costs of each module import.
+
+    Only installed with --profile-startup (or ASSISTANT_PROFILE_STARTUP=1),
+    before the rest of the imports below. Records are
+    (module, self_us, cumulative_us, depth), in completion order like
+    -X importtime.
+    """
+    def __init__(self):
+        self.records = []
+        self.local = threading.local()
+
+    def install(self):
+        sys.meta_path.insert(0, self)
+
+    def uninstall(self):
+        if self in sys.meta_path:
+            sys.meta_path.remove(self)
+
+    def find_spec(self, name, path, target=None):
+        if getattr(self.local, "finding", False):
+            return None
+        self.local.finding = True
+        try:
+            for finder in sys.meta_path:
+                if finder is not self and hasattr(finder, "find_spec"):
+                    spec = finder.find_spec(name, path, target)
+                    if spec is not None:
+                        break
+            else:
+                return None
+        finally:
+            self.local.finding = False
+        if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+            spec.loader = TimedLoader(spec.loader, self)
+        return spec
+
+    def exec_module(self, loader, module):
+        stack = self.local.__dict__.setdefault("stack", [])
+        stack.append([time.perf_counter(), 0.0])
+        try:
+            loader.exec_module(module)
+        finally:
+            start, children = stack.pop()
+            cumulative = time.perf_counter() - start
+            if stack:
+                stack[-1][1] += cumulative
+            self.records.append((module.__name__, int((cumulative - children) * 1e6), int(cumulative * 1e6), len(stack)))
+
+
+class TimedLoader:
+    """Wraps a module loader so ImportProfiler can time exec_module."""
+    def __init__(self, loader, profiler):
+        self.loader = loader
+        self.profiler = profiler
+
+    def create_module(self, spec):
+        return self.loader.create_module(spec)
+
+    def exec_module(self, module):
+        # Hand the module its real loader before its code runs
+        module.__loader__ = self.loader
+        if module.__spec__ is not None:
+            module.__spec__.loader = self.loader
+        self.profiler.exec_module(self.loader, module)
+
+    def __getattr__(self, attr):
+        return getattr(self.loader, attr)
+
+
+PROFILE_STARTUP = any(arg.split("=")[0] == "--profile-startup" for arg in sys.argv) or \
+    os.environ.get("ASSISTANT_PROFILE_STARTUP", "") not in ("", "0")
+IMPORT_PROFILER = ImportProfiler() if PROFILE_STARTUP else None
+if IMPORT_PROFILER:
+    IMPORT_PROFILER.install()
+
+import json
+import sqlite3
 import subprocess
 import platform
 import re
-import time
+import math
 import webbrowser
-import requests
-import wikipedia
-import pygame
-import pyautogui
-import psutil
-import pywhatkit
 import pyperclip
 from datetime import datetime as dt
-from urllib.parse import quote
-import smtplib
+from urllib.parse import quote, urlsplit
 from email.mime.text import MIMEText
-from PIL import Image, ImageGrab
-from bs4 import BeautifulSoup
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QVBoxLayout, QHBoxLayout, QPushButton, QTextEdit,
     QLabel, QWidget, QComboBox, QSlider, QComboBox, QFileDialog, QMessageBox,
     QTabWidget, QDockWidget, QToolBar, QToolButton, QMenu, QAction, QStatusBar,
     QInputDialog, QProgressBar, QSplitter, QFileSystemModel, QTreeView, QDialog,
-    QSystemTrayIcon
+    QSystemTrayIcon, QListView, QAbstractItemView
+)
+from PyQt5.QtCore import (
+    QThread, QObject, pyqtSignal, Qt, QTimer, QSize, QJsonDocument, QDir, QAbstractListModel, QModelIndex,
+    QFileSystemWatcher
 )
-from PyQt5.QtCore import QThread, pyqtSignal, Qt, QTimer, QSize, QJsonDocument, QDir
 from PyQt5.QtGui import QIcon, QTextCursor, QPixmap, QFont, QPalette, QColor, QPainter, QPen
-import speech_recognition as sr
-import pyttsx3
 from plyer import notification
-import keyboard
+import importlib
 import importlib.util
-import threading
-import numpy as np
+import collections
+import queue
+import heapq
+import bisect
+import itertools
+import hashlib
+import uuid
+import socket
+import multiprocessing.connection
+import mmap
+import array
+import bz2
+import shutil
+import random
+import unicodedata
+import xml.etree.ElementTree as ET
+
+
+class LazyModule:
+    """Stands in for a module and imports it on first attribute access.
+
+    Heavy or slow-to-import dependencies are bound to these at module level,
+    so they are only loaded when a command actually uses them. Import times
+    are recorded in LAZY_IMPORT_TIMES for the startup report.
+    """
+    def __init__(self, name):
+        self.__dict__.update(_name=name, _module=None, _hooks=[], _lock=threading.RLock())
+
+    def _lazy_load(self):
+        with self._lock:
+            if self._module is None:
+                start = time.perf_counter()
+                module = importlib.import_module(self._name)
+                LAZY_IMPORT_TIMES[self._name] = (time.perf_counter() - start) * 1000
+                self.__dict__["_module"] = module
+                for hook in self._hooks:
+                    hook(module)
+                self._hooks.clear()
+            return self._module
+
+    def __getattr__(self, attr):
+        return getattr(self._lazy_load(), attr)
+
+    def __setattr__(self, attr, value):
+        setattr(self._lazy_load(), attr, value)
+
+
+LAZY_IMPORT_TIMES = {}
+
+
+def on_import(lazy_module, hook):
+    """Run hook(module) once lazy_module is imported (right away if it already is)."""
+    with lazy_module._lock:
+        if lazy_module._module is None:
+            lazy_module._hooks.append(hook)
+            return
+    hook(lazy_module._module)
+
+
+requests = LazyModule("requests")
+wikipedia = LazyModule("wikipedia")
+pygame = LazyModule("pygame")
+pyautogui = LazyModule("pyautogui")
+psutil = LazyModule("psutil")
+pywhatkit = LazyModule("pywhatkit")  # does network work at import time
+smtplib = LazyModule("smtplib")
+ImageGrab = LazyModule("PIL.ImageGrab")
+bs4 = LazyModule("bs4")
+sr = LazyModule("speech_recognition")
+pyttsx3 = LazyModule("pyttsx3")
+keyboard = LazyModule("keyboard")
+np = LazyModule("numpy")
 
 # Suppress Wikipedia parser warning
-wikipedia.wikipedia.GuessedAtParserWarning = lambda *args, **kwargs: None
+on_import(wikipedia, lambda module: setattr(module.wikipedia, "GuessedAtParserWarning", lambda *args, **kwargs: None))
 
 # Windows-specific volume control
 try:
@@ -47,36 +191,4117 @@ try:
 except ImportError:
     volume_control_available = False
 
+# Optional HTTP/2 client (httpx with h2); requests is used otherwise
+httpx_available = importlib.util.find_spec("httpx") is not None
+http2_available = httpx_available and importlib.util.find_spec("h2") is not None
+httpx = LazyModule("httpx")
+
+# Optional audio tag reader; music is indexed by folder and file names otherwise
+mutagen_available = importlib.util.find_spec("mutagen") is not None
+mutagen = LazyModule("mutagen")
+
+# Built-in command routes as (name, trigger keywords, extra pattern). Routes are
+# tried in this order and the first one whose keywords (and pattern, if any)
+# match wins, so the order is the precedence of the commands.
+COMMAND_ROUTES = [
+    ("file", ("file", "folder"),
+     r"^(create|delete|open) (file|folder) (?:named|called)? ?'?([^']+)'? ?(?:in|on)? ?(desktop|documents)?"),
+    ("bookmark", ("bookmark", "bookmarks"),
+     r"^(add|open|list) bookmarks?(?: named)? ?'?([^']*)?'?(?: for)? ?(.*)?"),
+    ("check_bookmarks", ("check bookmarks",), None),
+    ("exit", ("exit", "quit"), r"^(?:exit|quit)$"),
+    ("stop_speaking", ("stop talking", "stop speaking", "be quiet"), None),
+    ("next_track", ("next song", "next track", "skip song", "skip track", "skip this song"), None),
+    ("previous_track", ("previous song", "previous track", "last song"), None),
+    ("shuffle_queue", ("shuffle",), None),
+    ("clear_queue", ("clear queue", "clear the queue"), None),
+    ("show_queue", ("show queue", "show the queue", "music queue", "queue status"), None),
+    ("enqueue_music", ("enqueue", "queue"), r"^(?:(?:enqueue|queue up|queue) (.+)|add (.+?) to (?:the |my )?queue)$"),
+    ("time", ("time",), None),
+    ("date", ("date",), None),
+    ("greeting", ("hello", "hi"), None),
+    ("system_resources", ("system resources", "system info"), None),
+    ("network_stats", ("network stats",), None),
+    ("plugin_stats", ("plugin stats",), None),
+    ("radio_stats", ("radio stats", "radio status"), None),
+    ("screenshot", ("take screenshot",), None),
+    ("file_manager", ("show file manager",), None),
+    ("open_application", ("open application",), None),
+    ("clipboard", ("clipboard",), None),
+    ("reminder", ("set reminder",), None),
+    ("alarm", ("set alarm",), None),
+    ("timer", ("set timer", "set a timer"), None),
+    ("running_tasks", ("running tasks",), None),
+    ("cancel_tasks", ("cancel tasks",), None),
+    ("add_task", ("add task",), None),
+    ("list_tasks", ("list tasks",), None),
+    ("weather", ("weather",), None),
+    ("email", ("send email",), None),
+    ("take_note", ("take note",), None),
+    ("recent_notes", ("read last",), r"\bnotes?\b"),
+    ("more_notes", ("more notes",), None),
+    ("read_notes", ("read notes",), None),
+    ("search_notes", ("search notes", "search my notes"), None),
+    ("schedule_event", ("schedule event",), None),
+    ("build_kb", ("build knowledge base",), None),
+    ("alias", ("set alias",), None),
+    ("battery", ("battery status",), None),
+    ("new_tab", ("open new tab",), None),
+    ("close_tab", ("close tab",), None),
+    ("incognito", ("open incognito",), None),
+    ("scrape", ("scrape website",), None),
+    ("fill_form", ("fill form",), None),
+    ("scan_music", ("scan music", "rescan music"), None),
+    ("play", ("play",), None),
+    ("pause_music", ("pause",), r"\b(?:music|song)\b"),
+    ("stop_music", ("stop",), r"\b(?:music|song|radio)\b"),
+    ("resume_music", ("resume",), r"\b(?:music|song)\b"),
+    ("volume", ("volume",), None),
+    ("search", ("search",), r"\bon\b"),
+    ("open_site", ("open",), r"\b(?:google|youtube)\b"),
+]
+
+COMMAND_TOKEN_RE = re.compile(r"[a-z0-9]+")
+REMINDER_RE = re.compile(
+    r"set reminder (.+) at (\d{2}:\d{2} \d{2}-\d{2}-\d{4})(?: (hourly|daily|weekly|every hour|every day|every week))?"
+)
+ALARM_RE = re.compile(r"set alarm (?:for |at )?(\d{1,2}:\d{2})(?: (daily|weekly|every day|every week))?")
+TIMER_RE = re.compile(r"set (?:a )?timer (?:for )?(\d+) (second|minute|hour)s?")
+WEATHER_CITY_RE = re.compile(r"weather in (\w+)")
+EMAIL_RE = re.compile(r"send email to (\S+) subject (.+) body (.+)")
+EVENT_RE = re.compile(r"schedule event (.+) on (\d{2}-\d{2}-\d{4} \d{2}:\d{2})")
+ALIAS_RE = re.compile(r"set alias (\w+) for (.+)")
+FORM_RE = re.compile(r"fill form on (.+) with (.+)")
+VOLUME_RE = re.compile(r"set volume to (\d+)")
+RECENT_NOTES_RE = re.compile(r"read (?:the |my )?last (\w+) notes?")
+SEARCH_NOTES_RE = re.compile(r"search (?:my )?notes (?:for |about )?(.+)")
+ARGUMENT_PATTERNS = [
+    REMINDER_RE, ALARM_RE, TIMER_RE, WEATHER_CITY_RE, EMAIL_RE, EVENT_RE,
+    ALIAS_RE, FORM_RE, VOLUME_RE, RECENT_NOTES_RE, SEARCH_NOTES_RE,
+]
+NUMBER_WORDS = {
+    "one": 1, "two": 2, "three": 3, "four": 4, "five": 5,
+    "six": 6, "seven": 7, "eight": 8, "nine": 9, "ten": 10,
+}
+# Example phrases offered as "Did you mean" suggestions, beside the route keywords
+COMMAND_SUGGESTIONS = [
+    "time", "date", "weather", "set reminder", "add task", "list tasks",
+    "take screenshot", "open application", "play music", "volume up",
+    "search on google", "open bookmark", "add bookmark", "list bookmarks",
+    "create file", "delete folder", "open file", "take note", "read notes",
+    "send email", "schedule event", "set alias", "battery status"
+]
+# Formats pygame.mixer.music can play
+MUSIC_EXTENSIONS = (".mp3", ".ogg", ".wav", ".flac")
+# Decoded PCM bytes per byte of file, to guess what fits in the play queue's buffer
+DECODED_SIZE_RATIO = {".wav": 1, ".flac": 2, ".ogg": 12, ".mp3": 11}
+# Words in "play song X" that name the request rather than the music
+MUSIC_FILLER_WORDS = frozenset(("a", "an", "the", "by", "from", "song", "songs", "track", "music", "album", "some"))
+SOUNDEX_CODES = {
+    letter: str(code)
+    for code, letters in enumerate(("aeiouy", "bfpv", "cgjkqsxz", "dt", "l", "mn", "r"))
+    for letter in letters
+}
+SOUNDEX_CODES.update({letter: "" for letter in "aeiouy"})
+
+class CommandRouter:
+    """Ordered table of precompiled command routes with a keyword index."""
+    def __init__(self, routes=()):
+        self.routes = []
+        self.keyword_index = {}
+        for name, keywords, pattern in routes:
+            self.add_route(name, keywords, pattern)
+
+    def add_route(self, name, keywords, pattern=None):
+        """Append a route; it is tried after every route added before it."""
+        order = len(self.routes)
+        self.routes.append((name, re.compile(pattern) if pattern else None))
+        for keyword in keywords:
+            words = keyword.split()
+            # Single-word keywords are confirmed by the token lookup itself
+            phrase_re = re.compile(r"\b%s\b" % re.escape(keyword)) if len(words) > 1 else None
+            self.keyword_index.setdefault(words[0], []).append((order, phrase_re))
+
+    def match(self, command):
+        """Return (route name, match) for the first route accepting the command.
+
+        The match is the route pattern's match object, or None for routes
+        selected by keyword alone.
+        """
+        candidates = set()
+        for token in COMMAND_TOKEN_RE.findall(command):
+            for order, phrase_re in self.keyword_index.get(token, ()):
+                if phrase_re is None or phrase_re.search(command):
+                    candidates.add(order)
+        for order in sorted(candidates):
+            name, pattern_re = self.routes[order]
+            if pattern_re is None:
+                return name, None
+            match = pattern_re.search(command)
+            if match:
+                return name, match
+        return None, None
+
+def soundex(word):
+    """American Soundex code of a word ('weather' and 'whether' are both W360)."""
+    word = "".join(c for c in word.lower() if c.isalpha())
+    if not word:
+        return ""
+    code = word[0].upper()
+    last = SOUNDEX_CODES.get(word[0], "")
+    for letter in word[1:]:
+        digit = SOUNDEX_CODES.get(letter)
+        if digit is None:  # h and w don't separate repeated codes
+            continue
+        if digit and digit != last:
+            code += digit
+        last = digit
+    return (code + "000")[:4]
+
+def edit_pattern(word):
+    """Precompute a word's character bitmasks for pattern_distance."""
+    masks = {}
+    for i, letter in enumerate(word):
+        masks[letter] = masks.get(letter, 0) | (1 << i)
+    return masks, len(word)
+
+def pattern_distance(pattern, text):
+    """Levenshtein distance from an edit_pattern to text (Myers' bit-parallel algorithm)."""
+    masks, length = pattern
+    if not length:
+        return len(text)
+    full = (1 << length) - 1
+    last = 1 << (length - 1)
+    vp, vn, distance = full, 0, length
+    for letter in text:
+        eq = masks.get(letter, 0)
+        xv = eq | vn
+        xh = (((eq & vp) + vp) ^ vp) | eq
+        hp = (vn | ~(xh | vp)) & full
+        hn = vp & xh
+        if hp & last:
+            distance += 1
+        elif hn & last:
+            distance -= 1
+        hp = ((hp << 1) | 1) & full
+        hn = (hn << 1) & full
+        vp = (hn | ~(xv | hp)) & full
+        vn = hp & xv
+    return distance
+
+def edit_distance(a, b):
+    """Levenshtein distance between two words."""
+    return pattern_distance(edit_pattern(a), b)
+
+class BKTree:
+    """Burkhard-Keller tree for finding words within an edit distance."""
+    def __init__(self):
+        self.root = None
+        self.size = 0
+
+    def add(self, word):
+        if self.root is None:
+            self.root = (word, {})
+            self.size = 1
+            return
+        node = self.root
+        while True:
+            distance = edit_distance(word, node[0])
+            if distance == 0:
+                return
+            child = node[1].get(distance)
+            if child is None:
+                node[1][distance] = (word, {})
+                self.size += 1
+                return
+            node = child
+
+    def search(self, word, max_distance):
+        """Return (distance, word) for every word within max_distance."""
+        results = []
+        pattern = edit_pattern(word)
+        stack = [self.root] if self.root else []
+        while stack:
+            candidate, children = stack.pop()
+            distance = pattern_distance(pattern, candidate)
+            if distance <= max_distance:
+                results.append((distance, candidate))
+            for edge, child in children.items():
+                if distance - max_distance <= edge <= distance + max_distance:
+                    stack.append(child)
+        return results
+
+class FuzzyCommandIndex:
+    """Near-miss matcher for commands the router didn't recognise.
+
+    Every command phrase, plugin trigger and alias is indexed once (and
+    added to as aliases and plugins appear). match() corrects misheard
+    words against the command vocabulary with a BK-tree, preferring
+    corrections that sound the same, until resolve(command) accepts the
+    result. suggest() ranks whole phrases by trigram similarity.
+    """
+    def __init__(self, resolve, position_decay=0.8, max_fixes=2):
+        self.resolve = resolve
+        self.position_decay = position_decay
+        self.max_fixes = max_fixes
+        self.phrases = {}  # phrase -> (kind, trigrams)
+        self.trigram_index = {}
+        self.words = set()
+        self.tree = BKTree()
+        self.sounds = {}  # soundex code -> words
+        self.corrections = {}
+
+    @staticmethod
+    def trigrams(text):
+        text = f"  {text} "
+        return {text[i:i + 3] for i in range(len(text) - 2)}
+
+    def add_words(self, words):
+        """Add words to the vocabulary without a phrase (e.g. pattern keywords)."""
+        for word in words:
+            if word not in self.words:
+                self.words.add(word)
+                self.tree.add(word)
+                self.sounds.setdefault(soundex(word), set()).add(word)
+                self.corrections.clear()
+
+    def add(self, phrase, kind):
+        """Index a phrase; kind says where it came from (route, plugin, alias)."""
+        phrase = " ".join(phrase.lower().split())
+        if not phrase:
+            return
+        if phrase in self.phrases:
+            self.phrases[phrase] = (kind, self.phrases[phrase][1])
+            return
+        grams = self.trigrams(phrase)
+        self.phrases[phrase] = (kind, grams)
+        for gram in grams:
+            self.trigram_index.setdefault(gram, set()).add(phrase)
+        self.add_words(word for word in phrase.split() if word.isalpha())
+
+    def remove(self, phrase):
+        """Stop suggesting a phrase (its words stay in the vocabulary)."""
+        phrase = " ".join(phrase.lower().split())
+        entry = self.phrases.pop(phrase, None)
+        if entry:
+            for gram in entry[1]:
+                self.trigram_index[gram].discard(phrase)
+
+    def correct_word(self, word, limit=3):
+        """Return up to limit (vocabulary word, cost) guesses for a misheard word, cheapest first."""
+        if word in self.corrections:
+            return self.corrections[word]
+        max_distance = 1 if len(word) <= 5 else 2
+        code = soundex(word)
+        candidates = {candidate: distance for distance, candidate in self.tree.search(word, max_distance)}
+        for candidate in self.sounds.get(code, ()):
+            if candidate not in candidates:
+                distance = edit_distance(word, candidate)
+                if distance <= max_distance + 1:
+                    candidates[candidate] = distance
+        guesses = []
+        for candidate, distance in candidates.items():
+            same_sound = soundex(candidate) == code
+            if distance == 0 or (len(word) < 4 and not same_sound):
+                continue
+            guesses.append((distance - (0.5 if same_sound else 0.0), candidate))
+        guesses = [(candidate, cost) for cost, candidate in sorted(guesses)[:limit]]
+        self.corrections[word] = guesses
+        return guesses
+
+    def match(self, command):
+        """Return (corrected command, score 0-1) or (None, 0.0).
+
+        Words are corrected left to right and the first corrected command
+        that resolves wins, so arguments after the command word are left
+        alone. The score falls with the edits made and with how far into
+        the sentence the first one was.
+        """
+        tokens = command.split()
+        corrected = list(tokens)
+        cost, length, fixes, first = 0.0, 0, 0, None
+        for i, token in enumerate(tokens):
+            if len(token) < 3 or not token.isalpha() or token in self.words:
+                continue
+            guesses = self.correct_word(token)
+            if not guesses:
+                continue
+            first = i if first is None else first
+            fixes += 1
+            for word, word_cost in guesses:
+                corrected[i] = word
+                candidate = " ".join(corrected)
+                if self.resolve(candidate):
+                    score = 1 - (cost + word_cost) / (length + len(word))
+                    return candidate, score * self.position_decay ** first
+            # Keep the likeliest guess and see if a later word completes the command
+            word, word_cost = guesses[0]
+            corrected[i] = word
+            cost += word_cost
+            length += len(word)
+            if fixes >= self.max_fixes:
+                break
+        return None, 0.0
+
+    def suggest(self, command, limit=3):
+        """Return up to limit (phrase, score) pairs, best first.
+
+        A phrase is scored by the Dice similarity of its trigrams to the
+        best window of the same number of words in the command, decayed
+        by the window's position like match().
+        """
+        words = command.split()
+        grams = self.trigrams(" ".join(words))
+        shared = collections.Counter()
+        for gram in grams:
+            for phrase in self.trigram_index.get(gram, ()):
+                shared[phrase] += 1
+        windows = {}
+        scored = []
+        for phrase, count in shared.items():
+            phrase_grams = self.phrases[phrase][1]
+            if count < 0.3 * len(phrase_grams):
+                continue
+            size = len(phrase.split())
+            best = 0.0
+            for start in range(max(1, len(words) - size + 1)):
+                key = (start, size)
+                if key not in windows:
+                    windows[key] = self.trigrams(" ".join(words[start:start + size]))
+                window = windows[key]
+                dice = 2 * len(phrase_grams & window) / (len(phrase_grams) + len(window))
+                best = max(best, dice * self.position_decay ** start)
+            scored.append((best, phrase))
+        scored.sort(reverse=True)
+        return [(phrase, score) for score, phrase in scored[:limit]]
+
+    def stats(self):
+        return {"phrases": len(self.phrases), "words": len(self.words), "tree": self.tree.size}
+
+class CommandHistory:
+    """Deduplicated, unbounded command history with ranked prefix completion.
+
+    Every command is stored once with a use count and a frecency rank, the
+    log2 of its exponentially decayed use count expressed relative to the
+    epoch (so ranks compare without rescoring as time passes). A character
+    trie holds each command under its whole text and under every word
+    start, and each node keeps its top few commands, so a completion is a
+    walk of len(prefix) nodes. Nodes stop at max_depth characters and keep
+    all their commands in rank order; longer prefixes scan those until
+    enough match. Uses are appended to a JSONL file that is compacted when
+    it grows to twice the number of commands.
+    """
+    def __init__(self, path, half_life=7 * 24 * 3600, top=10, max_depth=10):
+        self.path = path
+        self.half_life = half_life
+        self.top = top
+        self.max_depth = max_depth
+        self.entries = {}  # key -> [command, count, last used, rank], least recent first
+        self.root = self.new_node()
+        self.lines = 0
+
+    @staticmethod
+    def new_node():
+        return [{}, [], None]  # children, [(rank, key)] best first, keys best first (at max depth)
+
+    @staticmethod
+    def normalize(command):
+        return " ".join(command.lower().split())
+
+    def __len__(self):
+        return len(self.entries)
+
+    def load(self):
+        """Replay the history file and build the index; returns the number of commands."""
+        if not os.path.exists(self.path):
+            return 0
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                self.lines += 1
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if "rank" in record:
+                    key = self.normalize(record["command"])
+                    if key:
+                        self.entries.pop(key, None)
+                        self.entries[key] = [record["command"], record["count"], record["time"], record["rank"]]
+                else:
+                    self.use(record["command"], record["time"], index=False)
+        self.rebuild()
+        return len(self.entries)
+
+    def rebuild(self):
+        """Index every command, best ranked first so full top lists turn the rest away early."""
+        self.root = self.new_node()
+        for key, entry in sorted(self.entries.items(), key=lambda item: -item[1][3]):
+            self.index(key, entry[3], ordered=True)
+
+    def add(self, command, when=None):
+        """Record a use of command and append it to the history file."""
+        when = when or time.time()
+        if not self.use(command, when):
+            return
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps({"command": command, "time": round(when, 3)}) + "\n")
+            self.lines += 1
+            if self.lines > 2 * len(self.entries) + 100:
+                self.compact()
+        except OSError:
+            pass
+
+    def use(self, command, when, index=True):
+        key = self.normalize(command)
+        if not key:
+            return False
+        # Re-inserting keeps the dict in least to most recently used order
+        entry = self.entries.pop(key, None)
+        now = when / self.half_life
+        if entry is None:
+            entry = [command.strip(), 0, when, now]
+        else:
+            entry[3] = now + math.log2(2 ** (entry[3] - now) + 1)
+            entry[0] = command.strip()
+        self.entries[key] = entry
+        entry[1] += 1
+        entry[2] = max(entry[2], when)
+        if index:
+            self.index(key, entry[3])
+        return True
+
+    def starts(self, key):
+        """Offsets of the whole key and of every later word start."""
+        yield 0
+        offset = key.find(" ")
+        while offset != -1:
+            yield offset + 1
+            offset = key.find(" ", offset + 1)
+
+    def index(self, key, rank, ordered=False):
+        """Insert key (or raise its rank) along every word-start path.
+
+        ordered means keys arrive best ranked first, as in rebuild().
+        """
+        top = self.top
+        for start in self.starts(key):
+            node = self.root
+            for letter in key[start:start + self.max_depth]:
+                children = node[0]
+                node = children.get(letter)
+                if node is None:
+                    node = children[letter] = self.new_node()
+                best = node[1]
+                if len(best) < top or rank > best[-1][0]:
+                    if not ordered:
+                        self.offer(node, key, rank)
+                    elif (rank, key) not in best:
+                        best.append((rank, key))
+            if len(key) - start >= self.max_depth:
+                self.file_at_depth(node, key, rank, ordered)
+
+    def file_at_depth(self, node, key, rank, ordered):
+        keys = node[2]
+        if keys is None:
+            node[2] = [key]
+        elif ordered:
+            if keys[-1] != key:
+                keys.append(key)
+        else:
+            if key in keys:
+                keys.remove(key)
+            position = 0
+            while position < len(keys) and self.entries[keys[position]][3] >= rank:
+                position += 1
+            keys.insert(position, key)
+
+    def offer(self, node, key, rank):
+        """Move key up (or into) a node's top list; ranks only grow."""
+        best = node[1]
+        for i, (_, other) in enumerate(best):
+            if other == key:
+                del best[i]
+                break
+        position = len(best)
+        while position and best[position - 1][0] < rank:
+            position -= 1
+        best.insert(position, (rank, key))
+        del best[self.top:]
+
+    def complete(self, prefix, limit=10):
+        """Commands with a word starting with prefix, best ranked first."""
+        prefix = self.normalize(prefix)
+        if not prefix:
+            return self.recent(limit)
+        node = self.root
+        for letter in prefix[:self.max_depth]:
+            node = node[0].get(letter)
+            if node is None:
+                return []
+        if len(prefix) <= self.max_depth:
+            keys = [key for _, key in node[1][:limit]]
+        else:
+            keys = []
+            for key in node[2] or ():
+                if (key.startswith(prefix) or f" {prefix}" in f" {key}") and key not in keys:
+                    keys.append(key)
+                    if len(keys) == limit:
+                        break
+        return [self.entries[key][0] for key in keys]
+
+    def recent(self, limit=20):
+        """Most recently used commands, newest first."""
+        return [entry[0] for entry in itertools.islice(reversed(self.entries.values()), limit)]
+
+    def compact(self):
+        """Rewrite the history file with one line per command."""
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            for command, count, when, rank in self.entries.values():
+                f.write(json.dumps({"command": command, "count": count, "time": when, "rank": rank}) + "\n")
+        os.replace(temp_path, self.path)
+        self.lines = len(self.entries)
+
+class TriggerTrie:
+    """Word-level prefix trie of trigger phrases; the longest matching trigger wins."""
+    def __init__(self):
+        self.root = {}
+        self.size = 0
+
+    def add(self, phrase, value):
+        node = self.root
+        for word in phrase.lower().split():
+            node = node.setdefault(word, {})
+        if None not in node:
+            self.size += 1
+        node[None] = value
+
+    def match(self, command):
+        """Return (value, rest of the command) for the longest trigger starting the command."""
+        words = command.split()
+        node, best = self.root, None
+        for i, word in enumerate(words):
+            node = node.get(word)
+            if node is None:
+                break
+            if None in node:
+                best = (node[None], i + 1)
+        if best is None:
+            return None, None
+        return best[0], " ".join(words[best[1]:])
+
+class PluginRegistry:
+    """Plugins in a directory, described by manifests and imported on first use.
+
+    A plugin is plugins/<name>.py with register_plugin(assistant) returning
+    {"execute": callable, "handles_unknown": bool}. An optional manifest,
+    plugins/<name>.json, declares what it answers to without importing it:
+
+        {"triggers": ["lights on", "lights off"], "handles_unknown": false}
+
+    Plugins without a manifest trigger on their file name and are imported
+    at startup as before. Manifests are cached by mtime in cache_path so a
+    scan only opens files that changed, and a changed .py is re-imported
+    the next time its plugin is used.
+    """
+    def __init__(self, directory, cache_path):
+        self.directory = directory
+        self.cache_path = cache_path
+        self.manifests = {}  # name -> manifest (None for plugins without one)
+        self.manifest_mtimes = {}
+        self.loaded = {}  # name -> registration returned by register_plugin
+        self.modules = {}  # name -> (module, mtime of the .py it came from)
+        self.trie = TriggerTrie()
+        self.errors = []
+        self.directory_mtime = None
+        self.stats = {}  # name -> calls, errors, timeouts, wall and CPU seconds, recent latencies
+
+    def path(self, name, extension=".py"):
+        return os.path.join(self.directory, name + extension)
+
+    def scan(self):
+        """Read the plugin directory; returns the names of plugins without a manifest."""
+        self.errors = []
+        try:
+            self.directory_mtime = os.stat(self.directory).st_mtime
+            with os.scandir(self.directory) as entries:
+                files = {entry.name: entry for entry in entries if entry.is_file()}
+        except OSError:
+            files = {}
+        cache = {}
+        if os.path.exists(self.cache_path):
+            try:
+                with open(self.cache_path, "r") as f:
+                    cache = json.load(f)
+            except (OSError, ValueError):
+                cache = {}
+        manifests, mtimes, legacy = {}, {}, []
+        for filename in sorted(files):
+            if not filename.endswith(".py"):
+                continue
+            name = filename[:-3]
+            entry = files.get(name + ".json")
+            if entry is None:
+                manifests[name] = None
+                legacy.append(name)
+                continue
+            mtime = entry.stat().st_mtime
+            cached = cache.get(name)
+            if cached and cached["mtime"] == mtime:
+                manifests[name] = cached["manifest"]
+            else:
+                try:
+                    with open(entry.path, "r") as f:
+                        manifests[name] = json.load(f)
+                except (OSError, ValueError) as e:
+                    self.errors.append((name, f"bad manifest: {str(e)}"))
+                    continue
+            mtimes[name] = mtime
+        for name in set(self.loaded) - set(manifests):
+            self.unload(name)
+        self.manifests, self.manifest_mtimes = manifests, mtimes
+        self.build_trie()
+        if cache != {name: {"mtime": mtimes[name], "manifest": manifests[name]} for name in mtimes}:
+            self.save_cache()
+        return legacy
+
+    def save_cache(self):
+        try:
+            os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+            temp_path = self.cache_path + ".tmp"
+            with open(temp_path, "w") as f:
+                json.dump({name: {"mtime": mtime, "manifest": self.manifests[name]}
+                           for name, mtime in self.manifest_mtimes.items()}, f)
+            os.replace(temp_path, self.cache_path)
+        except OSError as e:
+            self.errors.append(("cache", str(e)))
+
+    def build_trie(self):
+        self.trie = TriggerTrie()
+        for name, manifest in self.manifests.items():
+            for trigger in self.triggers(name):
+                self.trie.add(trigger, name)
+
+    def triggers(self, name):
+        manifest = self.manifests.get(name)
+        return manifest.get("triggers", [name]) if manifest else [name]
+
+    def changed(self):
+        """Whether plugin files were added, removed or renamed since the last scan."""
+        try:
+            return os.stat(self.directory).st_mtime != self.directory_mtime
+        except OSError:
+            return self.directory_mtime is not None
+
+    def match(self, command):
+        """Return (plugin name, rest of the command) or (None, None)."""
+        return self.trie.match(command)
+
+    def unknown_handlers(self):
+        """Plugins that want commands nothing else understood."""
+        names = []
+        for name, manifest in self.manifests.items():
+            if manifest is None:
+                if self.loaded.get(name, {}).get("handles_unknown", False):
+                    names.append(name)
+            elif manifest.get("handles_unknown", False):
+                names.append(name)
+        return names
+
+    def isolated(self, name, default=False):
+        """Whether a plugin runs in a worker process ("isolated" in its manifest)."""
+        manifest = self.manifests.get(name)
+        return bool(manifest.get("isolated", default)) if manifest else False
+
+    def timeout(self, name, default):
+        manifest = self.manifests.get(name)
+        return manifest.get("timeout", default) if manifest else default
+
+    def record(self, name, wall, cpu=None, error=None, timed_out=False):
+        """Account one call of a plugin (times in seconds)."""
+        stats = self.stats.get(name)
+        if stats is None:
+            stats = self.stats[name] = {
+                "calls": 0, "errors": 0, "timeouts": 0, "wall": 0.0, "cpu": 0.0,
+                "latencies": collections.deque(maxlen=200),
+            }
+        stats["calls"] += 1
+        stats["errors"] += 1 if error else 0
+        stats["timeouts"] += 1 if timed_out else 0
+        stats["wall"] += wall
+        stats["cpu"] += cpu or 0.0
+        stats["latencies"].append(wall)
+
+    def stale(self, name):
+        """Whether the plugin still needs importing, or its file changed since it was."""
+        if name not in self.modules:
+            return True
+        try:
+            return os.stat(self.path(name)).st_mtime != self.modules[name][1]
+        except OSError:
+            return False
+
+    def load(self, name, assistant):
+        """Import (or re-import) a plugin and register it with the assistant."""
+        path = self.path(name)
+        mtime = os.stat(path).st_mtime
+        self.unload(name)
+        spec = importlib.util.spec_from_file_location(name, path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        self.modules[name] = (module, mtime)
+        if hasattr(module, "register_plugin"):
+            self.loaded[name] = module.register_plugin(assistant)
+        return self.loaded.get(name)
+
+    def unload(self, name):
+        plugin = self.loaded.pop(name, None)
+        self.modules.pop(name, None)
+        if plugin and callable(plugin.get("unload")):
+            plugin["unload"]()
+
+class PluginHost:
+    """What an isolated plugin sees as the assistant: speak, log and notify are sent to the app."""
+    def __init__(self, connection):
+        self.connection = connection
+        self.call_id = None
+
+    def speak(self, text, *args, **kwargs):
+        self.connection.send(("speak", self.call_id, str(text)))
+
+    def append_to_log(self, text, speaker="System"):
+        self.connection.send(("log", self.call_id, str(text), speaker))
+
+    def notify(self, title, message):
+        self.connection.send(("notify", self.call_id, str(title), str(message)))
+
+    def __getattr__(self, attr):
+        raise AttributeError(f"'{attr}' is not available to isolated plugins (use speak, append_to_log or notify)")
+
+def set_no_delay(connection):
+    """Turn off Nagle's algorithm on a socket Connection; messages are small, so don't wait on delayed ACKs."""
+    sock = socket.fromfd(connection.fileno(), socket.AF_INET, socket.SOCK_STREAM)
+    try:
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    finally:
+        sock.close()  # a duplicate of the descriptor; the connection keeps its own
+
+def plugin_worker_main():
+    """Entry point of a plugin worker process (started with --plugin-worker).
+
+    Connects back to the pool, then runs ("call", id, name, path, argument)
+    requests one at a time, importing each plugin once (again if its file
+    changes), and answers ("done", id, error, cpu seconds, rss bytes).
+    """
+    port, key = os.environ["ASSISTANT_PLUGIN_WORKER"].split(":")
+    connection = multiprocessing.connection.Client(("127.0.0.1", int(port)), authkey=bytes.fromhex(key))
+    set_no_delay(connection)
+    host = PluginHost(connection)
+    plugins = {}  # name -> (mtime, registration)
+    while True:
+        try:
+            message = connection.recv()
+        except EOFError:
+            return
+        if message[0] == "stop":
+            return
+        _, call_id, name, path, argument = message
+        host.call_id = call_id
+        cpu_start = time.process_time()
+        error = None
+        try:
+            mtime = os.stat(path).st_mtime
+            if name not in plugins or plugins[name][0] != mtime:
+                spec = importlib.util.spec_from_file_location(name, path)
+                module = importlib.util.module_from_spec(spec)
+                spec.loader.exec_module(module)
+                plugins[name] = (mtime, module.register_plugin(host))
+            plugins[name][1]["execute"](argument)
+        except Exception as e:
+            error = f"{type(e).__name__}: {str(e)}"
+        try:
+            rss = psutil.Process().memory_info().rss
+        except Exception:
+            rss = 0
+        connection.send(("done", call_id, error, time.process_time() - cpu_start, rss))
+
+class PluginWorker:
+    """One worker process and the connection to it."""
+    def __init__(self, process, connection):
+        self.process = process
+        self.connection = connection
+        self.calls = 0
+        self.rss = 0
+        self.started = time.time()
+
+class PluginProcessPool:
+    """Worker processes running isolated plugins, so a stuck or crashing plugin can't take the app down.
+
+    Workers are this script started with --plugin-worker; they connect back
+    to a localhost multiprocessing Listener and both sides authenticate with
+    a per-pool authkey.
+    Each call has a deadline after which the worker is killed. Workers are
+    replaced after max_calls calls or once they grow past max_rss_mb.
+    """
+    def __init__(self, script, size=2, max_calls=200, max_rss_mb=300, spawn_timeout=30.0):
+        self.script = script
+        self.size = size
+        self.max_calls = max_calls
+        self.max_rss = max_rss_mb * 1024 * 1024
+        self.spawn_timeout = spawn_timeout
+        self.authkey = os.urandom(16)
+        self.workers = []
+        self.idle = []
+        self.condition = threading.Condition()
+        self.spawn_lock = threading.Lock()
+        self.call_ids = itertools.count(1)
+        self.spawned = self.recycled = self.killed = 0
+        self.closed = False
+
+    def spawn(self):
+        """Start a worker and wait for it to connect (one at a time, so connections can't be mixed up)."""
+        with self.spawn_lock, multiprocessing.connection.Listener(("127.0.0.1", 0), authkey=self.authkey) as listener:
+            port = listener.address[1]
+            env = dict(os.environ, ASSISTANT_PLUGIN_WORKER=f"{port}:{self.authkey.hex()}")
+            process = subprocess.Popen(
+                [sys.executable, self.script, "--plugin-worker"], env=env, stdin=subprocess.DEVNULL,
+                creationflags=getattr(subprocess, "CREATE_NO_WINDOW", 0)
+            )
+            timed_out = threading.Event()
+
+            def give_up():
+                timed_out.set()
+                process.kill()
+                # Listener.accept() has no timeout; a bare connection makes it return (and fail authentication)
+                try:
+                    socket.create_connection(listener.address, timeout=1).close()
+                except OSError:
+                    pass
+
+            timer = threading.Timer(self.spawn_timeout, give_up)
+            timer.start()
+            try:
+                connection = listener.accept()
+            except (multiprocessing.AuthenticationError, EOFError, OSError) as e:
+                process.kill()
+                if timed_out.is_set():
+                    raise RuntimeError("plugin worker did not start")
+                raise RuntimeError(f"plugin worker failed to connect: {str(e)}")
+            finally:
+                timer.cancel()
+            if timed_out.is_set():
+                connection.close()
+                raise RuntimeError("plugin worker did not start")
+            set_no_delay(connection)
+            self.spawned += 1
+            return PluginWorker(process, connection)
+
+    def checkout(self):
+        with self.condition:
+            while not self.idle and len(self.workers) >= self.size:
+                self.condition.wait()
+            if self.idle:
+                return self.idle.pop()
+            self.workers.append(None)  # reserve the slot while starting
+        try:
+            worker = self.spawn()
+        except Exception:
+            with self.condition:
+                self.workers.remove(None)
+                self.condition.notify()
+            raise
+        with self.condition:
+            self.workers[self.workers.index(None)] = worker
+        return worker
+
+    def checkin(self, worker):
+        with self.condition:
+            if self.closed:
+                self.retire(worker)
+                return
+            self.idle.append(worker)
+            self.condition.notify()
+
+    def retire(self, worker, kill=False):
+        """Stop a worker (politely unless kill) and free its slot."""
+        if kill:
+            worker.process.kill()
+            self.killed += 1
+        else:
+            try:
+                worker.connection.send(("stop",))
+            except OSError:
+                pass
+        worker.connection.close()
+        try:
+            worker.process.wait(timeout=2)
+        except subprocess.TimeoutExpired:
+            worker.process.kill()
+        with self.condition:
+            if worker in self.workers:
+                self.workers.remove(worker)
+            if worker in self.idle:
+                self.idle.remove(worker)
+            self.condition.notify()
+
+    def warm(self):
+        """Start a worker ahead of the first call if none is idle."""
+        if not self.idle and len(self.workers) < self.size:
+            self.checkin(self.checkout())
+
+    def call(self, name, path, argument, timeout, on_message, should_stop=None):
+        """Run a plugin's execute(argument) in a worker.
+
+        on_message(kind, *args) receives the plugin's speak/log/notify
+        messages on the calling thread. Returns a dict with the wall and CPU
+        seconds, an error message (or None) and whether it timed out.
+        """
+        worker = self.checkout()
+        call_id = next(self.call_ids)
+        start = time.perf_counter()
+        end = None
+        outcome = {"wall": 0.0, "cpu": None, "error": None, "timed_out": False}
+        try:
+            worker.connection.send(("call", call_id, name, path, argument))
+            deadline = start + timeout
+            while True:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0 or (should_stop and should_stop()):
+                    self.retire(worker, kill=True)
+                    outcome["timed_out"] = remaining <= 0
+                    outcome["error"] = f"timed out after {timeout:g} s" if remaining <= 0 else "cancelled"
+                    break
+                if not worker.connection.poll(min(remaining, 0.1)):
+                    if worker.process.poll() is not None:
+                        raise EOFError
+                    continue
+                message = worker.connection.recv()
+                if message[0] != "done":
+                    on_message(message[0], *message[2:])
+                    continue
+                end = time.perf_counter()
+                _, _, outcome["error"], outcome["cpu"], worker.rss = message
+                worker.calls += 1
+                if worker.calls >= self.max_calls or (worker.rss and worker.rss > self.max_rss):
+                    self.recycled += 1
+                    self.retire(worker)
+                else:
+                    self.checkin(worker)
+                break
+        except (EOFError, OSError):
+            try:
+                code = worker.process.wait(timeout=1)
+            except subprocess.TimeoutExpired:
+                code = None
+            self.retire(worker, kill=code is None)
+            outcome["error"] = f"worker crashed (exit code {code})"
+        outcome["wall"] = (end or time.perf_counter()) - start
+        return outcome
+
+    def stats(self):
+        with self.condition:
+            workers = [worker for worker in self.workers if worker]
+            return {
+                "workers": [(worker.process.pid, worker.calls, worker.rss) for worker in workers],
+                "idle": len(self.idle), "spawned": self.spawned, "recycled": self.recycled, "killed": self.killed,
+            }
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            workers = [worker for worker in self.workers if worker]
+        for worker in workers:
+            self.retire(worker)
+
+class MusicLibrary:
+    """Index of local music files and their artist, album and title tags.
+
+    Tracks live in SQLite with an FTS5 index over the tags (LIKE queries
+    where SQLite lacks FTS5). scan() walks the music folders and only reads
+    tags of files whose size or modification time changed; update() does
+    the same for the directories a file system watcher reported. Tags come
+    from mutagen when it is installed and from the Artist/Album/NN Title
+    folder layout or 'Artist - Title' file names otherwise.
+
+    find() corrects misheard words against the tag vocabulary. Candidates
+    come from a deletion index (every word with one letter dropped), which
+    stays at microseconds per word where a BK-tree search grows with the
+    vocabulary, plus words that sound the same.
+    """
+    def __init__(self, path, roots):
+        self.path = path
+        self.roots = [os.path.abspath(os.path.expanduser(root)) for root in roots]
+        self.lock = threading.Lock()
+        self.connection = self.connect()
+        self.directories = set()
+        self.words = set()
+        self.deletes = {}  # word with one letter dropped (or whole) -> words
+        self.sounds = {}  # soundex code -> words
+        self.corrections = {}
+        try:
+            with self.connection:
+                self.connection.execute(
+                    "CREATE VIRTUAL TABLE IF NOT EXISTS tracks_fts USING fts5("
+                    "artist, album, title, content='tracks', content_rowid='id', tokenize='unicode61 remove_diacritics 2')"
+                )
+                self.connection.execute(
+                    "CREATE TRIGGER IF NOT EXISTS tracks_ai AFTER INSERT ON tracks BEGIN "
+                    "INSERT INTO tracks_fts(rowid, artist, album, title) VALUES (new.id, new.artist, new.album, new.title); END"
+                )
+                self.connection.execute(
+                    "CREATE TRIGGER IF NOT EXISTS tracks_ad AFTER DELETE ON tracks BEGIN "
+                    "INSERT INTO tracks_fts(tracks_fts, rowid, artist, album, title) "
+                    "VALUES ('delete', old.id, old.artist, old.album, old.title); END"
+                )
+                self.connection.execute(
+                    "CREATE TRIGGER IF NOT EXISTS tracks_au AFTER UPDATE ON tracks BEGIN "
+                    "INSERT INTO tracks_fts(tracks_fts, rowid, artist, album, title) "
+                    "VALUES ('delete', old.id, old.artist, old.album, old.title); "
+                    "INSERT INTO tracks_fts(rowid, artist, album, title) VALUES (new.id, new.artist, new.album, new.title); END"
+                )
+                self.connection.execute("CREATE VIRTUAL TABLE IF NOT EXISTS tracks_vocab USING fts5vocab(tracks_fts, 'row')")
+            self.fts = True
+        except sqlite3.OperationalError:
+            self.fts = False
+        self.load_vocabulary()
+
+    def connect(self):
+        """Open a connection; scans use their own so lookups aren't blocked while they write."""
+        connection = sqlite3.connect(self.path, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        with connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS tracks (id INTEGER PRIMARY KEY, path TEXT NOT NULL UNIQUE, "
+                "directory TEXT NOT NULL, mtime REAL, size INTEGER, artist TEXT, album TEXT, title TEXT)"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS tracks_directory ON tracks(directory)")
+        return connection
+
+    def __len__(self):
+        with self.lock:
+            return self.connection.execute("SELECT COUNT(*) FROM tracks").fetchone()[0]
+
+    @staticmethod
+    def tokens(text):
+        """Lowercase words of text with accents dropped, as the FTS tokenizer sees them."""
+        text = unicodedata.normalize("NFKD", text.lower())
+        return re.findall(r"[^\W_]+", "".join(c for c in text if not unicodedata.combining(c)))
+
+    def load_vocabulary(self):
+        with self.lock:
+            if self.fts:
+                words = [row[0] for row in self.connection.execute("SELECT term FROM tracks_vocab")]
+            else:
+                words = set()
+                for row in self.connection.execute("SELECT artist, album, title FROM tracks"):
+                    words.update(self.tokens(" ".join(row)))
+        self.add_words(words)
+
+    def add_words(self, words):
+        for word in words:
+            if word in self.words or word.isdigit():
+                continue
+            self.words.add(word)
+            self.deletes.setdefault(word, set()).add(word)
+            for i in range(len(word)):
+                self.deletes.setdefault(word[:i] + word[i + 1:], set()).add(word)
+            self.sounds.setdefault(soundex(word), set()).add(word)
+        self.corrections.clear()
+
+    def correct_word(self, word, limit=3):
+        """Return up to limit (tag word, cost) guesses for a word not in the library, cheapest first."""
+        if word in self.corrections:
+            return self.corrections[word]
+        max_distance = 1 if len(word) <= 5 else 2
+        code = soundex(word)
+        candidates = set(self.deletes.get(word, ()))
+        for i in range(len(word)):
+            candidates.update(self.deletes.get(word[:i] + word[i + 1:], ()))
+        candidates.update(self.sounds.get(code, ()))
+        pattern = edit_pattern(word)
+        guesses = []
+        for candidate in candidates:
+            distance = pattern_distance(pattern, candidate)
+            same_sound = soundex(candidate) == code
+            if distance == 0 or distance > max_distance + same_sound or (len(word) < 4 and not same_sound):
+                continue
+            guesses.append((distance - (0.5 if same_sound else 0.0), candidate))
+        guesses = [(candidate, cost) for cost, candidate in sorted(guesses)[:limit]]
+        self.corrections[word] = guesses
+        return guesses
+
+    def search(self, words, limit=5):
+        """Return (path, artist, album, title) of tracks whose tags contain every word, best first."""
+        with self.lock:
+            if self.fts:
+                return self.connection.execute(
+                    "SELECT tracks.path, tracks.artist, tracks.album, tracks.title FROM tracks_fts "
+                    "JOIN tracks ON tracks.id = tracks_fts.rowid WHERE tracks_fts MATCH ? "
+                    "ORDER BY bm25(tracks_fts, 2.0, 1.0, 3.0) LIMIT ?",
+                    (" ".join(f'"{word}"' for word in words), limit)
+                ).fetchall()
+            clauses = " AND ".join("(artist || ' ' || album || ' ' || title) LIKE ?" for _ in words)
+            return self.connection.execute(
+                f"SELECT path, artist, album, title FROM tracks WHERE {clauses} ORDER BY title LIMIT ?",
+                [f"%{word}%" for word in words] + [limit]
+            ).fetchall()
+
+    def find(self, query, limit=5, max_tries=8):
+        """Return (tracks, score 0-1) for a spoken query, or ([], 0.0).
+
+        Words that aren't in any tag are replaced by their likeliest
+        corrections, cheapest combination first. If no combination matches,
+        each word is dropped in turn; the score falls with the corrections
+        made and the words dropped.
+        """
+        words = [word for word in self.tokens(query) if word not in MUSIC_FILLER_WORDS] or self.tokens(query)
+        if not words:
+            return [], 0.0
+        options = []
+        for word in words:
+            if word in self.words or word.isdigit():
+                options.append([(word, 0.0)])
+            else:
+                options.append(self.correct_word(word) or [(word, 0.0)])
+        length = sum(len(word) for word in words)
+        # Words that are in no tag and have no correction are dropped first
+        order = sorted(range(len(words)), key=lambda i: words[i] in self.words or options[i][0][1] > 0)
+        for dropped in [None] + (order if len(words) > 1 else []):
+            choices = [option for i, option in enumerate(options) if i != dropped]
+            combinations = sorted(itertools.islice(itertools.product(*choices), 64), key=lambda combo: sum(c for _, c in combo))
+            for combination in combinations[:max_tries]:
+                tracks = self.search([word for word, _ in combination], limit)
+                if tracks:
+                    cost = sum(c for _, c in combination) + (len(words[dropped]) if dropped is not None else 0)
+                    return tracks, max(0.0, 1 - cost / length)
+        return [], 0.0
+
+    def root_of(self, path):
+        for root in self.roots:
+            if path == root or path.startswith(root + os.sep):
+                return root
+        return None
+
+    def tags(self, path, root):
+        """Return (artist, album, title) from the file's tags, falling back to its path."""
+        artist = album = title = ""
+        if mutagen_available:
+            try:
+                audio = mutagen.File(path, easy=True)
+                if audio is not None and audio.tags:
+                    artist, album, title = ((audio.tags.get(key) or [""])[0] for key in ("artist", "album", "title"))
+            except Exception:
+                pass
+        parts = os.path.relpath(path, root).split(os.sep)
+        name = re.sub(r"^\d+[\s.\-_]*", "", os.path.splitext(parts[-1])[0]) or parts[-1]
+        if " - " in name:
+            name_artist, name = name.split(" - ", 1)
+            artist = artist or name_artist
+        if len(parts) >= 3:
+            artist = artist or parts[-3]
+        if len(parts) >= 2:
+            album = album or parts[-2]
+        return artist.strip(), album.strip(), (title or name).strip()
+
+    def walk(self, top, recursive=True):
+        """Yield (directory, {path: (mtime, size)}) for top and, if recursive, its subdirectories."""
+        stack = [top]
+        while stack:
+            directory = stack.pop()
+            files = {}
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        try:
+                            if entry.is_dir(follow_symlinks=False):
+                                if recursive:
+                                    stack.append(entry.path)
+                            elif entry.name.lower().endswith(MUSIC_EXTENSIONS):
+                                stat = entry.stat()
+                                files[entry.path] = (stat.st_mtime, stat.st_size)
+                        except OSError:
+                            continue
+            except OSError:
+                continue
+            yield directory, files
+
+    def sync(self, connection, found, known, root_of, task=None, batch_size=500):
+        """Write the difference between files found on disk and rows known for the same scope."""
+        changes = {"added": 0, "updated": 0, "removed": 0}
+        changed = [path for path, stat in found.items() if known.get(path) != stat]
+        removed = [path for path in known if path not in found]
+        for start in range(0, len(changed), batch_size):
+            if task and task.cancelled():
+                break
+            rows, words = [], set()
+            for path in changed[start:start + batch_size]:
+                artist, album, title = self.tags(path, root_of(path))
+                rows.append((path, os.path.dirname(path), found[path][0], found[path][1], artist, album, title))
+                words.update(self.tokens(f"{artist} {album} {title}"))
+                changes["updated" if path in known else "added"] += 1
+            with connection:
+                connection.executemany(
+                    "INSERT INTO tracks (path, directory, mtime, size, artist, album, title) VALUES (?, ?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT(path) DO UPDATE SET mtime = excluded.mtime, size = excluded.size, "
+                    "artist = excluded.artist, album = excluded.album, title = excluded.title", rows
+                )
+            self.add_words(words)
+        if removed and not (task and task.cancelled()):
+            with connection:
+                connection.executemany("DELETE FROM tracks WHERE path = ?", [(path,) for path in removed])
+            changes["removed"] = len(removed)
+        return changes
+
+    def scan(self, task=None):
+        """Walk every music folder and index what changed since the last scan; returns counts."""
+        connection = self.connect()
+        try:
+            known = {path: (mtime, size) for path, mtime, size in connection.execute("SELECT path, mtime, size FROM tracks")}
+            found, directories = {}, set()
+            for root in self.roots:
+                for directory, files in self.walk(root):
+                    directories.add(directory)
+                    found.update(files)
+            changes = self.sync(connection, found, known, self.root_of, task)
+        finally:
+            connection.close()
+        self.directories = directories
+        changes["tracks"] = len(found)
+        return changes
+
+    def update(self, directories, task=None):
+        """Re-index the given directories; returns (counts, new subdirectories to watch)."""
+        connection = self.connect()
+        try:
+            found, known, new = {}, {}, []
+            for directory in directories:
+                if self.root_of(directory) is None:
+                    continue
+                if not os.path.isdir(directory):
+                    rows = connection.execute(
+                        "SELECT path, mtime, size FROM tracks WHERE directory = ? OR substr(directory, 1, ?) = ?",
+                        (directory, len(directory) + 1, directory + os.sep)
+                    )
+                    known.update((path, (mtime, size)) for path, mtime, size in rows)
+                    self.directories = {d for d in self.directories if d != directory and not d.startswith(directory + os.sep)}
+                    continue
+                for path, files in self.walk(directory, recursive=False):
+                    found.update(files)
+                rows = connection.execute("SELECT path, mtime, size FROM tracks WHERE directory = ?", (directory,))
+                known.update((path, (mtime, size)) for path, mtime, size in rows)
+                with os.scandir(directory) as entries:
+                    subdirectories = [entry.path for entry in entries if entry.is_dir(follow_symlinks=False)]
+                for subdirectory in subdirectories:
+                    if subdirectory in self.directories:
+                        continue
+                    for path, files in self.walk(subdirectory):
+                        new.append(path)
+                        found.update(files)
+                        rows = connection.execute("SELECT path, mtime, size FROM tracks WHERE directory = ?", (path,))
+                        known.update((p, (mtime, size)) for p, mtime, size in rows)
+            changes = self.sync(connection, found, known, self.root_of, task)
+        finally:
+            connection.close()
+        self.directories.update(new)
+        return changes, new
+
+    def close(self):
+        self.connection.close()
+
+class PlayQueue(threading.Thread):
+    """Playlist played gaplessly on a reserved mixer channel.
+
+    A decoder thread turns the current track and the next few into pygame
+    Sounds, as many as fit in max_buffer_mb (estimated from file sizes
+    until decoded), and the next one is handed to Channel.queue() so the
+    mixer starts it on the sample the current one ends. A track too big
+    for the buffer on its own is streamed with pygame.mixer.music instead,
+    without a gapless switch. Every other switch is timed from the command
+    (or the end of the previous track) to the first audio; an underrun is
+    a track ending before the next one was ready.
+    """
+    POLL_INTERVAL = 0.02
+
+    def __init__(self, max_buffer_mb=256, lookahead=2, on_track=None, on_error=None, channel_id=0):
+        super().__init__(daemon=True)
+        self.max_bytes = max_buffer_mb * 1024 * 1024
+        self.lookahead = lookahead
+        self.on_track = on_track
+        self.on_error = on_error
+        self.channel_id = channel_id
+        self.condition = threading.Condition()
+        self.commands = collections.deque()
+        self.tracks = []
+        self.unshuffled = None
+        self.position = -1
+        self.state = "stopped"
+        self.running = True
+        self.channel = None
+        self.silence = None
+        self.bytes_per_second = 44100 * 4
+        self.decoded = collections.OrderedDict()  # path -> (Sound, bytes)
+        self.decoded_bytes = 0
+        self.wanted = []
+        self.failed = set()
+        self.queued = None  # Sound handed to Channel.queue() for position + 1
+        self.streaming = False
+        self.switch_started = None  # set while a switch waits for its track to decode
+        self.switch_automatic = False
+        self.switches = 0
+        self.gapless = 0
+        self.underruns = 0
+        self.peak_bytes = 0
+        self.switch_latencies = collections.deque(maxlen=100)
+        self.decode_times = collections.deque(maxlen=100)
+        self.decoder = threading.Thread(target=self.decode_loop, daemon=True)
+
+    def command(self, name, *args):
+        with self.condition:
+            self.commands.append((name, args, time.perf_counter()))
+            self.condition.notify_all()
+
+    def play(self, paths):
+        """Replace the queue with paths and start the first."""
+        self.command("play", list(paths))
+
+    def enqueue(self, paths):
+        """Add paths after the last track; starts playing if the queue had run out."""
+        self.command("enqueue", list(paths))
+
+    def next(self):
+        self.command("skip", 1)
+
+    def previous(self):
+        self.command("skip", -1)
+
+    def shuffle(self, enabled=True):
+        """Shuffle (or restore the order of) the tracks after the current one."""
+        self.command("shuffle", enabled)
+
+    def clear(self):
+        """Drop the upcoming tracks; the current one plays to its end."""
+        self.command("clear")
+
+    def pause(self):
+        self.command("pause")
+
+    def resume(self):
+        self.command("resume")
+
+    def stop_playback(self):
+        self.command("stop")
+
+    def stop(self):
+        """Stop playing and let both threads exit."""
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+
+    def current(self):
+        """Return (current path or None, upcoming paths, state)."""
+        with self.condition:
+            if 0 <= self.position < len(self.tracks):
+                return self.tracks[self.position], self.tracks[self.position + 1:], self.state
+            return None, [], self.state
+
+    def stats(self):
+        with self.condition:
+            latencies = list(self.switch_latencies)
+            decode_times = list(self.decode_times)
+            return {
+                "state": self.state,
+                "tracks": len(self.tracks),
+                "position": self.position,
+                "switches": self.switches,
+                "gapless": self.gapless,
+                "underruns": self.underruns,
+                "avg_switch_ms": 1000 * sum(latencies) / len(latencies) if latencies else 0.0,
+                "max_switch_ms": 1000 * max(latencies) if latencies else 0.0,
+                "avg_decode_ms": 1000 * sum(decode_times) / len(decode_times) if decode_times else 0.0,
+                "decoded": len(self.decoded),
+                "buffer_mb": self.decoded_bytes / 1048576,
+                "peak_buffer_mb": self.peak_bytes / 1048576,
+            }
+
+    def report_error(self, message):
+        if self.on_error:
+            self.on_error(message)
+
+    def estimated_bytes(self, path):
+        """Decoded size of a track: exact once decoded, guessed from the file size before."""
+        if path in self.decoded:
+            return self.decoded[path][1]
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            return 0
+        return size * DECODED_SIZE_RATIO.get(os.path.splitext(path)[1].lower(), 11)
+
+    def streamed(self, path):
+        return self.estimated_bytes(path) > self.max_bytes
+
+    def plan(self):
+        """Pick the tracks to keep decoded (current, then the next ones that fit) and drop the rest."""
+        wanted, total = [], 0
+        for path in self.tracks[max(self.position, 0):max(self.position, 0) + self.lookahead + 1]:
+            size = self.estimated_bytes(path)
+            if size > self.max_bytes:
+                continue
+            if total + size > self.max_bytes:
+                break
+            if path not in wanted:
+                wanted.append(path)
+                total += size
+        # Keep the previous track too while it fits, for "previous song"
+        if self.position > 0 and self.tracks[self.position - 1] not in wanted:
+            size = self.estimated_bytes(self.tracks[self.position - 1])
+            if total + size <= self.max_bytes:
+                wanted.append(self.tracks[self.position - 1])
+        self.wanted = wanted
+        for path in [path for path in self.decoded if path not in wanted]:
+            self.decoded_bytes -= self.decoded.pop(path)[1]
+        self.condition.notify_all()
+
+    def decode_loop(self):
+        while True:
+            with self.condition:
+                while self.running and not self.pending_decode():
+                    self.condition.wait()
+                if not self.running:
+                    return
+                path = self.pending_decode()[0]
+            start = time.perf_counter()
+            try:
+                sound = pygame.mixer.Sound(path)
+                size = int(sound.get_length() * self.bytes_per_second)
+            except Exception as e:
+                sound = None
+                self.report_error(f"Failed to decode {os.path.basename(path)}: {str(e)}")
+            with self.condition:
+                if sound is None:
+                    self.failed.add(path)
+                elif path in self.wanted and path not in self.decoded:
+                    self.decode_times.append(time.perf_counter() - start)
+                    self.decoded[path] = (sound, size)
+                    self.decoded_bytes += size
+                    self.peak_bytes = max(self.peak_bytes, self.decoded_bytes)
+                self.condition.notify_all()
+
+    def pending_decode(self):
+        return [path for path in self.wanted if path not in self.decoded and path not in self.failed]
+
+    def run(self):
+        frequency, size, channels = pygame.mixer.get_init()
+        self.bytes_per_second = frequency * channels * abs(size) // 8
+        pygame.mixer.set_reserved(self.channel_id + 1)
+        self.channel = pygame.mixer.Channel(self.channel_id)
+        self.silence = pygame.mixer.Sound(buffer=bytes(abs(size) // 8 * channels))
+        self.decoder.start()
+        while True:
+            with self.condition:
+                if self.running and not self.commands:
+                    self.condition.wait(self.POLL_INTERVAL)
+                if not self.running:
+                    break
+                commands = list(self.commands)
+                self.commands.clear()
+                try:
+                    for name, args, issued in commands:
+                        getattr(self, f"do_{name}")(issued, *args)
+                    self.tick()
+                except Exception as e:
+                    self.report_error(f"Play queue error: {str(e)}")
+        self.channel.stop()
+        if self.streaming:
+            pygame.mixer.music.stop()
+
+    def unqueue(self):
+        """Take back the sound lined up with Channel.queue() (pygame can only overwrite it)."""
+        if self.queued is not None:
+            self.channel.queue(self.silence)
+            self.queued = None
+
+    def switch_to(self, position, issued, automatic=False):
+        """Switch to the track at position, or stop past either end."""
+        self.channel.stop()
+        if self.streaming:
+            pygame.mixer.music.stop()
+            self.streaming = False
+        self.queued = None
+        self.switch_started = None
+        if not 0 <= position < len(self.tracks):
+            self.position = len(self.tracks) if position >= len(self.tracks) else -1
+            self.state = "stopped"
+            self.plan()
+            return
+        self.position = position
+        self.state = "playing"
+        self.switch_started = issued
+        self.switch_automatic = automatic
+        self.plan()
+        self.begin()
+        if automatic and self.switch_started is not None:
+            self.underruns += 1
+
+    def begin(self):
+        """Start the current track if it is ready; otherwise the switch keeps waiting."""
+        path = self.tracks[self.position]
+        if self.streamed(path):
+            pygame.mixer.music.load(path)
+            pygame.mixer.music.play()
+            self.streaming = True
+        elif path in self.failed:
+            self.switch_to(self.position + 1, self.switch_started, self.switch_automatic)
+            return
+        elif path in self.decoded:
+            self.channel.play(self.decoded[path][0])
+        else:
+            return
+        self.switch_latencies.append(time.perf_counter() - self.switch_started)
+        self.switch_started = None
+        self.switches += 1
+        if self.on_track:
+            self.on_track(path)
+
+    def tick(self):
+        if self.state != "playing":
+            return
+        if self.switch_started is not None:
+            self.begin()
+            return
+        if self.streaming:
+            if not pygame.mixer.music.get_busy():
+                self.switch_to(self.position + 1, time.perf_counter(), automatic=True)
+            return
+        if self.queued is not None and self.channel.get_queue() is None:
+            # The mixer moved on to the queued track by itself
+            self.queued = None
+            self.position += 1
+            self.switches += 1
+            self.gapless += 1
+            self.switch_latencies.append(0.0)
+            self.plan()
+            if self.on_track:
+                self.on_track(self.tracks[self.position])
+        elif not self.channel.get_busy():
+            self.switch_to(self.position + 1, time.perf_counter(), automatic=True)
+            return
+        following = self.position + 1
+        if self.queued is None and following < len(self.tracks):
+            entry = self.decoded.get(self.tracks[following])
+            if entry and not self.streamed(self.tracks[following]):
+                self.channel.queue(entry[0])
+                self.queued = entry[0]
+
+    def do_play(self, issued, paths):
+        self.tracks = paths
+        self.unshuffled = None
+        self.switch_to(0, issued)
+
+    def do_enqueue(self, issued, paths):
+        self.tracks.extend(paths)
+        if self.unshuffled is not None:
+            self.unshuffled.extend(paths)
+        if self.state == "stopped":
+            self.switch_to(len(self.tracks) - len(paths), issued)
+        else:
+            self.plan()
+
+    def do_skip(self, issued, step):
+        if self.state == "stopped" and self.position < 0 and step < 0:
+            return
+        self.switch_to(self.position + step, issued)
+
+    def do_shuffle(self, issued, enabled):
+        upcoming = self.tracks[self.position + 1:]
+        if enabled:
+            if self.unshuffled is None:
+                self.unshuffled = list(self.tracks)
+            random.shuffle(upcoming)
+        elif self.unshuffled is not None:
+            # Put the remaining tracks back in the order they were added
+            remaining = collections.Counter(upcoming)
+            upcoming = []
+            for path in self.unshuffled:
+                if remaining[path]:
+                    remaining[path] -= 1
+                    upcoming.append(path)
+            self.unshuffled = None
+        self.tracks = self.tracks[:self.position + 1] + upcoming
+        self.unqueue()
+        self.plan()
+
+    def do_clear(self, issued):
+        del self.tracks[self.position + 1:]
+        self.unshuffled = None
+        self.unqueue()
+        self.plan()
+
+    def do_pause(self, issued):
+        if self.state == "playing":
+            self.state = "paused"
+            if self.streaming:
+                pygame.mixer.music.pause()
+            else:
+                self.channel.pause()
+
+    def do_resume(self, issued):
+        if self.state == "paused":
+            self.state = "playing"
+            if self.streaming:
+                pygame.mixer.music.unpause()
+            else:
+                self.channel.unpause()
+
+    def do_stop(self, issued):
+        self.switch_to(-1, issued)
+
+class JitterBuffer:
+    """Bounded FIFO of PCM bytes between a stream decoder and the mixer.
+
+    write() blocks while the buffer is full, which pushes back on the
+    decoder and the connection; read() never blocks and only returns
+    whole frames.
+    """
+    def __init__(self, capacity, frame_size=4):
+        self.capacity = capacity
+        self.frame_size = frame_size
+        self.data = bytearray()
+        self.condition = threading.Condition()
+        self.closed = False
+
+    def __len__(self):
+        return len(self.data)
+
+    def write(self, chunk):
+        with self.condition:
+            while len(self.data) >= self.capacity and not self.closed:
+                self.condition.wait(0.5)
+            if self.closed:
+                return False
+            self.data += chunk
+            self.condition.notify_all()
+            return True
+
+    def read(self, size):
+        with self.condition:
+            available = len(self.data) - len(self.data) % self.frame_size
+            chunk = bytes(self.data[:min(size, available)])
+            del self.data[:len(chunk)]
+            self.condition.notify_all()
+            return chunk
+
+    def wait_for(self, size, timeout):
+        """Wait until size bytes are buffered; False on timeout or close."""
+        with self.condition:
+            return self.condition.wait_for(lambda: len(self.data) >= size or self.closed, timeout) and not self.closed
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+
+class IcyMetadataReader:
+    """Splits an Icecast/SHOUTcast body into audio and the in-band stream titles.
+
+    With "Icy-MetaData: 1" the server inserts a metadata block after every
+    metaint bytes of audio: one length byte (in 16-byte units) and the text.
+    """
+    def __init__(self, metaint):
+        self.metaint = metaint
+        self.until_meta = metaint
+        self.meta_left = None  # None while in audio, then bytes of metadata left
+        self.meta = bytearray()
+        self.title = None
+
+    def feed(self, data):
+        """Return the audio bytes in data; updates title when a metadata block ends."""
+        if not self.metaint:
+            return data
+        audio = bytearray()
+        view = memoryview(data)
+        while view:
+            if self.meta_left is None:
+                take = min(self.until_meta, len(view))
+                audio += view[:take]
+                view = view[take:]
+                self.until_meta -= take
+                if not self.until_meta:
+                    self.meta_left = -1
+            elif self.meta_left == -1:
+                self.meta_left = view[0] * 16
+                view = view[1:]
+                self.meta.clear()
+            else:
+                take = min(self.meta_left, len(view))
+                self.meta += view[:take]
+                view = view[take:]
+                self.meta_left -= take
+            if self.meta_left == 0:
+                match = re.search(rb"StreamTitle='(.*?)';", bytes(self.meta))
+                if match:
+                    self.title = match.group(1).decode("utf-8", "replace").strip() or None
+                self.meta_left = None
+                self.until_meta = self.metaint
+        return bytes(audio)
+
+
+class WavStreamDecoder:
+    """Passes the PCM of a WAV stream through, if it is already in the mixer's format."""
+    def __init__(self, output, rate, channels):
+        self.output = output
+        self.rate = rate
+        self.channels = channels
+        self.header = bytearray()
+        self.started = False
+
+    def feed(self, data):
+        if self.started:
+            self.output(data)
+            return
+        self.header += data
+        position = 12
+        while position + 8 <= len(self.header):
+            chunk_id = bytes(self.header[position:position + 4])
+            size = int.from_bytes(self.header[position + 4:position + 8], "little")
+            if chunk_id == b"fmt ":
+                if position + 24 > len(self.header):
+                    return
+                channels = int.from_bytes(self.header[position + 10:position + 12], "little")
+                rate = int.from_bytes(self.header[position + 12:position + 16], "little")
+                bits = int.from_bytes(self.header[position + 22:position + 24], "little")
+                if (rate, channels, bits) != (self.rate, self.channels, 16):
+                    raise ValueError(f"{rate} Hz, {channels} channel, {bits}-bit WAV needs ffmpeg to play")
+            elif chunk_id == b"data":
+                self.started = True
+                self.output(bytes(self.header[position + 8:]))
+                self.header = None
+                return
+            position += 8 + size
+
+    def close(self):
+        pass
+
+
+class FFmpegStreamDecoder:
+    """Decodes a compressed stream to the mixer's PCM format in an ffmpeg subprocess."""
+    FORMATS = {"audio/mpeg": "mp3", "audio/mp3": "mp3", "audio/aac": "aac", "audio/aacp": "aac", "audio/ogg": "ogg",
+               "application/ogg": "ogg", "audio/flac": "flac"}
+
+    def __init__(self, output, rate, channels, executable, content_type=""):
+        self.output = output
+        input_format = self.FORMATS.get(content_type)
+        # Probe only the first few KB, or ffmpeg holds back seconds of a slow stream before decoding
+        command = [executable, "-nostdin", "-loglevel", "error", "-probesize", "4096", "-analyzeduration", "0",
+                   "-fflags", "nobuffer"] + (["-f", input_format] if input_format else []) + [
+                   "-i", "pipe:0", "-f", "s16le", "-ac", str(channels), "-ar", str(rate), "pipe:1"]
+        self.process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                        stderr=subprocess.DEVNULL, bufsize=0)
+        self.reader = threading.Thread(target=self.read_loop, daemon=True)
+        self.reader.start()
+
+    def read_loop(self):
+        while True:
+            pcm = self.process.stdout.read(16384)
+            if not pcm or not self.output(pcm):
+                return
+
+    def feed(self, data):
+        self.process.stdin.write(data)
+
+    def close(self):
+        try:
+            self.process.stdin.close()
+        except OSError:
+            pass
+        try:
+            self.process.wait(timeout=1)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+        self.reader.join(1)
+
+
+class RadioStreamer:
+    """Internet radio player with separate fetch, decode and playback threads.
+
+    The fetch thread reads the HTTP/Icecast stream as it arrives, takes the
+    ICY metadata out and feeds a decoder (WAV pass-through, anything else
+    through ffmpeg), which fills a jitter buffer with PCM. The player
+    thread hands the mixer chunk_seconds of it at a time with
+    Channel.queue() on a reserved channel, so the next chunk is always
+    lined up. Playback starts, and restarts after an underrun, once
+    prebuffer_seconds are buffered. A full buffer pushes back on the
+    connection; a dropped or stalled one is retried with exponential
+    backoff and jitter.
+    """
+    def __init__(self, http, ffmpeg=None, channel_id=1, chunk_seconds=0.2, prebuffer_seconds=1.0,
+                 buffer_seconds=10.0, max_backoff=30.0, on_title=None, on_error=None):
+        self.http = http
+        self.ffmpeg = ffmpeg
+        self.channel_id = channel_id
+        self.chunk_seconds = chunk_seconds
+        self.prebuffer_seconds = prebuffer_seconds
+        self.buffer_seconds = buffer_seconds
+        self.max_backoff = max_backoff
+        self.on_title = on_title
+        self.on_error = on_error
+        self.lock = threading.Lock()
+        self.stopping = None
+        self.buffer = None
+        self.threads = []
+        self.url = None
+        self.state = "stopped"
+        self.title = None
+        self.rate, self.channels, self.bytes_per_second = 44100, 2, 44100 * 4
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.started = None
+        self.first_audio = None
+        self.underruns = 0
+        self.reconnects = 0
+        self.received = 0
+        self.levels = collections.deque(maxlen=600)  # buffered seconds, sampled per chunk played
+
+    def report_error(self, message):
+        if self.on_error:
+            self.on_error(message)
+
+    def play(self, url):
+        """Stop the current station and start streaming url."""
+        self.stop()
+        frequency, size, channels = pygame.mixer.get_init()
+        self.rate, self.channels = frequency, channels
+        self.bytes_per_second = frequency * channels * abs(size) // 8
+        with self.lock:
+            self.url = url
+            self.title = None
+            self.state = "connecting"
+            self.reset_stats()
+            self.started = time.perf_counter()
+            self.stopping = threading.Event()
+            self.buffer = JitterBuffer(int(self.buffer_seconds * self.bytes_per_second), channels * abs(size) // 8)
+            self.threads = [
+                threading.Thread(target=self.fetch_loop, args=(url, self.stopping, self.buffer), daemon=True),
+                threading.Thread(target=self.play_loop, args=(self.stopping, self.buffer), daemon=True),
+            ]
+        for thread in self.threads:
+            thread.start()
+
+    def stop(self):
+        with self.lock:
+            if self.stopping is None:
+                return
+            self.stopping.set()
+            self.buffer.close()
+            threads, self.threads = self.threads, []
+            self.stopping = None
+            self.state = "stopped"
+        # The fetch thread may be blocked on the network; it exits on its own. The
+        # player is joined so it can't stop the channel under the next station.
+        if threads and threads[1] is not threading.current_thread():
+            threads[1].join(1)
+
+    def decoder_for(self, content_type, buffer):
+        content_type = content_type.split(";")[0].strip().lower()
+        if content_type in ("audio/wav", "audio/x-wav", "audio/wave", "audio/vnd.wave"):
+            return WavStreamDecoder(buffer.write, self.rate, self.channels)
+        if not self.ffmpeg:
+            raise RuntimeError(f"Playing {content_type or 'this'} streams needs ffmpeg")
+        return FFmpegStreamDecoder(buffer.write, self.rate, self.channels, self.ffmpeg, content_type)
+
+    def fetch_loop(self, url, stopping, buffer):
+        delay = 0.5
+        while not stopping.is_set():
+            decoder = close = None
+            try:
+                headers, chunks, close = self.http.stream(url, "radio", headers={"Icy-MetaData": "1"})
+                decoder = self.decoder_for(headers.get("Content-Type", ""), buffer)
+                metadata = IcyMetadataReader(int(headers.get("icy-metaint") or 0))
+                for chunk in chunks:
+                    if stopping.is_set():
+                        return
+                    self.received += len(chunk)
+                    decoder.feed(metadata.feed(chunk))
+                    delay = 0.5
+                    if metadata.title and metadata.title != self.title:
+                        self.title = metadata.title
+                        if self.on_title:
+                            self.on_title(self.title)
+                raise EOFError("the station closed the stream")
+            except Exception as e:
+                if stopping.is_set():
+                    return
+                if isinstance(e, (RuntimeError, ValueError)):
+                    # Nothing a reconnect would fix
+                    self.report_error(f"Radio: {str(e)}")
+                    self.state = "failed"
+                    return
+                self.reconnects += 1
+                self.report_error(f"Radio stream dropped ({str(e)}); reconnecting in {delay:.1f} s")
+                stopping.wait(delay * random.uniform(0.8, 1.2))
+                delay = min(delay * 2, self.max_backoff)
+            finally:
+                if decoder:
+                    decoder.close()
+                if close:
+                    close()
+
+    def play_loop(self, stopping, buffer):
+        pygame.mixer.set_reserved(self.channel_id + 1)
+        channel = pygame.mixer.Channel(self.channel_id)
+        chunk_bytes = int(self.chunk_seconds * self.bytes_per_second) // buffer.frame_size * buffer.frame_size
+        prebuffer = int(self.prebuffer_seconds * self.bytes_per_second)
+        buffering = True
+        try:
+            while not stopping.is_set():
+                if buffering:
+                    if not buffer.wait_for(prebuffer, 0.1):
+                        continue
+                    buffering = False
+                    self.state = "playing"
+                if channel.get_queue() is None:
+                    pcm = buffer.read(chunk_bytes)
+                    if pcm:
+                        self.levels.append(len(buffer) / self.bytes_per_second)
+                        sound = pygame.mixer.Sound(buffer=pcm)
+                        if channel.get_busy():
+                            channel.queue(sound)
+                        else:
+                            channel.play(sound)
+                            if self.first_audio is None:
+                                self.first_audio = time.perf_counter()
+                    elif not channel.get_busy():
+                        self.underruns += 1
+                        self.state = "buffering"
+                        buffering = True
+                        continue
+                stopping.wait(min(0.02, self.chunk_seconds / 4))
+        finally:
+            channel.stop()
+
+    def stats(self):
+        levels = list(self.levels)
+        return {
+            "url": self.url,
+            "state": self.state,
+            "title": self.title,
+            "first_audio_ms": (self.first_audio - self.started) * 1000 if self.first_audio else None,
+            "buffer_seconds": len(self.buffer) / self.bytes_per_second if self.buffer else 0.0,
+            "min_buffer_seconds": min(levels) if levels else 0.0,
+            "avg_buffer_seconds": sum(levels) / len(levels) if levels else 0.0,
+            "underruns": self.underruns,
+            "reconnects": self.reconnects,
+            "received_kb": self.received / 1024,
+        }
+
+class EnergyVAD:
+    """Energy-based voice activity detector that cuts a stream into utterances.
+
+    Chunks seen while nobody is speaking go into a short ring buffer (so the
+    start of a word isn't clipped) and nudge the adaptive noise floor.
+    """
+    def __init__(self, sample_rate, sample_width, chunk_size, pre_roll=0.3, pause=0.8,
+                 min_phrase=0.25, max_phrase=15.0, sensitivity=2.5, min_energy=100, adapt_rate=0.05):
+        seconds_per_chunk = chunk_size / sample_rate
+        self.dtype = {1: np.int8, 2: np.int16, 4: np.int32}[sample_width]
+        self.pre_roll = collections.deque(maxlen=max(1, int(pre_roll / seconds_per_chunk)))
+        self.pause_chunks = max(1, int(pause / seconds_per_chunk))
+        self.min_chunks = max(1, int(min_phrase / seconds_per_chunk))
+        self.max_chunks = max(1, int(max_phrase / seconds_per_chunk))
+        self.sensitivity = sensitivity
+        self.min_energy = min_energy
+        self.adapt_rate = adapt_rate
+        self.noise_floor = None
+        self.reset()
+
+    def reset(self):
+        """Drop any partial utterance."""
+        self.in_speech = False
+        self.frames = []
+        self.voiced_chunks = 0
+        self.silent_chunks = 0
+
+    def energy(self, chunk):
+        """Return the RMS energy of a chunk of raw samples."""
+        samples = np.frombuffer(chunk, dtype=self.dtype).astype(np.float64)
+        return float(np.sqrt(np.mean(samples * samples))) if samples.size else 0.0
+
+    @property
+    def threshold(self):
+        return max((self.noise_floor or 0.0) * self.sensitivity, self.min_energy)
+
+    def calibrate(self, chunks):
+        """Set the initial noise floor from a few chunks of background audio."""
+        energies = [self.energy(chunk) for chunk in chunks]
+        if energies:
+            self.noise_floor = sum(energies) / len(energies)
+
+    def process(self, chunk):
+        """Feed one chunk; return the raw audio of an utterance once it ends."""
+        energy = self.energy(chunk)
+        if self.noise_floor is None:
+            self.noise_floor = energy
+            return None
+        if not self.in_speech:
+            if energy > self.threshold:
+                self.in_speech = True
+                self.frames = list(self.pre_roll) + [chunk]
+                self.pre_roll.clear()
+                self.voiced_chunks = 1
+                self.silent_chunks = 0
+            else:
+                self.pre_roll.append(chunk)
+                self.noise_floor += (energy - self.noise_floor) * self.adapt_rate
+            return None
+        self.frames.append(chunk)
+        if energy > self.threshold:
+            self.voiced_chunks += 1
+            self.silent_chunks = 0
+        else:
+            self.silent_chunks += 1
+        if self.silent_chunks >= self.pause_chunks or len(self.frames) >= self.max_chunks:
+            frames, voiced = self.frames, self.voiced_chunks
+            self.reset()
+            if voiced >= self.min_chunks:
+                return b"".join(frames)
+        return None
+
+class RecognizerBackend:
+    """Speech-to-text engine used by VoiceThread.
+
+    Models are loaded once by ensure_loaded() and stay resident; utterances
+    queued together are handed over in a single transcribe_batch() call.
+    """
+    name = "base"
+    batch_window = 0.0  # seconds worth waiting for more clips; only for engines decoding a batch in one pass
+
+    def __init__(self):
+        self.loaded = False
+        self.load_lock = threading.Lock()
+
+    def ensure_loaded(self):
+        """Load the engine's models the first time it is needed."""
+        with self.load_lock:
+            if not self.loaded:
+                self.load()
+                self.loaded = True
+
+    def load(self):
+        """Load models; backends without local models don't need this."""
+
+    def transcribe_batch(self, clips):
+        """Return a transcript per sr.AudioData clip, or None if not understood."""
+        raise NotImplementedError
+
+class GoogleRecognizerBackend(RecognizerBackend):
+    """Online recognition through the Google Web Speech API."""
+    name = "google"
+
+    def __init__(self):
+        super().__init__()
+        self.recognizer = sr.Recognizer()
+
+    def transcribe_batch(self, clips):
+        results = []
+        for audio in clips:
+            try:
+                results.append(self.recognizer.recognize_google(audio))
+            except sr.UnknownValueError:
+                results.append(None)
+        return results
+
+class VoskRecognizerBackend(RecognizerBackend):
+    """Offline recognition with a resident Vosk (Kaldi) model."""
+    name = "vosk"
+
+    def __init__(self, model_path):
+        super().__init__()
+        self.model_path = model_path
+        self.model = None
+
+    def load(self):
+        import vosk
+        vosk.SetLogLevel(-1)
+        self.model = vosk.Model(self.model_path)
+
+    def transcribe_batch(self, clips):
+        import vosk
+        self.ensure_loaded()
+        results = []
+        for audio in clips:
+            recognizer = vosk.KaldiRecognizer(self.model, audio.sample_rate)
+            recognizer.AcceptWaveform(audio.get_raw_data(convert_width=2))
+            text = json.loads(recognizer.FinalResult()).get("text", "")
+            results.append(text or None)
+        return results
+
+class StubRecognizerBackend(RecognizerBackend):
+    """Offline test backend returning canned transcripts keyed by raw audio bytes."""
+    name = "stub"
+
+    def __init__(self, transcripts=None, default="hello", delay=0.0, batch_window=0.0):
+        super().__init__()
+        self.transcripts = transcripts or {}
+        self.default = default
+        self.delay = delay  # per call, as if the whole batch were decoded in one pass
+        self.batch_window = batch_window
+
+    def transcribe_batch(self, clips):
+        if self.delay:
+            time.sleep(self.delay)
+        return [self.transcripts.get(audio.frame_data, self.default) for audio in clips]
+
+RECOGNIZER_BACKENDS = {
+    "google": GoogleRecognizerBackend,
+    "vosk": VoskRecognizerBackend,
+    "stub": StubRecognizerBackend,
+}
+
+def create_recognizer_backend(name, model_path=None):
+    """Create a recognizer backend by name, falling back to Google."""
+    if name == "vosk":
+        return VoskRecognizerBackend(model_path)
+    return RECOGNIZER_BACKENDS.get(name, GoogleRecognizerBackend)()
+
+class RecognitionBatcher(threading.Thread):
+    """Decode queued utterances, batching those that are already waiting.
+
+    An utterance is decoded as soon as the thread is free, together with
+    whatever queued up meanwhile. Only a backend that decodes a batch in one
+    pass (batch_window > 0) makes it hold on for more.
+    """
+    def __init__(self, backend, on_result, on_error, window=None, max_batch=8):
+        super().__init__(daemon=True)
+        self.backend = backend
+        self.on_result = on_result
+        self.on_error = on_error
+        self.window = backend.batch_window if window is None else window
+        self.max_batch = max_batch
+        self.pending = queue.Queue()
+        self.waits = collections.deque(maxlen=100)  # seconds from submit() to the start of decoding
+
+    def submit(self, audio):
+        self.pending.put((audio, time.perf_counter()))
+
+    def stop(self):
+        self.pending.put(None)
+
+    def run(self):
+        while True:
+            item = self.pending.get()
+            if item is None:
+                return
+            batch = [item]
+            deadline = time.perf_counter() + self.window
+            while len(batch) < self.max_batch:
+                try:
+                    if self.window:
+                        item = self.pending.get(timeout=max(0.0, deadline - time.perf_counter()))
+                    else:
+                        item = self.pending.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    self.pending.put(None)
+                    break
+                batch.append(item)
+            started = time.perf_counter()
+            self.waits.extend(started - submitted for _, submitted in batch)
+            try:
+                results = self.backend.transcribe_batch([audio for audio, _ in batch])
+            except sr.RequestError as e:
+                self.on_error(f"Could not request results; {e}")
+                continue
+            except Exception as e:
+                self.on_error(f"Recognition error: {str(e)}")
+                continue
+            for text in results:
+                if text:
+                    self.on_result(text)
+                else:
+                    self.on_error("Could not understand audio")
+
+# Fixed phrases rendered into the speech cache at startup
+STATIC_PHRASES = [
+    "Voice assistant initialized. How can I help you?",
+    "Hello there! How can I help you today?",
+    "Goodbye",
+    "Note saved.",
+    "Music paused.",
+    "Music resumed.",
+    "No music is currently playing.",
+    "No music is paused or playing.",
+    "Media stopped",
+    "No media is currently playing",
+    "No tasks set.",
+    "No bookmarks found.",
+    "No notes found.",
+    "Here are your notes.",
+    "Alarm! It's time!",
+    "Could not understand audio",
+    "Please specify a task",
+    "Failed to fetch weather.",
+]
+
+class SpeechCache:
+    """On-disk LRU cache of rendered speech keyed by (text, voice, rate, volume)."""
+    def __init__(self, directory, max_bytes=50 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.extension = ".aiff" if platform.system() == "Darwin" else ".wav"
+        self.entries = collections.OrderedDict()  # key -> size, least recently used first
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self.load_index()
+
+    def load_index(self):
+        """Rebuild the LRU order from the cached files' modification times."""
+        files = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(self.extension) and ".part" not in entry.name:
+                stat = entry.stat()
+                files.append((stat.st_mtime, entry.name[:-len(self.extension)], stat.st_size))
+        for _, key, size in sorted(files):
+            self.entries[key] = size
+            self.total_bytes += size
+
+    def key(self, text, voice, rate, volume):
+        return hashlib.sha1(json.dumps([text, voice, rate, volume]).encode("utf-8")).hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.directory, key + self.extension)
+
+    def temp_path(self, key):
+        return os.path.join(self.directory, key + ".part" + self.extension)
+
+    def lookup(self, key):
+        """Return the audio file for key, or None on a miss."""
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                path = self.path(key)
+                try:
+                    os.utime(path)
+                    return path
+                except OSError:
+                    self.total_bytes -= self.entries.pop(key)
+            self.misses += 1
+            return None
+
+    def store(self, key):
+        """Adopt a file rendered at temp_path(key) and evict down to the size cap."""
+        temp_path = self.temp_path(key)
+        if not os.path.exists(temp_path) or os.path.getsize(temp_path) == 0:
+            return None
+        path = self.path(key)
+        os.replace(temp_path, path)
+        with self.lock:
+            if key in self.entries:
+                self.total_bytes -= self.entries[key]
+            self.entries[key] = os.path.getsize(path)
+            self.total_bytes += self.entries[key]
+            while self.total_bytes > self.max_bytes and len(self.entries) > 1:
+                old_key, size = self.entries.popitem(last=False)
+                self.total_bytes -= size
+                try:
+                    os.remove(self.path(old_key))
+                except OSError:
+                    pass
+        return path
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": 100 * self.hits / lookups if lookups else 0.0,
+            "entries": len(self.entries),
+            "bytes": self.total_bytes,
+        }
+
+class SpeechWorker(threading.Thread):
+    """Thread that owns the pyttsx3 engine and speaks queued messages.
+
+    Messages are spoken in priority order, so alarms jump ahead of chatter,
+    and back-to-back messages of the same priority are merged into one
+    utterance. Engine properties are cached here and applied on this thread.
+
+    With a SpeechCache, phrases that are static or have been said before are
+    rendered to a file once and played back through pygame.mixer afterwards.
+    """
+    PRIORITY_ALARM = 0
+    PRIORITY_NORMAL = 1
+
+    def __init__(self, rate=150, volume=1.0, merge_limit=500, on_error=None, cache=None):
+        super().__init__(daemon=True)
+        self.cache = cache
+        self.static_phrases = set()
+        self.phrase_counts = {}
+        self.warmup_phrases = collections.deque()
+        self.rendering = False
+        self.properties = {"rate": rate, "volume": volume, "voice": None, "voices": []}
+        self.changed_properties = {}
+        self.merge_limit = merge_limit
+        self.on_error = on_error
+        self.pending = []  # heap of (priority, seq, enqueued_at, text)
+        self.condition = threading.Condition()
+        self.seq = itertools.count()
+        self.current_priority = None
+        self.interrupted = False
+        self.running = True
+        self.engine = None
+        self.error = None
+        self.ready = threading.Event()
+        self.spoken = 0
+        self.latencies = collections.deque(maxlen=100)
+
+    def get_property(self, name):
+        return self.properties.get(name)
+
+    def set_property(self, name, value):
+        """Change an engine property before the next utterance."""
+        with self.condition:
+            self.properties[name] = value
+            self.changed_properties[name] = value
+
+    def say(self, text, priority=PRIORITY_NORMAL, interrupt=False):
+        """Queue text and return immediately.
+
+        With interrupt, a lower-priority message being spoken is cut short.
+        """
+        with self.condition:
+            heapq.heappush(self.pending, (priority, next(self.seq), time.time(), text))
+            if interrupt and self.current_priority is not None and self.current_priority > priority:
+                self.interrupted = True
+            self.condition.notify()
+
+    def interrupt(self):
+        """Stop the message being spoken."""
+        self.interrupted = True
+
+    def cancel(self, priority=None):
+        """Drop queued messages (those at or below priority, or all) and stop speaking."""
+        with self.condition:
+            if priority is None:
+                self.pending = []
+            else:
+                self.pending = [item for item in self.pending if item[0] < priority]
+                heapq.heapify(self.pending)
+            self.interrupted = True
+
+    def warm_up(self, phrases):
+        """Render phrases into the cache whenever the worker is idle."""
+        if self.cache is None:
+            return
+        with self.condition:
+            self.static_phrases.update(phrases)
+            self.warmup_phrases.extend(phrases)
+            self.condition.notify()
+
+    def stop(self):
+        """Cancel everything and let the thread exit."""
+        with self.condition:
+            self.running = False
+            self.pending = []
+            self.interrupted = True
+            self.condition.notify()
+
+    def stats(self):
+        """Return queue depth and speech latency (enqueue to start) metrics."""
+        latencies = list(self.latencies)
+        return {
+            "queued": len(self.pending),
+            "speaking": self.current_priority is not None,
+            "spoken": self.spoken,
+            "avg_latency_ms": 1000 * sum(latencies) / len(latencies) if latencies else 0.0,
+            "max_latency_ms": 1000 * max(latencies) if latencies else 0.0,
+            "cache": self.cache.stats() if self.cache else None,
+        }
+
+    def create_engine(self):
+        engine = pyttsx3.init(driverName=None)
+        engine.setProperty('rate', self.properties["rate"])
+        engine.setProperty('volume', self.properties["volume"])
+        voices = engine.getProperty('voices') or []
+        self.properties["voices"] = voices
+        if voices and not self.properties["voice"]:
+            female_voices = [v for v in voices if "female" in v.name.lower()]
+            self.properties["voice"] = female_voices[0].id if female_voices else voices[0].id
+            engine.setProperty('voice', self.properties["voice"])
+        engine.connect('started-word', self.on_word)
+        return engine
+
+    def on_word(self, name, location, length):
+        # Engine callbacks run on this thread, where stop() is safe to call
+        if self.interrupted and not self.rendering:
+            self.engine.stop()
+
+    def report_error(self, message):
+        if self.on_error:
+            self.on_error(message)
+
+    def cached_audio(self, text, render=False):
+        """Return a cached audio file for text, rendering it first if allowed."""
+        if self.cache is None or not pygame.mixer.get_init():
+            return None
+        properties = self.properties
+        key = self.cache.key(text, properties["voice"], properties["rate"], properties["volume"])
+        path = self.cache.lookup(key)
+        if path or not render:
+            return path
+        self.rendering = True
+        try:
+            self.engine.save_to_file(text, self.cache.temp_path(key))
+            self.engine.runAndWait()
+            return self.cache.store(key)
+        finally:
+            self.rendering = False
+
+    def should_cache(self, text):
+        """Cache static phrases and anything said at least twice."""
+        if text in self.static_phrases:
+            return True
+        if len(self.phrase_counts) > 2000:
+            self.phrase_counts.clear()
+        self.phrase_counts[text] = self.phrase_counts.get(text, 0) + 1
+        return self.phrase_counts[text] >= 2
+
+    def play_file(self, path):
+        """Play a cached file on a mixer channel; False if it couldn't start."""
+        channel = pygame.mixer.Sound(path).play()
+        if channel is None:
+            return False
+        while channel.get_busy():
+            if self.interrupted:
+                channel.stop()
+                break
+            time.sleep(0.02)
+        return True
+
+    def say_now(self, texts):
+        if texts:
+            self.engine.say(" ".join(texts))
+            self.engine.runAndWait()
+
+    def speak_texts(self, texts):
+        """Speak texts in order, playing cached phrases and synthesizing the rest."""
+        uncached = []
+        for text in texts:
+            path = None
+            if self.cache is not None:
+                path = self.cached_audio(text, render=self.should_cache(text))
+            if path is None:
+                uncached.append(text)
+                continue
+            self.say_now(uncached)
+            uncached = []
+            if self.interrupted:
+                return
+            if not self.play_file(path):
+                uncached.append(text)
+        if not self.interrupted:
+            self.say_now(uncached)
+
+    def run(self):
+        try:
+            self.engine = self.create_engine()
+        except Exception as e:
+            self.error = str(e)
+            self.ready.set()
+            self.report_error(f"Failed to initialize TTS: {self.error}")
+            return
+        self.ready.set()
+        while True:
+            warmup_text = None
+            with self.condition:
+                while self.running and not self.pending and not self.warmup_phrases:
+                    self.condition.wait()
+                if not self.running:
+                    return
+                changes = self.changed_properties
+                self.changed_properties = {}
+                if self.pending:
+                    priority, _, enqueued_at, text = heapq.heappop(self.pending)
+                    texts = [text]
+                    length = len(text)
+                    while self.pending and self.pending[0][0] == priority and length < self.merge_limit:
+                        text = heapq.heappop(self.pending)[3]
+                        texts.append(text)
+                        length += len(text)
+                    self.current_priority = priority
+                    self.interrupted = False
+                else:
+                    warmup_text = self.warmup_phrases.popleft()
+            try:
+                for name, value in changes.items():
+                    self.engine.setProperty(name, value)
+                if warmup_text is not None:
+                    self.cached_audio(warmup_text, render=True)
+                    continue
+                self.latencies.append(time.time() - enqueued_at)
+                self.speak_texts(texts)
+            except Exception as e:
+                self.report_error(f"Speech error: {str(e)}")
+            if warmup_text is None:
+                self.spoken += len(texts)
+                self.current_priority = None
+
+# Seconds between occurrences for spoken recurrence phrases
+REPEAT_INTERVALS = {
+    "hourly": 3600, "every hour": 3600,
+    "daily": 86400, "every day": 86400,
+    "weekly": 604800, "every week": 604800,
+}
+# Events that fire more than this many seconds late were missed (e.g. during sleep)
+SCHEDULE_GRACE_SECONDS = 60
+# Upper bound on how long the scheduler timer sleeps, so clock jumps are noticed
+SCHEDULE_MAX_WAIT_MS = 60000
+
+class ScheduledEvent:
+    """A reminder, alarm or timer due at a wall-clock time in epoch seconds."""
+    def __init__(self, kind, due, message, repeat=None, event_id=None):
+        self.id = event_id or uuid.uuid4().hex
+        self.kind = kind
+        self.due = due
+        self.message = message
+        self.repeat = repeat
+        self.cancelled = False
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "time": dt.fromtimestamp(self.due).strftime("%Y-%m-%d %H:%M:%S"),
+            "message": self.message,
+            "repeat": self.repeat,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        due = dt.strptime(data["time"], "%Y-%m-%d %H:%M:%S").timestamp()
+        return cls(data["kind"], due, data["message"], data.get("repeat"), data.get("id"))
+
+class EventScheduler:
+    """Priority queue of scheduled events ordered by due time.
+
+    Insert and fire are O(log n). Cancelled or rescheduled events leave stale
+    heap entries behind, which are skipped when they reach the top.
+    """
+    def __init__(self):
+        self.heap = []  # (due, seq, event)
+        self.events = {}
+        self.seq = itertools.count()
+
+    def __len__(self):
+        return len(self.events)
+
+    def schedule(self, event):
+        self.events[event.id] = event
+        heapq.heappush(self.heap, (event.due, next(self.seq), event))
+        return event
+
+    def cancel(self, event_id):
+        event = self.events.pop(event_id, None)
+        if event:
+            event.cancelled = True
+            if len(self.heap) > 2 * len(self.events) + 64:
+                self.heap = [entry for entry in self.heap if self.is_live(entry)]
+                heapq.heapify(self.heap)
+        return event
+
+    def is_live(self, entry):
+        due, _, event = entry
+        return not event.cancelled and event.due == due
+
+    def next_due(self):
+        """Return the earliest due time, or None if nothing is scheduled."""
+        while self.heap and not self.is_live(self.heap[0]):
+            heapq.heappop(self.heap)
+        return self.heap[0][0] if self.heap else None
+
+    def pop_due(self, now):
+        """Remove and return (event, scheduled due time) for every event due by now.
+
+        A recurring event fires once however many occurrences were missed and
+        is rescheduled for its next occurrence after now.
+        """
+        fired = []
+        while self.heap and self.heap[0][0] <= now:
+            entry = heapq.heappop(self.heap)
+            if not self.is_live(entry):
+                continue
+            due, _, event = entry
+            fired.append((event, due))
+            if event.repeat:
+                skipped = int((now - due) // event.repeat) + 1
+                event.due = due + skipped * event.repeat
+                heapq.heappush(self.heap, (event.due, next(self.seq), event))
+            else:
+                del self.events[event.id]
+        return fired
+
+    def of_kind(self, kind):
+        """Return live events of one kind ordered by due time."""
+        return sorted((e for e in self.events.values() if e.kind == kind), key=lambda e: e.due)
+
+class StateJournal:
+    """Write-ahead journal of task and scheduled-event changes.
+
+    Every change is appended as one JSON line and the file is fsynced in
+    groups every commit_interval seconds. After compact_after records the
+    journal rolls over to a new segment and the state is written to a
+    snapshot in the background (temp file + rename, so it is never left
+    half-written). Startup replays the snapshot and then the newer segments;
+    a torn last line from a crash is ignored.
+    """
+    def __init__(self, directory, commit_interval=1.0, compact_after=1000):
+        self.directory = directory
+        self.commit_interval = commit_interval
+        self.compact_after = compact_after
+        self.snapshot_path = os.path.join(directory, "snapshot.json")
+        self.state = {"tasks": [], "events": {}}
+        self.lock = threading.RLock()
+        self.segment = 0
+        self.file = None
+        self.dirty = False
+        self.records_since_snapshot = 0
+        self.compacting = False
+        self.closed = threading.Event()
+        self.commit_thread = None
+
+    def segment_path(self, segment):
+        return os.path.join(self.directory, f"journal-{segment:08d}.log")
+
+    def segments(self):
+        found = []
+        for name in os.listdir(self.directory):
+            if name.startswith("journal-") and name.endswith(".log"):
+                found.append(int(name[8:-4]))
+        return sorted(found)
+
+    def apply(self, record):
+        op = record["op"]
+        if op == "task_add":
+            self.state["tasks"].append(record["task"])
+        elif op == "task_remove":
+            if record["task"] in self.state["tasks"]:
+                self.state["tasks"].remove(record["task"])
+        elif op == "event_put":
+            self.state["events"][record["event"]["id"]] = record["event"]
+        elif op == "event_remove":
+            self.state["events"].pop(record["id"], None)
+
+    def open(self, legacy_file=None):
+        """Replay the snapshot and journal, start a new segment and return the state."""
+        os.makedirs(self.directory, exist_ok=True)
+        next_segment = 0
+        if os.path.exists(self.snapshot_path):
+            with open(self.snapshot_path, "r") as f:
+                snapshot = json.load(f)
+            self.state = snapshot["state"]
+            next_segment = snapshot["next_segment"]
+        segments = self.segments()
+        for segment in segments:
+            if segment < next_segment:
+                os.remove(self.segment_path(segment))
+                continue
+            with open(self.segment_path(segment), "r") as f:
+                for line in f:
+                    try:
+                        self.apply(json.loads(line))
+                        self.records_since_snapshot += 1
+                    except ValueError:
+                        pass  # torn write at the end of a segment
+        if not segments and not os.path.exists(self.snapshot_path) and legacy_file and os.path.exists(legacy_file):
+            self.import_legacy(legacy_file)
+        self.segment = max(segments + [next_segment - 1]) + 1
+        self.file = open(self.segment_path(self.segment), "a")
+        self.commit_thread = threading.Thread(target=self.commit_loop, daemon=True)
+        self.commit_thread.start()
+        return self.state
+
+    def import_legacy(self, path):
+        """Seed the state from a reminders_tasks.json file."""
+        with open(path, "r") as f:
+            data = json.load(f)
+        self.state["tasks"] = list(data.get("tasks", []))
+        for r in data.get("reminders", []):
+            event = ScheduledEvent("reminder", dt.strptime(r["time"], "%Y-%m-%d %H:%M").timestamp(), r["message"])
+            self.state["events"][event.id] = event.to_dict()
+        for event in data.get("events", []):
+            self.state["events"][event["id"]] = event
+        self.write_snapshot(self.state, 0)
+
+    def append(self, record):
+        """Apply a change and append it to the journal; durable at the next group commit."""
+        with self.lock:
+            self.apply(record)
+            self.file.write(json.dumps(record) + "\n")
+            self.dirty = True
+            self.records_since_snapshot += 1
+            if self.records_since_snapshot >= self.compact_after and not self.compacting:
+                self.compact()
+
+    def commit(self):
+        """Flush and fsync appended records."""
+        with self.lock:
+            if self.dirty and self.file:
+                self.file.flush()
+                os.fsync(self.file.fileno())
+                self.dirty = False
+
+    def commit_loop(self):
+        while not self.closed.wait(self.commit_interval):
+            try:
+                self.commit()
+            except OSError:
+                pass
+
+    def compact(self):
+        """Roll over to a new segment and snapshot the state in the background."""
+        with self.lock:
+            self.commit()
+            self.file.close()
+            self.segment += 1
+            self.file = open(self.segment_path(self.segment), "a")
+            state = json.loads(json.dumps(self.state))
+            self.records_since_snapshot = 0
+            self.compacting = True
+        threading.Thread(target=self.finish_compaction, args=(state, self.segment), daemon=True).start()
+
+    def finish_compaction(self, state, next_segment):
+        try:
+            self.write_snapshot(state, next_segment)
+            for segment in self.segments():
+                if segment < next_segment:
+                    os.remove(self.segment_path(segment))
+        except OSError:
+            pass
+        finally:
+            self.compacting = False
+
+    def write_snapshot(self, state, next_segment):
+        temp_path = self.snapshot_path + ".tmp"
+        with open(temp_path, "w") as f:
+            json.dump({"next_segment": next_segment, "state": state}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.snapshot_path)
+
+    def close(self):
+        """Commit outstanding records and stop the group-commit thread."""
+        self.closed.set()
+        with self.lock:
+            if self.file:
+                self.commit()
+                self.file.close()
+                self.file = None
+
+class NoteStore:
+    """SQLite store for notes with an FTS5 full-text index.
+
+    Reads are paginated (recent, search) or streamed in id order
+    (iter_notes), so their cost doesn't grow with the number of notes.
+    Falls back to LIKE queries where SQLite was built without FTS5.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        with self.connection:
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS notes (id INTEGER PRIMARY KEY, created TEXT NOT NULL, body TEXT NOT NULL)"
+            )
+            self.connection.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        try:
+            with self.connection:
+                self.connection.execute(
+                    "CREATE VIRTUAL TABLE IF NOT EXISTS notes_fts USING fts5(body, content='notes', content_rowid='id')"
+                )
+                self.connection.execute(
+                    "CREATE TRIGGER IF NOT EXISTS notes_ai AFTER INSERT ON notes BEGIN "
+                    "INSERT INTO notes_fts(rowid, body) VALUES (new.id, new.body); END"
+                )
+                self.connection.execute(
+                    "CREATE TRIGGER IF NOT EXISTS notes_ad AFTER DELETE ON notes BEGIN "
+                    "INSERT INTO notes_fts(notes_fts, rowid, body) VALUES ('delete', old.id, old.body); END"
+                )
+            self.fts = True
+        except sqlite3.OperationalError:
+            self.fts = False
+
+    def add(self, body, created=None):
+        """Store a note and return its id."""
+        created = created or dt.now().strftime("%Y-%m-%d %H:%M:%S")
+        with self.connection:
+            cursor = self.connection.execute("INSERT INTO notes (created, body) VALUES (?, ?)", (created, body))
+        return cursor.lastrowid
+
+    def count(self):
+        return self.connection.execute("SELECT COUNT(*) FROM notes").fetchone()[0]
+
+    def recent(self, limit=10, offset=0):
+        """Return (created, body) for a page of notes, newest first."""
+        return self.connection.execute(
+            "SELECT created, body FROM notes ORDER BY id DESC LIMIT ? OFFSET ?", (limit, offset)
+        ).fetchall()
+
+    def search(self, query, limit=10):
+        """Return (created, body) for the newest notes containing every query word."""
+        words = re.findall(r"\w+", query)
+        if not words:
+            return []
+        if self.fts:
+            expression = " ".join(f'"{word}"' for word in words)
+            return self.connection.execute(
+                "SELECT notes.created, notes.body FROM notes_fts JOIN notes ON notes.id = notes_fts.rowid "
+                "WHERE notes_fts MATCH ? ORDER BY notes_fts.rowid DESC LIMIT ?", (expression, limit)
+            ).fetchall()
+        clauses = " AND ".join("body LIKE ?" for _ in words)
+        return self.connection.execute(
+            f"SELECT created, body FROM notes WHERE {clauses} ORDER BY id DESC LIMIT ?",
+            [f"%{word}%" for word in words] + [limit]
+        ).fetchall()
+
+    def iter_notes(self, batch_size=500):
+        """Yield (created, body) for every note, oldest first, one batch at a time."""
+        last_id = 0
+        while True:
+            rows = self.connection.execute(
+                "SELECT id, created, body FROM notes WHERE id > ? ORDER BY id LIMIT ?", (last_id, batch_size)
+            ).fetchall()
+            if not rows:
+                return
+            for _, created, body in rows:
+                yield created, body
+            last_id = rows[-1][0]
+
+    def import_text_file(self, path):
+        """Import a legacy '[timestamp] note' text file once; return the number imported."""
+        key = f"imported:{os.path.abspath(path)}"
+        if not os.path.exists(path) or self.connection.execute(
+                "SELECT 1 FROM meta WHERE key = ?", (key,)).fetchone():
+            return 0
+        rows = []
+        with open(path, "r") as f:
+            for line in f:
+                line = line.rstrip("\n")
+                match = re.match(r"\[(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})\] (.*)", line)
+                if match:
+                    rows.append(match.groups())
+                elif line and rows:
+                    rows[-1] = (rows[-1][0], rows[-1][1] + "\n" + line)
+        with self.connection:
+            self.connection.executemany("INSERT INTO notes (created, body) VALUES (?, ?)", rows)
+            self.connection.execute("INSERT INTO meta (key, value) VALUES (?, ?)", (key, str(len(rows))))
+        return len(rows)
+
+    def close(self):
+        self.connection.close()
+
+KB_STOPWORDS = frozenset(
+    "a an and are as at be by for from had has have he her his in is it its of on or she that the their "
+    "this to was were which who with".split()
+)
+KB_WIKI_MARKUP = [
+    (re.compile(r"\{\|.*?\|\}", re.S), ""),  # tables
+    (re.compile(r"<ref[^>]*/>|<ref.*?</ref>", re.S), ""),
+    (re.compile(r"<[^>]+>"), ""),
+    (re.compile(r"\[\[(?:File|Image|Category):[^\]]*\]\]"), ""),
+    (re.compile(r"\[\[(?:[^|\]]*\|)?([^\]]+)\]\]"), r"\1"),
+    (re.compile(r"\[https?://\S+ ([^\]]+)\]"), r"\1"),
+    (re.compile(r"'{2,}"), ""),
+    (re.compile(r"^=+.*?=+\s*$", re.M), ""),
+]
+KB_TEMPLATE_RE = re.compile(r"\{\{[^{}]*\}\}")
+KB_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+
+
+class KnowledgeBase:
+    """Offline article index with BM25 ranking over memory-mapped postings.
+
+    build() writes terms.txt ("term\tstart\tdf" lines, sorted) with
+    terms.idx (the offset of every TERMS_BLOCK-th line), postings.bin
+    (uint32 doc ids grouped by term), weights.bin (the matching float32
+    BM25 term weights), docs.bin/docs.idx (title and summary per article)
+    and meta.json. A query reads only the dictionary block and the
+    postings of its own terms.
+    """
+    K1 = 1.2
+    B = 0.75
+    TITLE_WEIGHT = 3
+    RUN_TOKENS = 2000000  # tokens indexed in memory before a sorted run is written to disk
+    TERMS_BLOCK = 128
+    FILES = ("terms.txt", "terms.idx", "postings.bin", "weights.bin", "docs.bin", "docs.idx", "meta.json")
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.lock = threading.Lock()
+        self.terms = None
+        self.term_offsets = None
+        self.term_keys = None
+        self.meta = None
+        self.postings = None
+        self.weights = None
+        self.docs = None
+        self.doc_offsets = None
+        self.scores = None
+        self.matched = None
+
+    @staticmethod
+    def tokens(text):
+        return [t for t in re.findall(r"\w+", text.lower()) if len(t) > 1 and t not in KB_STOPWORDS]
+
+    @staticmethod
+    def summarize(text, limit=400):
+        """First sentences of text, up to about limit characters."""
+        summary = ""
+        for sentence in KB_SENTENCE_RE.split(" ".join(text.split())):
+            if summary and len(summary) + len(sentence) > limit:
+                break
+            summary = f"{summary} {sentence}".strip()
+        return summary[:limit]
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    def is_built(self):
+        # Indexes from before the on-disk term dictionary have no terms.txt and need rebuilding
+        return os.path.exists(self.path("meta.json")) and os.path.exists(self.path("terms.txt"))
+
+    def is_open(self):
+        return self.terms is not None
+
+    def open(self):
+        with self.lock:
+            self.close_files()
+            with open(self.path("meta.json"), "r") as f:
+                self.meta = json.load(f)
+            self.terms = self.map_file("terms.txt")
+            self.term_offsets = np.fromfile(self.path("terms.idx"), dtype=np.uint64)
+            # Only the first term of every block stays in memory, for the binary search
+            self.term_keys = [bytes(self.terms[offset:self.terms.find(b"\t", offset)])
+                              for offset in map(int, self.term_offsets)]
+            self.postings = self.map_file("postings.bin")
+            self.weights = self.map_file("weights.bin")
+            self.docs = self.map_file("docs.bin")
+            self.doc_offsets = np.fromfile(self.path("docs.idx"), dtype=np.uint64)
+            self.scores = np.zeros(self.meta["documents"], dtype=np.float32)
+            self.matched = np.zeros(self.meta["documents"], dtype=np.uint8)
+
+    def map_file(self, name):
+        with open(self.path(name), "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return b""
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def close_files(self):
+        for mapped in (self.terms, self.postings, self.weights, self.docs):
+            if isinstance(mapped, mmap.mmap):
+                mapped.close()
+        self.terms = self.term_keys = self.postings = self.weights = self.docs = None
+
+    def close(self):
+        with self.lock:
+            self.close_files()
+
+    def lookup(self, term):
+        """(start, df) of term in the postings, or None (called with the lock held)."""
+        key = term.encode("utf-8")
+        block = bisect.bisect_right(self.term_keys, key) - 1
+        if block < 0:
+            return None
+        start = int(self.term_offsets[block])
+        end = int(self.term_offsets[block + 1]) if block + 1 < len(self.term_offsets) else len(self.terms)
+        for line in bytes(self.terms[start:end]).split(b"\n"):
+            fields = line.split(b"\t")
+            if fields[0] == key:
+                return int(fields[1]), int(fields[2])
+        return None
+
+    def iter_terms(self):
+        """(term, start, df) for every indexed term, in sorted order, read from disk."""
+        with open(self.path("terms.txt"), "r", encoding="utf-8") as f:
+            for line in f:
+                term, start, df = line.rstrip("\n").split("\t")
+                yield term, int(start), int(df)
+
+    def build(self, articles):
+        """Index an iterable of (title, text) and switch to the new index. Returns the article count.
+
+        Postings are collected for RUN_TOKENS tokens at a time and written
+        as a run sorted by term; the runs are then merged into the final
+        files, so memory stays bounded however large the corpus is.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        runs_dir = self.path("runs.new")
+        shutil.rmtree(runs_dir, ignore_errors=True)
+        os.makedirs(runs_dir)
+        runs = []
+        doc_lengths = array.array("I")
+        doc_offsets = array.array("Q")
+        term_ids = {}
+        tokens = array.array("I")  # term id of every token in the current run, article by article
+        first_doc = 0
+        try:
+            with open(self.path("docs.bin.new"), "wb") as docs:
+                for title, text in articles:
+                    words = self.tokens(text) + self.tokens(title) * self.TITLE_WEIGHT
+                    tokens.extend([term_ids.setdefault(word, len(term_ids)) for word in words])
+                    doc_lengths.append(len(words))
+                    doc_offsets.append(docs.tell())
+                    docs.write(f"{' '.join(title.split())}\t{self.summarize(text)}\n".encode("utf-8"))
+                    if len(tokens) >= self.RUN_TOKENS:
+                        runs.append(self.write_run(os.path.join(runs_dir, str(len(runs))), term_ids, tokens,
+                                                   doc_lengths[first_doc:], first_doc))
+                        term_ids, tokens, first_doc = {}, array.array("I"), len(doc_lengths)
+                if first_doc < len(doc_lengths):
+                    runs.append(self.write_run(os.path.join(runs_dir, str(len(runs))), term_ids, tokens,
+                                               doc_lengths[first_doc:], first_doc))
+            del term_ids, tokens
+            with open(self.path("docs.idx.new"), "wb") as f:
+                doc_offsets.tofile(f)
+
+            documents = len(doc_lengths)
+            lengths = np.frombuffer(doc_lengths, dtype=np.uint32).astype(np.float32)
+            avgdl = float(lengths.mean()) if documents else 0.0
+            norm = self.K1 * (1 - self.B + self.B * lengths / (avgdl or 1.0))
+            term_count = self.merge_runs(runs, norm)
+            with open(self.path("meta.json.new"), "w") as f:
+                json.dump({"documents": documents, "avgdl": avgdl, "terms": term_count, "built": time.time()}, f)
+        finally:
+            shutil.rmtree(runs_dir, ignore_errors=True)
+
+        with self.lock:
+            self.close_files()
+            for name in self.FILES:
+                os.replace(self.path(name + ".new"), self.path(name))
+        self.open()
+        return documents
+
+    @staticmethod
+    def write_run(prefix, term_ids, tokens, doc_lengths, first_doc):
+        """Write one run: prefix.terms ("term\tdf" lines, sorted), prefix.docs and prefix.tf (grouped by term)."""
+        documents = len(doc_lengths)
+        doc_of_token = np.repeat(np.arange(documents, dtype=np.uint64), np.frombuffer(doc_lengths, dtype=np.uint32))
+        # Count (term, doc) pairs in one pass; sorting the pair keys groups postings by term, then doc
+        keys, tf = np.unique(np.frombuffer(tokens, dtype=np.uint32).astype(np.uint64) * documents + doc_of_token,
+                             return_counts=True)
+        term_of = (keys // documents).astype(np.uint32)
+        doc_ids = (keys % documents).astype(np.uint32) + first_doc
+        # Runs are merged by term text, so put the terms in sorted order (stable, to keep doc order within a term)
+        words = sorted(term_ids)
+        rank = np.empty(len(words), dtype=np.uint32)
+        rank[np.fromiter((term_ids[word] for word in words), dtype=np.int64, count=len(words))] = np.arange(
+            len(words), dtype=np.uint32)
+        order = np.argsort(rank[term_of], kind="stable")
+        doc_ids[order].tofile(prefix + ".docs")
+        tf[order].astype(np.uint32).tofile(prefix + ".tf")
+        df = np.bincount(term_of, minlength=len(words))
+        with open(prefix + ".terms", "w", encoding="utf-8") as f:
+            f.writelines(f"{word}\t{df[term_ids[word]]}\n" for word in words if df[term_ids[word]])
+        return prefix
+
+    @staticmethod
+    def read_run(number, prefix):
+        with open(prefix + ".terms", "r", encoding="utf-8") as f:
+            for line in f:
+                term, df = line.rstrip("\n").split("\t")
+                yield term, number, int(df)
+
+    def merge_runs(self, runs, norm, flush_postings=1000000):
+        """Merge sorted runs into terms.txt/.idx, postings.bin and weights.bin (.new); returns the term count."""
+        def load(prefix, suffix):
+            if os.path.getsize(prefix + suffix) == 0:
+                return np.empty(0, dtype=np.uint32)
+            return np.memmap(prefix + suffix, dtype=np.uint32, mode="r")
+
+        run_docs = [load(prefix, ".docs") for prefix in runs]
+        run_tf = [load(prefix, ".tf") for prefix in runs]
+        cursors = [0] * len(runs)
+        term_offsets = array.array("Q")
+        pending_docs, pending_tf = [], []
+        pending = 0
+        start = 0
+        term_count = 0
+
+        def flush():
+            if not pending_docs:
+                return
+            doc_ids = np.concatenate(pending_docs)
+            tf = np.concatenate(pending_tf).astype(np.float32)
+            doc_ids.tofile(postings)
+            (tf * (self.K1 + 1) / (tf + norm[doc_ids])).astype(np.float32).tofile(weights)
+            pending_docs.clear()
+            pending_tf.clear()
+
+        with open(self.path("postings.bin.new"), "wb") as postings, \
+                open(self.path("weights.bin.new"), "wb") as weights, \
+                open(self.path("terms.txt.new"), "wb") as terms:
+            merged = heapq.merge(*(self.read_run(number, prefix) for number, prefix in enumerate(runs)))
+            for term, entries in itertools.groupby(merged, key=lambda entry: entry[0]):
+                df = 0
+                # Runs cover consecutive articles, so taking them in run order keeps doc ids ascending
+                for _, number, count in entries:
+                    cursor = cursors[number]
+                    pending_docs.append(run_docs[number][cursor:cursor + count])
+                    pending_tf.append(run_tf[number][cursor:cursor + count])
+                    cursors[number] = cursor + count
+                    df += count
+                if term_count % self.TERMS_BLOCK == 0:
+                    term_offsets.append(terms.tell())
+                terms.write(f"{term}\t{start}\t{df}\n".encode("utf-8"))
+                term_count += 1
+                start += df
+                pending += df
+                # Also bound the number of slices held, since rare terms add one small array per run
+                if pending >= flush_postings or len(pending_docs) >= 65536:
+                    flush()
+                    pending = 0
+            flush()
+        with open(self.path("terms.idx.new"), "wb") as f:
+            term_offsets.tofile(f)
+        del run_docs, run_tf
+        return term_count
+
+    def search(self, query, limit=5, min_match=0.0):
+        """Return [(score, title, summary)] best first.
+
+        min_match is the fraction of the query's words an article must contain.
+        """
+        words = list(dict.fromkeys(self.tokens(query)))
+        with self.lock:
+            if not words or self.terms is None:
+                return []
+            required = max(1, int(np.ceil(min_match * len(words))))
+            documents = self.meta["documents"]
+            touched = []
+            for word in words:
+                entry = self.lookup(word)
+                if entry is None:
+                    continue
+                start, df = entry
+                ids = np.frombuffer(self.postings, dtype=np.uint32, count=df, offset=4 * start)
+                weights = np.frombuffer(self.weights, dtype=np.float32, count=df, offset=4 * start)
+                idf = np.log(1 + (documents - df + 0.5) / (df + 0.5))
+                self.scores[ids] += idf * weights
+                self.matched[ids] += 1
+                touched.append(ids)
+            candidates = np.concatenate(touched) if len(touched) >= required else np.empty(0, dtype=np.uint32)
+            if required > 1:
+                candidates = candidates[self.matched[candidates] >= required]
+            scores = self.scores[candidates]
+            for ids in touched:
+                self.scores[ids] = 0
+                self.matched[ids] = 0
+            # A document appears once per matching word, so take enough to fill limit after de-duplication
+            take = min(len(scores), limit * len(touched))
+            top = np.argpartition(-scores, take - 1)[:take] if 0 < take < len(scores) else np.arange(take)
+            results = []
+            seen = set()
+            for i in sorted(top, key=lambda i: -scores[i]):
+                doc_id = int(candidates[i])
+                if doc_id in seen:
+                    continue
+                seen.add(doc_id)
+                start = int(self.doc_offsets[doc_id])
+                end = int(self.doc_offsets[doc_id + 1]) if doc_id + 1 < documents else len(self.docs)
+                title, summary = bytes(self.docs[start:end]).decode("utf-8").rstrip("\n").split("\t", 1)
+                results.append((float(scores[i]), title, summary))
+                if len(results) == limit:
+                    break
+            return results
+
+    @staticmethod
+    def articles_from(path):
+        """(title, text) pairs from a directory of text files, a JSONL file or a MediaWiki XML dump (.bz2 ok)."""
+        if os.path.isdir(path):
+            return KnowledgeBase.iter_text_directory(path)
+        if path.endswith((".jsonl", ".json")):
+            return KnowledgeBase.iter_jsonl(path)
+        return KnowledgeBase.iter_wiki_dump(path)
+
+    @staticmethod
+    def iter_text_directory(path):
+        for root, _, files in os.walk(path):
+            for name in sorted(files):
+                if name.endswith((".txt", ".md")):
+                    with open(os.path.join(root, name), "r", encoding="utf-8", errors="replace") as f:
+                        yield os.path.splitext(name)[0].replace("_", " "), f.read()
+
+    @staticmethod
+    def iter_jsonl(path):
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    article = json.loads(line)
+                    yield article.get("title", ""), article.get("text") or article.get("summary", "")
+
+    @staticmethod
+    def iter_wiki_dump(path):
+        opener = bz2.open if path.endswith(".bz2") else open
+        with opener(path, "rb") as f:
+            title = namespace = root = None
+            for event, elem in ET.iterparse(f, events=("start", "end")):
+                if event == "start":
+                    if root is None:
+                        root = elem
+                    continue
+                tag = elem.tag.rsplit("}", 1)[-1]
+                if tag == "title":
+                    title = elem.text or ""
+                elif tag == "ns":
+                    namespace = elem.text
+                elif tag == "text":
+                    text = elem.text or ""
+                    if namespace in (None, "0") and not text.lstrip().upper().startswith("#REDIRECT"):
+                        yield title, KnowledgeBase.strip_wiki_markup(text)
+                elif tag == "page":
+                    # Clearing the page is not enough: the root would keep an empty element per page
+                    elem.clear()
+                    root.clear()
+                    title = namespace = None
+
+    @staticmethod
+    def strip_wiki_markup(text):
+        for _ in range(5):
+            text, found = KB_TEMPLATE_RE.subn("", text)
+            if not found:
+                break
+        for pattern, replacement in KB_WIKI_MARKUP:
+            text = pattern.sub(replacement, text)
+        return text.strip()
+
+
+class TaskCancelled(Exception):
+    """Raised inside a background task once it is cancelled or past its deadline."""
+
+
+class BackgroundTask:
+    """Work submitted to a TaskExecutor; also serves as its cancellation token."""
+    def __init__(self, executor, name, func, args, lane, deadline, on_done, show_progress):
+        self.executor = executor
+        self.name = name
+        self.func = func
+        self.args = args
+        self.lane = lane
+        self.deadline = time.monotonic() + deadline if deadline else None
+        self.on_done = on_done
+        self.show_progress = show_progress
+        self.cancel_event = threading.Event()
+        self.submitted = time.monotonic()
+        self.started = None
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def expired(self):
+        return self.deadline is not None and time.monotonic() > self.deadline
+
+    def cancelled(self):
+        return self.cancel_event.is_set() or self.expired()
+
+    def check(self):
+        """Raise TaskCancelled if the task should stop; call between steps of long work."""
+        if self.cancel_event.is_set():
+            raise TaskCancelled(f"{self.name} was cancelled")
+        if self.expired():
+            raise TaskCancelled(f"{self.name} passed its deadline")
+
+    def report(self, percent):
+        self.executor.task_progress.emit(self, int(percent))
+
+    def progress(self, stages=1):
+        return ProgressReporter(self, stages)
+
+
+class ProgressReporter:
+    """Throttled, thread-safe progress for a BackgroundTask.
+
+    Work is split into equal stages; within a stage, progress is fed as units
+    done out of a total (bytes received or written). The task sees at most one
+    update per interval, plus every stage boundary. Updates also check for
+    cancellation, so a long download stops as soon as its task is cancelled.
+    """
+    def __init__(self, task, stages=1, interval=0.05):
+        self.task = task
+        self.stages = max(1, stages)
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.stage = 0
+        self.total = None
+        self.done = 0
+        self.last_percent = -1
+        self.last_emit = 0.0
+
+    def set_total(self, total):
+        with self.lock:
+            self.total = total or None
+
+    def update(self, done):
+        self.task.check()
+        with self.lock:
+            self.done = done
+            self.emit()
+
+    def advance(self, amount):
+        with self.lock:
+            done = self.done + amount
+        self.update(done)
+
+    def next_stage(self):
+        with self.lock:
+            self.stage = min(self.stage + 1, self.stages)
+            self.total = None
+            self.done = 0
+            self.emit(force=True)
+
+    def finish(self):
+        with self.lock:
+            self.stage = self.stages
+            self.emit(force=True)
+
+    def percent(self):
+        fraction = min(1.0, self.done / self.total) if self.total else 0.0
+        return int(100 * (self.stage + fraction) / self.stages)
+
+    def emit(self, force=False):
+        """Report the current percentage (called with the lock held)."""
+        percent = self.percent()
+        now = time.monotonic()
+        if percent == self.last_percent or not (force or percent >= 100 or now - self.last_emit >= self.interval):
+            return
+        self.last_percent = percent
+        self.last_emit = now
+        self.task.report(percent)
+
+
+class TaskExecutor(QObject):
+    """Fixed pool of worker threads with a user-facing and a background lane.
+
+    Queued user tasks are always taken first, and background tasks occupy at
+    most max_background workers so long jobs cannot starve commands. Signals
+    are emitted on the workers and, since the executor lives on the GUI
+    thread, delivered there through queued connections; on_done callbacks run
+    on the GUI thread too.
+    """
+    LANE_USER = "user"
+    LANE_BACKGROUND = "background"
+    task_started = pyqtSignal(object)
+    task_progress = pyqtSignal(object, int)
+    task_finished = pyqtSignal(object, object, object)  # task, result, error
+
+    def __init__(self, workers=4, max_background=2):
+        super().__init__()
+        self.max_background = max(1, min(max_background, workers - 1))
+        self.condition = threading.Condition()
+        self.queues = {self.LANE_USER: collections.deque(), self.LANE_BACKGROUND: collections.deque()}
+        self.running = []
+        self.running_background = 0
+        self.stopping = False
+        self.completed = 0
+        self.wait_ms = collections.deque(maxlen=100)
+        self.run_ms = collections.deque(maxlen=100)
+        self.task_finished.connect(self.deliver)
+        self.workers = [
+            threading.Thread(target=self.worker_loop, name=f"worker-{i}", daemon=True) for i in range(workers)
+        ]
+        for worker in self.workers:
+            worker.start()
+
+    def submit(self, func, *args, name=None, lane=LANE_USER, deadline=None, on_done=None, show_progress=False):
+        """Queue func(task, *args). deadline is in seconds from now; on_done(result, error) runs on the GUI thread."""
+        task = BackgroundTask(self, name or func.__name__, func, args, lane, deadline, on_done, show_progress)
+        with self.condition:
+            self.queues[lane].append(task)
+            self.condition.notify()
+        return task
+
+    def next_task(self):
+        if self.queues[self.LANE_USER]:
+            return self.queues[self.LANE_USER].popleft()
+        if self.queues[self.LANE_BACKGROUND] and self.running_background < self.max_background:
+            return self.queues[self.LANE_BACKGROUND].popleft()
+        return None
+
+    def worker_loop(self):
+        while True:
+            with self.condition:
+                task = self.next_task()
+                while task is None and not self.stopping:
+                    self.condition.wait()
+                    task = self.next_task()
+                if task is None:
+                    return
+                self.running.append(task)
+                if task.lane == self.LANE_BACKGROUND:
+                    self.running_background += 1
+            self.run(task)
+            with self.condition:
+                self.running.remove(task)
+                if task.lane == self.LANE_BACKGROUND:
+                    self.running_background -= 1
+                    self.condition.notify()
+
+    def run(self, task):
+        task.started = time.monotonic()
+        self.wait_ms.append((task.started - task.submitted) * 1000)
+        result = error = None
+        try:
+            task.check()
+            self.task_started.emit(task)
+            result = task.func(task, *task.args)
+        except Exception as e:
+            error = e
+        self.run_ms.append((time.monotonic() - task.started) * 1000)
+        self.task_finished.emit(task, result, error)
+
+    def deliver(self, task, result, error):
+        self.completed += 1
+        if task.on_done:
+            task.on_done(result, error)
+
+    def cancel_all(self, lane=None):
+        """Cancel queued and running tasks (of one lane, or all). Returns how many were cancelled."""
+        with self.condition:
+            dropped = []
+            for name, queued in self.queues.items():
+                if lane in (None, name):
+                    dropped.extend(queued)
+                    queued.clear()
+            running = [task for task in self.running if lane in (None, task.lane)]
+        for task in running:
+            task.cancel()
+        for task in dropped:
+            task.cancel()
+            self.task_finished.emit(task, None, TaskCancelled(f"{task.name} was cancelled"))
+        return len(dropped) + len(running)
+
+    def snapshot(self):
+        """(name, lane, state, seconds since submitted) for every queued and running task."""
+        now = time.monotonic()
+        with self.condition:
+            tasks = [(task, "running") for task in self.running]
+            tasks += [(task, "queued") for queued in self.queues.values() for task in queued]
+        return [(task.name, task.lane, state, now - task.submitted) for task, state in tasks]
+
+    def stats(self):
+        with self.condition:
+            queued = sum(len(queued) for queued in self.queues.values())
+            running = len(self.running)
+        return {
+            "queued": queued,
+            "running": running,
+            "completed": self.completed,
+            "avg_wait_ms": sum(self.wait_ms) / len(self.wait_ms) if self.wait_ms else 0.0,
+            "avg_run_ms": sum(self.run_ms) / len(self.run_ms) if self.run_ms else 0.0,
+        }
+
+    def shutdown(self, timeout=2.0):
+        """Cancel everything and wait up to timeout seconds for the running tasks to return."""
+        self.cancel_all()
+        with self.condition:
+            self.stopping = True
+            self.condition.notify_all()
+        deadline = time.monotonic() + timeout
+        for worker in self.workers:
+            if worker is not threading.current_thread():
+                worker.join(max(0.0, deadline - time.monotonic()))
+
+
 class VoiceThread(QThread):
-    """Thread for handling voice recognition."""
+    """Thread for handling voice recognition.
+
+    In persistent mode the microphone stays open between commands: the noise
+    floor is calibrated once and utterances are cut from the live stream, so
+    arming the thread for another command doesn't reopen the device.
+    """
     finished_signal = pyqtSignal(str)
     listening_signal = pyqtSignal(bool)
     error_signal = pyqtSignal(str)
 
-    def __init__(self):
+    def __init__(self, persistent=False, continuous=False, backend=None):
         super().__init__()
         self.recognizer = sr.Recognizer()
+        self.backend = backend or GoogleRecognizerBackend()
         self.microphone = sr.Microphone()
         self.is_listening = False
+        self.persistent = persistent
+        self.continuous = continuous
+        self.listen_timeout = 5
+        self.armed_at = None
+        self.running = False
+
+    def arm(self):
+        """Accept the next utterance from the stream."""
+        self.armed_at = time.time()
+        self.is_listening = True
+        self.listening_signal.emit(True)
+
+    def disarm(self):
+        """Stop accepting utterances until armed again."""
+        self.armed_at = None
+        self.is_listening = False
+        self.listening_signal.emit(False)
+
+    def stop(self):
+        """Ask the persistent capture loop to close the microphone and exit."""
+        self.running = False
 
     def run(self):
+        if self.persistent:
+            self.run_persistent()
+        else:
+            self.run_once()
+
+    def run_once(self):
+        """Open the microphone, listen for one phrase and exit."""
         self.is_listening = True
         self.listening_signal.emit(True)
         try:
             with self.microphone as source:
                 self.recognizer.adjust_for_ambient_noise(source)
-                audio = self.recognizer.listen(source, timeout=5)
+                audio = self.recognizer.listen(source, timeout=self.listen_timeout)
             self.is_listening = False
             self.listening_signal.emit(False)
-            try:
-                text = self.recognizer.recognize_google(audio)
+            self.recognize(audio)
+        except Exception as e:
+            self.error_signal.emit(f"Microphone error: {str(e)}")
+
+    def run_persistent(self):
+        """Keep one stream open and emit each utterance heard while armed."""
+        self.running = True
+        batcher = RecognitionBatcher(self.backend, self.finished_signal.emit, self.error_signal.emit)
+        batcher.start()
+        try:
+            with self.microphone as source:
+                vad = EnergyVAD(source.SAMPLE_RATE, source.SAMPLE_WIDTH, source.CHUNK)
+                calibration_chunks = max(1, int(source.SAMPLE_RATE / source.CHUNK))
+                vad.calibrate([source.stream.read(source.CHUNK) for _ in range(calibration_chunks)])
+                if self.continuous:
+                    self.arm()
+                elif self.armed_at is not None:
+                    self.armed_at = time.time()
+                while self.running:
+                    frame_data = vad.process(source.stream.read(source.CHUNK))
+                    if self.armed_at is None:
+                        continue
+                    if frame_data is not None:
+                        if not self.continuous:
+                            self.disarm()
+                        batcher.submit(sr.AudioData(frame_data, source.SAMPLE_RATE, source.SAMPLE_WIDTH))
+                    elif (not self.continuous and not vad.in_speech
+                          and time.time() - self.armed_at > self.listen_timeout):
+                        self.disarm()
+                        self.error_signal.emit("No speech detected")
+        except Exception as e:
+            self.error_signal.emit(f"Microphone error: {str(e)}")
+        finally:
+            batcher.stop()
+            self.running = False
+            self.is_listening = False
+
+    def recognize(self, audio):
+        """Transcribe audio and emit the text or an error."""
+        try:
+            text = self.backend.transcribe_batch([audio])[0]
+            if text:
                 self.finished_signal.emit(text)
-            except sr.UnknownValueError:
+            else:
                 self.error_signal.emit("Could not understand audio")
-            except sr.RequestError as e:
-                self.error_signal.emit(f"Could not request results; {e}")
+        except sr.RequestError as e:
+            self.error_signal.emit(f"Could not request results; {e}")
         except Exception as e:
-            self.error_signal.emit(f"Microphone error: {str(e)}")
+            self.error_signal.emit(f"Recognition error: {str(e)}")
+
+class LogSink(threading.Thread):
+    """Background writer for log files with buffering and size-based rotation.
+
+    Records are queued by write() and written by this thread through a
+    buffered handle that is flushed every flush_interval seconds or once
+    flush_bytes are pending. Dicts are written as JSON lines, strings as-is.
+    """
+    def __init__(self, path, max_bytes=1024 * 1024, backups=5, flush_interval=2.0, flush_bytes=64 * 1024):
+        super().__init__(daemon=True)
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.flush_interval = flush_interval
+        self.flush_bytes = flush_bytes
+        self.records = queue.Queue()
+        self.file = None
+        self.size = 0  # bytes in the current file, tracked so rotation needs no tell()
+        self.pending_bytes = 0
+        self.last_flush = time.time()
+
+    def write(self, record):
+        self.records.put(record)
+
+    def close(self, timeout=2.0):
+        """Flush what is queued and stop the thread."""
+        self.records.put(None)
+        if self.is_alive():
+            self.join(timeout)
+
+    def run(self):
+        while True:
+            timeout = None
+            if self.pending_bytes:
+                timeout = max(0.0, self.last_flush + self.flush_interval - time.time())
+            try:
+                record = self.records.get(timeout=timeout)
+            except queue.Empty:
+                self.flush()
+                continue
+            if record is None:
+                self.flush()
+                if self.file:
+                    self.file.close()
+                return
+            try:
+                self.write_line(record if isinstance(record, str) else json.dumps(record) + "\n")
+            except OSError:
+                pass
+
+    def write_line(self, line):
+        if self.file is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self.file = open(self.path, "a", buffering=self.flush_bytes)
+            self.size = os.path.getsize(self.path)
+        self.file.write(line)
+        self.pending_bytes += len(line)
+        self.size += len(line.encode())
+        if self.pending_bytes >= self.flush_bytes:
+            self.flush()
+        if self.size >= self.max_bytes:
+            self.rotate()
+
+    def flush(self):
+        if self.file and self.pending_bytes:
+            try:
+                self.file.flush()
+            except OSError:
+                pass
+        self.pending_bytes = 0
+        self.last_flush = time.time()
+
+    def rotate(self):
+        """Move path to path.1 (shifting older backups up) and start a new file."""
+        self.flush()
+        self.file.close()
+        self.file = None
+        self.size = 0
+        for n in range(self.backups - 1, 0, -1):
+            if os.path.exists(f"{self.path}.{n}"):
+                os.replace(f"{self.path}.{n}", f"{self.path}.{n + 1}")
+        if self.backups:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+
+class LogModel(QAbstractListModel):
+    """Fixed-capacity ring buffer of log lines for a virtualized list view.
+
+    When full, the oldest tenth of the lines is handed to a spill LogSink. An
+    inverted index from the trigrams of each line's lowercase words to line
+    sequence numbers serves substring search without scanning the buffer.
+    """
+    def __init__(self, capacity=5000, spill_sink=None):
+        super().__init__()
+        self.capacity = capacity
+        self.entries = collections.deque()
+        self.first_seq = 0  # sequence number of entries[0]
+        self.index = {}
+        self.spill_sink = spill_sink
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.entries)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and index.isValid():
+            return self.entries[index.row()]
+        return None
+
+    def grams(self, text):
+        """Trigrams of the words in text; words shorter than three letters have none."""
+        grams = set()
+        for word in re.findall(r"\w{3,}", text.lower()):
+            grams.update(word[i:i + 3] for i in range(len(word) - 2))
+        return grams
+
+    def append(self, entry):
+        """Add an entry; each line of a multi-line entry becomes its own row."""
+        lines = entry.split("\n")
+        lines = [lines[0]] + ["    " + line for line in lines[1:]]
+        if len(self.entries) + len(lines) > self.capacity:
+            self.evict(max(self.capacity // 10, len(self.entries) + len(lines) - self.capacity))
+        row = len(self.entries)
+        self.beginInsertRows(QModelIndex(), row, row + len(lines) - 1)
+        for offset, line in enumerate(lines):
+            self.entries.append(line)
+            for gram in self.grams(line):
+                self.index.setdefault(gram, set()).add(self.first_seq + row + offset)
+        self.endInsertRows()
+
+    def evict(self, count):
+        """Move the oldest lines out of the buffer and into the spill file."""
+        count = min(count, len(self.entries))
+        if not count:
+            return
+        self.beginRemoveRows(QModelIndex(), 0, count - 1)
+        evicted = [self.entries.popleft() for _ in range(count)]
+        for offset, line in enumerate(evicted):
+            for gram in self.grams(line):
+                postings = self.index.get(gram)
+                if postings:
+                    postings.discard(self.first_seq + offset)
+                    if not postings:
+                        del self.index[gram]
+        self.first_seq += count
+        self.endRemoveRows()
+        self.spill(evicted)
+
+    def spill(self, lines):
+        if self.spill_sink:
+            self.spill_sink.write("\n".join(lines) + "\n")
+
+    def find(self, term):
+        """Return the rows containing term (case-insensitive), oldest first.
+
+        Any run of three or more word characters in term is a substring of a
+        word in a matching line, so its trigrams narrow down the candidates;
+        terms without one scan the (bounded) buffer.
+        """
+        term = term.lower()
+        if not term.strip():
+            return []
+        grams = self.grams(term)
+        if grams:
+            postings = [self.index.get(gram, set()) for gram in grams]
+            rows = [seq - self.first_seq for seq in sorted(set.intersection(*sorted(postings, key=len)))]
+        else:
+            rows = range(len(self.entries))
+        return [row for row in rows if term in self.entries[row].lower()]
+
+    def text(self, rows=None):
+        """Return the given rows (or the whole buffer) as plain text."""
+        if rows is None:
+            return "\n".join(self.entries)
+        return "\n".join(self.entries[row] for row in rows)
+
+    def clear(self):
+        self.beginResetModel()
+        self.first_seq += len(self.entries)
+        self.entries.clear()
+        self.index.clear()
+        self.endResetModel()
+
+# (connect, read) timeouts in seconds per kind of request
+HTTP_TIMEOUTS = {
+    "default": (3.05, 10),
+    "weather": (3.05, 5),
+    "bookmark": (3.05, 5),
+    "scrape": (3.05, 15),
+    "search": (3.05, 10),
+    "radio": (3.05, 10),  # a stream silent this long is reconnected
+}
+
+
+class HttpClient:
+    """Shared HTTP client with keep-alive pools per host and per-host stats.
+
+    Uses httpx with HTTP/2 when httpx and h2 are installed and a pooled
+    requests.Session otherwise. Transport errors are raised as
+    requests.RequestException either way. The backend (and its import) is
+    set up on the first request.
+    """
+    def __init__(self, pool_hosts=16, pool_size=8, user_agent="Mozilla/5.0"):
+        self.headers = {"User-Agent": user_agent}
+        self.pool_hosts = pool_hosts
+        self.pool_size = pool_size
+        self.http2 = http2_available
+        self.lock = threading.Lock()
+        self.host_stats = {}
+        self.pool_connections = {}
+        self.connected = False
+        self.client = None
+        self.session = None
+
+    def connect(self):
+        with self.lock:
+            if self.connected:
+                return
+            if httpx_available:
+                self.limits = httpx.Limits(
+                    max_connections=self.pool_hosts * self.pool_size,
+                    max_keepalive_connections=self.pool_hosts * 2, keepalive_expiry=30
+                )
+                self.client = httpx.Client(
+                    http2=self.http2, limits=self.limits, headers=self.headers, follow_redirects=True
+                )
+            else:
+                self.session = requests.Session()
+                self.session.headers.update(self.headers)
+                adapter = requests.adapters.HTTPAdapter(pool_connections=self.pool_hosts, pool_maxsize=self.pool_size)
+                self.session.mount("http://", adapter)
+                self.session.mount("https://", adapter)
+            self.connected = True
+
+    def timeout(self, endpoint):
+        self.connect()
+        connect, read = HTTP_TIMEOUTS.get(endpoint, HTTP_TIMEOUTS["default"])
+        if self.client:
+            return httpx.Timeout(read, connect=connect)
+        return (connect, read)
+
+    def get(self, url, endpoint="default", **kwargs):
+        """GET url with the deadlines configured for endpoint.
+
+        With progress=<ProgressReporter>, the body is streamed and bytes
+        received are reported against Content-Length.
+        """
+        return self.request("GET", url, endpoint, **kwargs)
+
+    def request(self, method, url, endpoint="default", progress=None, **kwargs):
+        kwargs.setdefault("timeout", self.timeout(endpoint))
+        host = urlsplit(url).hostname
+        connections = [0]
+        start = time.perf_counter()
+        try:
+            if self.client:
+                def trace(event, info):
+                    if event == "connection.connect_tcp.complete":
+                        connections[0] += 1
+                extensions = dict(kwargs.pop("extensions", None) or {}, trace=trace)
+                try:
+                    if progress:
+                        request = self.client.build_request(method, url, extensions=extensions, **kwargs)
+                        response = self.client.send(request, stream=True)
+                        try:
+                            self.read_body(response, response.iter_bytes(), lambda: response.num_bytes_downloaded,
+                                           progress)
+                        finally:
+                            response.close()
+                    else:
+                        response = self.client.request(method, url, extensions=extensions, **kwargs)
+                except httpx.HTTPError as e:
+                    raise requests.RequestException(str(e)) from e
+            else:
+                response = self.session.request(method, url, stream=progress is not None, **kwargs)
+                # urllib3 counts connections per pool; the growth since we last looked is what this request opened
+                pool = getattr(response.raw, "_pool", None)
+                if pool is not None:
+                    with self.lock:
+                        connections[0] = pool.num_connections - self.pool_connections.get(id(pool), 0)
+                        self.pool_connections[id(pool)] = pool.num_connections
+                if progress:
+                    with response:
+                        self.read_body(response, response.iter_content(65536), response.raw.tell, progress)
+        except requests.RequestException:
+            self.record(host, time.perf_counter() - start, connections[0], error=True)
+            raise
+        self.record(host, time.perf_counter() - start, connections[0])
+        return response
+
+    def stream(self, url, endpoint="default", chunk_size=4096, **kwargs):
+        """Open a GET whose body is read as it arrives; returns (headers, chunk iterator, close)."""
+        kwargs.setdefault("timeout", self.timeout(endpoint))
+        host = urlsplit(url).hostname
+        start = time.perf_counter()
+        try:
+            if self.client:
+                try:
+                    response = self.client.send(self.client.build_request("GET", url, **kwargs), stream=True)
+                    response.raise_for_status()
+                except httpx.HTTPError as e:
+                    raise requests.RequestException(str(e)) from e
+                chunks = response.iter_bytes(chunk_size)
+            else:
+                response = self.session.get(url, stream=True, **kwargs)
+                response.raise_for_status()
+                chunks = response.iter_content(chunk_size)
+        except requests.RequestException:
+            self.record(host, time.perf_counter() - start, 0, error=True)
+            raise
+        self.record(host, time.perf_counter() - start, 0)
+        return response.headers, chunks, response.close
+
+    @staticmethod
+    def read_body(response, chunks, received, progress):
+        """Read a streamed body, reporting wire bytes, and keep it so .text/.json() work as usual."""
+        progress.set_total(int(response.headers.get("Content-Length") or 0))
+        body = []
+        for chunk in chunks:
+            body.append(chunk)
+            progress.update(received())
+        # Both requests and httpx serve .content from _content once it is set
+        response._content = b"".join(body)
+
+    async def fetch_many(self, urls, endpoint="default", concurrency=8):
+        """Fetch urls concurrently; returns a response or exception per url, in order."""
+        import asyncio
+        self.connect()
+        semaphore = asyncio.Semaphore(concurrency)
+        if not self.client:
+            loop = asyncio.get_running_loop()
+
+            async def fetch(url):
+                async with semaphore:
+                    try:
+                        return await loop.run_in_executor(None, lambda: self.get(url, endpoint))
+                    except requests.RequestException as e:
+                        return e
+            return await asyncio.gather(*(fetch(url) for url in urls))
+
+        async with httpx.AsyncClient(
+            http2=self.http2, limits=self.limits, headers=self.headers, follow_redirects=True
+        ) as client:
+            async def fetch(url):
+                host = urlsplit(url).hostname
+                connections = [0]
+
+                async def trace(event, info):
+                    if event == "connection.connect_tcp.complete":
+                        connections[0] += 1
+                async with semaphore:
+                    start = time.perf_counter()
+                    try:
+                        response = await client.get(url, timeout=self.timeout(endpoint), extensions={"trace": trace})
+                    except httpx.HTTPError as e:
+                        self.record(host, time.perf_counter() - start, connections[0], error=True)
+                        return requests.RequestException(str(e))
+                    self.record(host, time.perf_counter() - start, connections[0])
+                    return response
+            return await asyncio.gather(*(fetch(url) for url in urls))
+
+    def get_many(self, urls, endpoint="default", concurrency=8):
+        """Blocking wrapper around fetch_many for worker threads."""
+        import asyncio
+        return asyncio.run(self.fetch_many(urls, endpoint, concurrency))
+
+    def record(self, host, elapsed, new_connections, error=False):
+        with self.lock:
+            stats = self.host_stats.get(host)
+            if stats is None:
+                stats = self.host_stats[host] = {
+                    "requests": 0, "errors": 0, "connections": 0, "latencies": collections.deque(maxlen=256)
+                }
+            stats["requests"] += 1
+            stats["errors"] += error
+            stats["connections"] += new_connections
+            stats["latencies"].append(elapsed * 1000)
+
+    def stats(self):
+        """Per-host request count, errors, connection reuse and latency in ms."""
+        with self.lock:
+            result = {}
+            for host, stats in self.host_stats.items():
+                latencies = sorted(stats["latencies"])
+                result[host] = {
+                    "requests": stats["requests"],
+                    "errors": stats["errors"],
+                    "connections": stats["connections"],
+                    "reused": max(0, stats["requests"] - stats["errors"] - stats["connections"]),
+                    "p50_ms": round(latencies[len(latencies) // 2], 1),
+                    "p95_ms": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 1),
+                }
+            return result
+
+    def close(self):
+        if self.client:
+            self.client.close()
+        elif self.session:
+            self.session.close()
+
+
+class RequestsShim:
+    """Stands in for the requests module inside third-party libraries so their get() calls use an HttpClient."""
+    def __init__(self, client, endpoint):
+        self.client = client
+        self.endpoint = endpoint
+
+    def get(self, url, **kwargs):
+        return self.client.get(url, self.endpoint, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(requests, name)
+
+
+class PersistentCache:
+    """JSON-file cache with a TTL per entry and LRU eviction.
+
+    Expired entries are still returned (flagged stale) until evicted, so
+    callers can answer from them while they refresh or while offline.
+    """
+    def __init__(self, path, ttl, max_entries=500):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.entries = collections.OrderedDict()
+        self.hits = self.stale_hits = self.misses = 0
+        try:
+            with open(path, "r") as f:
+                for key, entry in json.load(f).items():
+                    self.entries[key] = entry
+        except (OSError, ValueError):
+            pass
+
+    def get(self, key):
+        """Return (value, fresh, stored_at); value is None on a miss."""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None, False, None
+            self.entries.move_to_end(key)
+            fresh = time.time() < entry["expires"]
+            if fresh:
+                self.hits += 1
+            else:
+                self.stale_hits += 1
+            return entry["value"], fresh, entry["stored"]
+
+    def put(self, key, value, ttl=None):
+        now = time.time()
+        with self.lock:
+            self.entries[key] = {"value": value, "stored": now, "expires": now + (self.ttl if ttl is None else ttl)}
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+            self.save()
+
+    def save(self):
+        """Write the cache atomically (called with the lock held)."""
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            temp_path = self.path + ".tmp"
+            with open(temp_path, "w") as f:
+                json.dump(self.entries, f)
+            os.replace(temp_path, self.path)
+        except OSError:
+            pass
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.stale_hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits + self.stale_hits) / lookups if lookups else 0.0,
+            }
+
 
 class AnimatedVoiceIndicator(QLabel):
     """Animated waveform for voice activity."""
@@ -104,12 +4329,12 @@ class AnimatedVoiceIndicator(QLabel):
             painter.setPen(QPen(QColor("#4CAF50"), 2))
             width = self.width() / 6
             for i in range(5):
-                height = 10 * abs(np.sin(self.phase + i * 0.5))
+                height = 10 * abs(math.sin(self.phase + i * 0.5))
                 painter.drawLine(
                     int(width * i + width / 2), int(self.height() - height),
                     int(width * i + width / 2), self.height()
                 )
-            self.phase = (self.phase + 0.2) % (2 * np.pi)
+            self.phase = (self.phase + 0.2) % (2 * math.pi)
         else:
             painter.setPen(Qt.NoPen)
             painter.setBrush(QColor("transparent"))
@@ -187,59 +4412,334 @@ class FilePreviewDialog(QDialog):
             self.accept()
             self.parent().open_file_or_folder(file_path, folder=os.path.dirname(file_path))
 
+class StartupTimer:
+    """Times startup phases in ms, measured from when the script started running."""
+    def __init__(self, origin=STARTUP_ORIGIN):
+        self.origin = origin
+        self.phases = []  # (name, started at, duration, kind)
+        self.marks = {}
+
+    def now(self):
+        return (time.perf_counter() - self.origin) * 1000
+
+    def run(self, name, func, *args, kind="phase"):
+        """Call func(*args) and record how long it took."""
+        start = self.now()
+        try:
+            return func(*args)
+        finally:
+            self.phases.append((name, start, self.now() - start, kind))
+
+    def mark(self, name):
+        self.marks.setdefault(name, self.now())
+
+    def report(self):
+        lines = [
+            f"{name}: {duration:.0f} ms (at {start:.0f} ms)"
+            for name, start, duration, kind in self.phases if kind == "phase"
+        ]
+        lines += [f"{name} at {at:.0f} ms" for name, at in sorted(self.marks.items(), key=lambda item: item[1])]
+        if LAZY_IMPORT_TIMES:
+            imports = ", ".join(f"{name} {ms:.0f} ms" for name, ms in LAZY_IMPORT_TIMES.items())
+            lines.append(f"lazy imports so far: {imports}")
+        return "\n".join(lines)
+
+    def to_dict(self, import_profiler=None):
+        """Machine-readable report, for comparing launches between releases."""
+        report = {
+            "version": 1,
+            "created": dt.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "total_ms": round(max(self.marks.values(), default=self.now()), 1),
+            "marks": {name: round(at, 1) for name, at in self.marks.items()},
+            "phases": [
+                {"name": name, "start_ms": round(start, 1), "duration_ms": round(duration, 1)}
+                for name, start, duration, kind in self.phases if kind == "phase"
+            ],
+            "plugins": [
+                {"name": name, "start_ms": round(start, 1), "duration_ms": round(duration, 1)}
+                for name, start, duration, kind in self.phases if kind == "plugin"
+            ],
+            "lazy_imports_ms": {name: round(ms, 1) for name, ms in LAZY_IMPORT_TIMES.items()},
+        }
+        if import_profiler:
+            report["imports"] = [
+                {"module": name, "self_us": self_us, "cumulative_us": cumulative_us, "depth": depth}
+                for name, self_us, cumulative_us, depth in import_profiler.records
+            ]
+        return report
+
+    def write(self, path, import_profiler=None):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(self.to_dict(import_profiler), f, indent=2)
+
+
 class VoiceAssistantGUI(QMainWindow):
+    log_signal = pyqtSignal(str)
+
     def __init__(self):
         super().__init__()
-        pygame.mixer.init(frequency=44100, size=-16, channels=2, buffer=4096)
-        self.reminders = []
-        self.alarms = []
+        self.startup = StartupTimer()
+        self.startup.mark("module imported")
+        self.scheduler = EventScheduler()
+        self.journal = StateJournal(os.path.join(os.path.expanduser("~"), "Documents", "assistant_state"))
         self.tasks = []
         self.task_history = []  # For undo/redo
-        self.timers = []
         self.music_playing = False
         self.music_file = None
+        self.music_dirs = [os.path.join(os.path.expanduser("~"), "Music")]
+        self.music_db = os.path.join(os.path.expanduser("~"), "Documents", "assistant_music.db")
+        self.music_library = None
+        self.music_watcher = None
+        self.music_changed = set()
+        self.music_match_threshold = 0.6
+        self.play_queue = None
+        self.music_buffer_mb = 256
         self.current_radio_station = None
+        self.radio = None
+        self.radio_stations = {}
+        self.radio_cache = None
+        self.radio_directory_url = "https://all.api.radio-browser.info"
+        self.ffmpeg_path = shutil.which("ffmpeg")
         self.aliases = {}
         self.bookmarks = {}
         self.notes_file = os.path.join(os.path.expanduser("~"), "Documents", "assistant_notes.txt")
+        self.notes_db = os.path.join(os.path.expanduser("~"), "Documents", "assistant_notes.db")
+        self.notes = None
+        self.notes_offset = 0
+        self.knowledge = None
+        self.knowledge_dir = os.path.join(os.path.expanduser("~"), "Documents", "assistant_kb")
+        self.knowledge_source = os.path.join(os.path.expanduser("~"), "Documents", "knowledge")
         self.config_file = os.path.join(os.path.expanduser("~"), "Documents", "assistant_config.json")
         self.current_theme = "Light"
         self.sidebar_position = "Left"
-        self.plugins = {}
-        self.command_history = []
+        self.plugin_registry = PluginRegistry(
+            os.path.join(os.path.dirname(__file__), "plugins"),
+            os.path.join(os.path.expanduser("~"), "Documents", "assistant_cache", "plugins.json")
+        )
+        self.plugins = self.plugin_registry.loaded
+        self.plugin_phrases = set()
+        self.plugin_watcher = None
+        self.plugin_pool = None
+        self.isolate_plugins = False
+        self.plugin_timeout = 10.0
+        self.plugin_workers = 2
+        self.plugin_worker_max_calls = 200
+        self.plugin_worker_max_rss_mb = 300
+        self.history_file = os.path.join(os.path.expanduser("~"), "Documents", "assistant_history.jsonl")
+        self.command_history = CommandHistory(self.history_file)
+        self.history_pending = None
+        self.legacy_history = []
+        self.voice_thread = None
+        self.persistent_listening = True
+        self.continuous_listening = False
+        self.recognizer_backend_name = "google"
+        self.recognizer_model_path = os.path.join(os.path.expanduser("~"), "Documents", "vosk-model")
+        self.recognizer_backend = None
+        self.speech = None
+        self.pending_speech = []
+        self.tts_settings = {}
+        self.http = HttpClient()
+        on_import(wikipedia, lambda module: setattr(module.wikipedia, "requests", RequestsShim(self.http, "search")))
+        self.speech_cache_dir = os.path.join(os.path.expanduser("~"), "Documents", "assistant_cache", "speech")
+        self.weather_api_url = "http://api.openweathermap.org/data/2.5/weather"
+        self.weather_api_key = "YOUR_OPENWEATHERMAP_API_KEY"
+        self.weather_units = "metric"
+        self.weather_cache = None
+        self.weather_ttl = 600
+        self.wiki_cache = None
+        self.wiki_ttl = 7 * 24 * 3600
+        self.wiki_negative_ttl = 24 * 3600
+        self.weather_refreshing = set()
+        self.fuzzy_execute_threshold = 0.75
+        self.fuzzy_suggest_threshold = 0.6
         self.tray_icon = None
         self.minimized_to_tray = False
+        self.executor = None
+        self.progress_tasks = set()
+
+        # Only what the window needs to show and take commands runs here;
+        # audio, speech, tray, plugins and the hotkey follow from the event loop
+        self.startup.run("command router", self.init_command_router)
+        self.startup.run("initUI", self.initUI)
+        self.startup.run("executor", self.init_executor)
+        self.startup.run("load_config", self.load_config)
+        self.startup.run("caches", self.init_caches)
+        self.startup.run("notes", self.init_notes)
+        self.startup.run("knowledge base", self.init_knowledge_base)
+        self.startup.run("command history", self.init_command_history)
+
+        # One-shot timer re-armed for the next due event
+        self.check_timer = QTimer(self)
+        self.check_timer.setSingleShot(True)
+        self.check_timer.setTimerType(Qt.PreciseTimer)
+        self.check_timer.timeout.connect(self.check_scheduled_events)
+        self.startup.run("reminders and tasks", self.load_reminders_and_tasks)
+        self.check_scheduled_events()
+
+        self.deferred_startup = [
+            ("audio mixer", self.init_audio),
+            ("speech", self.init_tts),
+            ("tray icon", self.init_tray_icon),
+            ("recognizer", self.init_recognizer),
+            ("plugins", self.load_plugins),
+            ("music library", self.init_music_library),
+            ("hotkey", self.register_hotkey),
+        ]
+        QTimer.singleShot(0, self.run_deferred_startup)
+
+    def init_caches(self):
+        """Open the weather and Wikipedia response caches and the radio station directory."""
+        self.weather_cache = PersistentCache(
+            os.path.join(os.path.expanduser("~"), "Documents", "assistant_cache", "weather.json"),
+            ttl=self.weather_ttl
+        )
+        self.wiki_cache = PersistentCache(
+            os.path.join(os.path.expanduser("~"), "Documents", "assistant_cache", "wikipedia.json"),
+            ttl=self.wiki_ttl, max_entries=2000
+        )
+        self.radio_cache = PersistentCache(
+            os.path.join(os.path.expanduser("~"), "Documents", "assistant_cache", "radio.json"), ttl=7 * 24 * 3600
+        )
+
+    def run_deferred_startup(self):
+        """Run the next deferred startup step, yielding to the event loop between steps."""
+        self.startup.mark("event loop running")
+        if self.deferred_startup:
+            name, step = self.deferred_startup.pop(0)
+            try:
+                self.startup.run(name, step)
+            except Exception as e:
+                self.append_to_log(f"Startup step '{name}' failed: {str(e)}", "Error")
+            QTimer.singleShot(0, self.run_deferred_startup)
+            return
+        self.startup.mark("startup complete")
+        self.append_to_log(f"Startup timing:\n{self.startup.report()}", "System")
+        if PROFILE_STARTUP:
+            self.write_startup_profile()
+        if self.continuous_listening:
+            self.start_listening()
+
+    def write_startup_profile(self):
+        """Write the startup profile JSON (--profile-startup[=PATH] or ASSISTANT_PROFILE_STARTUP)."""
+        if IMPORT_PROFILER:
+            IMPORT_PROFILER.uninstall()
+        path = next((arg.split("=", 1)[1] for arg in sys.argv if arg.startswith("--profile-startup=")), None)
+        env_path = os.environ.get("ASSISTANT_PROFILE_STARTUP", "")
+        if not path and env_path not in ("", "0", "1"):
+            path = env_path
+        if not path:
+            path = os.path.join(
+                os.path.expanduser("~"), "Documents", "assistant_logs",
+                f"startup-profile-{dt.now().strftime('%Y%m%d-%H%M%S')}.json"
+            )
+        try:
+            self.startup.write(path, IMPORT_PROFILER)
+            self.append_to_log(f"Startup profile written to {path}", "System")
+        except Exception as e:
+            self.append_to_log(f"Failed to write startup profile: {str(e)}", "Error")
+
+    def init_audio(self):
+        """Initialize the pygame mixer used for music and cached speech, and start the play queue."""
+        pygame.mixer.init(frequency=44100, size=-16, channels=2, buffer=4096)
+        self.play_queue = PlayQueue(
+            self.music_buffer_mb, on_track=self.on_track_started,
+            on_error=lambda message: self.append_to_log(message, "Error")
+        )
+        self.play_queue.start()
+
+    def register_hotkey(self):
+        """Register the global push-to-talk hotkey."""
+        try:
+            keyboard.add_hotkey('ctrl+alt+v', self.start_listening)
+        except Exception:
+            self.append_to_log("Failed to register hotkey", "Warning")
+
+    def init_tts(self):
+        """Start the text-to-speech worker."""
+        cache = None
+        try:
+            cache = SpeechCache(self.speech_cache_dir)
+        except Exception as e:
+            self.append_to_log(f"Speech cache disabled: {str(e)}", "Warning")
+        self.speech = SpeechWorker(on_error=lambda message: self.append_to_log(message, "Error"), cache=cache)
+        for name, value in self.tts_settings.items():
+            self.speech.set_property(name, value)
+        self.speech.start()
+        self.speech.warm_up(STATIC_PHRASES)
+        self.speak("Voice assistant initialized. How can I help you?")
+        for text, priority, interrupt in self.pending_speech:
+            self.speech.say(text, priority, interrupt)
+        self.pending_speech = []
+
+    def init_executor(self):
+        """Start the background worker pool and route its signals to the status bar."""
+        self.executor = TaskExecutor(workers=4, max_background=2)
+        self.executor.task_started.connect(self.on_task_started)
+        self.executor.task_progress.connect(self.on_task_progress)
+        self.executor.task_finished.connect(self.on_task_finished)
+
+    def on_task_started(self, task):
+        if task.show_progress:
+            self.progress_tasks.add(task)
+            self.progress_bar.setValue(0)
+            self.progress_bar.setVisible(True)
+        self.update_task_info()
+
+    def on_task_progress(self, task, percent):
+        if task in self.progress_tasks:
+            self.progress_bar.setValue(percent)
+
+    def on_task_finished(self, task, result, error):
+        self.progress_tasks.discard(task)
+        if not self.progress_tasks:
+            self.progress_bar.setVisible(False)
+        if isinstance(error, TaskCancelled):
+            self.append_to_log(str(error), "System")
+        elif error and not task.on_done:
+            self.append_to_log(f"Task {task.name} failed: {str(error)}", "Error")
+        self.update_task_info()
+
+    def update_task_info(self):
+        """Show worker pool queue depth and latency in the status bar."""
+        stats = self.executor.stats()
+        if not stats["running"] and not stats["queued"]:
+            state = "idle"
+        else:
+            state = f"{stats['running']} running, {stats['queued']} queued"
+        self.task_info_label.setText(
+            f"Tasks: {state} | wait {stats['avg_wait_ms']:.0f} ms | run {stats['avg_run_ms']:.0f} ms"
+        )
+
+    def show_running_tasks(self):
+        """Log what the worker pool is doing."""
+        tasks = self.executor.snapshot()
+        if not tasks:
+            self.speak("No background tasks are running.")
+            return
+        lines = "\n".join(f"{name} ({lane}, {state}, {age:.1f} s)" for name, lane, state, age in tasks)
+        self.append_to_log(f"Background tasks:\n{lines}", "Assistant")
+        self.speak(f"{len(tasks)} background tasks. See the log for details.")
 
-        self.initUI()
-        self.init_tts()
-        self.init_tray_icon()
-        self.load_config()
-        self.load_plugins()
+    def cancel_tasks(self):
+        """Cancel every queued and running background task."""
+        count = self.executor.cancel_all()
+        self.speak(f"Cancelled {count} tasks." if count else "There is nothing to cancel.")
 
-        self.check_timer = QTimer(self)
-        self.check_timer.timeout.connect(self.check_scheduled_events)
-        self.check_timer.start(1000)
+    def init_recognizer(self):
+        """Create the speech recognizer backend and load its models in the background."""
+        self.recognizer_backend = create_recognizer_backend(self.recognizer_backend_name, self.recognizer_model_path)
 
-        # Register global hotkey
-        try:
-            keyboard.add_hotkey('ctrl+alt+v', self.start_listening)
-        except:
-            self.append_to_log("Failed to register hotkey", "Warning")
+        def preload(task):
+            try:
+                self.recognizer_backend.ensure_loaded()
+            except Exception as e:
+                self.append_to_log(f"Failed to load {self.recognizer_backend.name} recognizer: {str(e)}", "Error")
+                self.recognizer_backend = GoogleRecognizerBackend()
 
-    def init_tts(self):
-        """Initialize text-to-speech engine."""
-        try:
-            self.engine = pyttsx3.init(driverName=None)
-            self.engine.setProperty('rate', 150)
-            self.engine.setProperty('volume', 1.0)
-            voices = self.engine.getProperty('voices')
-            if voices:
-                female_voices = [v for v in voices if "female" in v.name.lower()]
-                self.engine.setProperty('voice', female_voices[0].id if female_voices else voices[0].id)
-            self.speak("Voice assistant initialized. How can I help you?")
-        except Exception as e:
-            self.append_to_log(f"Failed to initialize TTS: {str(e)}", "Error")
-            print("Error: Text-to-speech failed to initialize.")
+        self.executor.submit(preload, name="load recognizer", lane=TaskExecutor.LANE_BACKGROUND)
 
     def init_tray_icon(self):
         
@@ -343,7 +4843,7 @@ class VoiceAssistantGUI(QMainWindow):
             ("Weather", 'weather.png', lambda: self.process_command("what's the weather")),
             ("Joke", 'joke.png', lambda: self.process_command("tell me a joke")),
             ("Tasks", 'tasks.png', lambda: self.process_command("list tasks")),
-            ("Notes", 'notes.png', self.read_notes),
+            ("Notes", 'notes.png', lambda: self.read_notes()),
             ("Screenshot", 'screenshot.png', self.take_screenshot),
             ("Bookmarks", 'bookmark.png', lambda: self.process_command("list bookmarks")),
             ("Files", 'files.png', self.show_file_manager)
@@ -372,7 +4872,13 @@ class VoiceAssistantGUI(QMainWindow):
         self.command_input.lineEdit().returnPressed.connect(self.process_text_command)
         self.command_input.setFont(QFont("Arial", 12))
         self.command_input.setCompleter(None)
-        self.command_input.lineEdit().textEdited.connect(self.suggest_commands)
+        self.command_input.setMaxVisibleItems(10)
+        # Look up completions once typing pauses rather than on every keystroke
+        self.suggest_timer = QTimer(self)
+        self.suggest_timer.setSingleShot(True)
+        self.suggest_timer.setInterval(120)
+        self.suggest_timer.timeout.connect(self.suggest_commands)
+        self.command_input.lineEdit().textEdited.connect(lambda text: self.suggest_timer.start())
         self.command_layout.addWidget(self.command_input)
 
         self.clear_btn = QPushButton("Clear")
@@ -394,12 +4900,22 @@ class VoiceAssistantGUI(QMainWindow):
         # Log tab
         self.log_widget = QWidget()
         self.log_layout = QVBoxLayout(self.log_widget)
-        self.log_display = QTextEdit()
-        self.log_display.setReadOnly(True)
-        self.log_display.setFont(QFont("Consolas", 11))
-        self.log_display.setContextMenuPolicy(Qt.CustomContextMenu)
-        self.log_display.customContextMenuRequested.connect(self.show_log_context_menu)
-        self.log_layout.addWidget(self.log_display)
+        logs_dir = os.path.join(os.path.expanduser("~"), "Documents", "assistant_logs")
+        self.log_spill_sink = LogSink(os.path.join(logs_dir, "assistant.log"), max_bytes=5 * 1024 * 1024, backups=3)
+        self.log_spill_sink.start()
+        self.error_sink = LogSink(os.path.join(logs_dir, "error_log.jsonl"))
+        self.error_sink.start()
+        self.log_model = LogModel(spill_sink=self.log_spill_sink)
+        self.log_search = (None, 0)  # last term, matches already visited
+        self.log_view = QListView()
+        self.log_view.setModel(self.log_model)
+        self.log_view.setUniformItemSizes(True)
+        self.log_view.setSelectionMode(QAbstractItemView.ExtendedSelection)
+        self.log_view.setFont(QFont("Consolas", 11))
+        self.log_view.setContextMenuPolicy(Qt.CustomContextMenu)
+        self.log_view.customContextMenuRequested.connect(self.show_log_context_menu)
+        self.log_layout.addWidget(self.log_view)
+        self.log_signal.connect(self.add_log_entry)
         self.tabs.addTab(self.log_widget, self.get_icon('log.png'), "Log")
 
         # Tasks tab
@@ -430,6 +4946,15 @@ class VoiceAssistantGUI(QMainWindow):
         self.bookmarks_layout.addWidget(self.bookmarks_display)
         self.tabs.addTab(self.bookmarks_widget, self.get_icon('bookmark.png'), "Bookmarks")
 
+        # Plugins tab
+        self.plugins_widget = QWidget()
+        self.plugins_layout = QVBoxLayout(self.plugins_widget)
+        self.plugins_display = QTextEdit()
+        self.plugins_display.setReadOnly(True)
+        self.plugins_display.setFont(QFont("Consolas", 11))
+        self.plugins_layout.addWidget(self.plugins_display)
+        self.tabs.addTab(self.plugins_widget, self.get_icon('plugin.png'), "Plugins")
+
         # Status bar
         self.status_bar = QStatusBar()
         self.status_label = QLabel("Ready")
@@ -440,6 +4965,10 @@ class VoiceAssistantGUI(QMainWindow):
         self.status_bar.addWidget(self.progress_bar)
         self.system_info_label = QLabel("CPU: 0% | Mem: 0%")
         self.status_bar.addPermanentWidget(self.system_info_label)
+        self.speech_info_label = QLabel("TTS: idle")
+        self.status_bar.addPermanentWidget(self.speech_info_label)
+        self.task_info_label = QLabel("Tasks: idle")
+        self.status_bar.addPermanentWidget(self.task_info_label)
         self.setStatusBar(self.status_bar)
 
         # Animated voice indicator
@@ -586,6 +5115,14 @@ class VoiceAssistantGUI(QMainWindow):
             memory = psutil.virtual_memory()
             memory_percent = memory.percent
             self.system_info_label.setText(f"CPU: {cpu_usage:.1f}% | Mem: {memory_percent:.1f}%")
+            if self.speech:
+                stats = self.speech.stats()
+                cache_info = f" | cache {stats['cache']['hit_rate']:.0f}% hits" if stats['cache'] else ""
+                self.speech_info_label.setText(
+                    f"TTS: {stats['queued']} queued | {stats['avg_latency_ms']:.0f} ms latency{cache_info}"
+                )
+            if self.executor:
+                self.update_task_info()
         except Exception as e:
             self.append_to_log(f"Failed to update system info: {str(e)}", "Error")
 
@@ -596,19 +5133,43 @@ class VoiceAssistantGUI(QMainWindow):
                 with open(self.config_file, "r") as f:
                     config = json.load(f)
                     self.aliases = config.get("aliases", {})
+                    for alias in self.aliases:
+                        self.fuzzy_index.add(alias, "alias")
                     self.bookmarks = config.get("bookmarks", {})
                     self.current_theme = config.get("theme", "Light")
                     self.sidebar_position = config.get("sidebar_position", "Left")
-                    self.command_history = config.get("command_history", [])[:20]
-                    if hasattr(self, 'engine') and self.engine:
-                        self.engine.setProperty('rate', config.get("tts_rate", 150))
-                        self.engine.setProperty('volume', config.get("tts_volume", 1.0))
-                        if "tts_voice" in config:
-                            voices = self.engine.getProperty('voices')
-                            for voice in voices:
-                                if voice.id == config["tts_voice"]:
-                                    self.engine.setProperty('voice', voice.id)
-                                    break
+                    self.legacy_history = config.get("command_history", [])
+                    self.persistent_listening = config.get("persistent_listening", True)
+                    self.continuous_listening = config.get("continuous_listening", False)
+                    self.recognizer_backend_name = config.get("recognizer_backend", "google")
+                    self.recognizer_model_path = config.get("recognizer_model", self.recognizer_model_path)
+                    self.weather_api_url = config.get("weather_api_url", self.weather_api_url)
+                    self.weather_api_key = config.get("weather_api_key", self.weather_api_key)
+                    self.weather_units = config.get("weather_units", self.weather_units)
+                    self.weather_ttl = config.get("weather_ttl", self.weather_ttl)
+                    self.wiki_ttl = config.get("wikipedia_ttl", self.wiki_ttl)
+                    self.knowledge_dir = config.get("knowledge_base_dir", self.knowledge_dir)
+                    self.knowledge_source = config.get("knowledge_base_source", self.knowledge_source)
+                    self.wiki_negative_ttl = config.get("wikipedia_negative_ttl", self.wiki_negative_ttl)
+                    self.fuzzy_execute_threshold = config.get("fuzzy_execute_threshold", self.fuzzy_execute_threshold)
+                    self.fuzzy_suggest_threshold = config.get("fuzzy_suggest_threshold", self.fuzzy_suggest_threshold)
+                    self.isolate_plugins = config.get("isolate_plugins", self.isolate_plugins)
+                    self.plugin_timeout = config.get("plugin_timeout", self.plugin_timeout)
+                    self.plugin_workers = config.get("plugin_workers", self.plugin_workers)
+                    self.plugin_worker_max_calls = config.get("plugin_worker_max_calls", self.plugin_worker_max_calls)
+                    self.plugin_worker_max_rss_mb = config.get("plugin_worker_max_rss_mb", self.plugin_worker_max_rss_mb)
+                    self.music_dirs = config.get("music_dirs", self.music_dirs)
+                    self.music_match_threshold = config.get("music_match_threshold", self.music_match_threshold)
+                    self.music_buffer_mb = config.get("music_buffer_mb", self.music_buffer_mb)
+                    self.radio_stations = config.get("radio_stations", self.radio_stations)
+                    self.radio_directory_url = config.get("radio_directory_url", self.radio_directory_url)
+                    self.ffmpeg_path = config.get("ffmpeg_path") or self.ffmpeg_path
+                    self.tts_settings = {"rate": config.get("tts_rate", 150), "volume": config.get("tts_volume", 1.0)}
+                    if config.get("tts_voice"):
+                        self.tts_settings["voice"] = config["tts_voice"]
+                    if self.speech:
+                        for name, value in self.tts_settings.items():
+                            self.speech.set_property(name, value)
                 self.apply_styles()
                 self.update_command_history()
                 self.update_sidebar_position()
@@ -622,10 +5183,34 @@ class VoiceAssistantGUI(QMainWindow):
             "bookmarks": self.bookmarks,
             "theme": self.current_theme,
             "sidebar_position": self.sidebar_position,
-            "command_history": self.command_history[-20:],
-            "tts_rate": self.engine.getProperty('rate') if hasattr(self, 'engine') and self.engine else 150,
-            "tts_volume": self.engine.getProperty('volume') if hasattr(self, 'engine') and self.engine else 1.0,
-            "tts_voice": self.engine.getProperty('voice') if hasattr(self, 'engine') and self.engine else ""
+            "persistent_listening": self.persistent_listening,
+            "continuous_listening": self.continuous_listening,
+            "recognizer_backend": self.recognizer_backend_name,
+            "recognizer_model": self.recognizer_model_path,
+            "weather_api_url": self.weather_api_url,
+            "weather_api_key": self.weather_api_key,
+            "weather_units": self.weather_units,
+            "weather_ttl": self.weather_ttl,
+            "wikipedia_ttl": self.wiki_ttl,
+            "knowledge_base_dir": self.knowledge_dir,
+            "knowledge_base_source": self.knowledge_source,
+            "wikipedia_negative_ttl": self.wiki_negative_ttl,
+            "fuzzy_execute_threshold": self.fuzzy_execute_threshold,
+            "fuzzy_suggest_threshold": self.fuzzy_suggest_threshold,
+            "isolate_plugins": self.isolate_plugins,
+            "plugin_timeout": self.plugin_timeout,
+            "plugin_workers": self.plugin_workers,
+            "plugin_worker_max_calls": self.plugin_worker_max_calls,
+            "plugin_worker_max_rss_mb": self.plugin_worker_max_rss_mb,
+            "music_dirs": self.music_dirs,
+            "music_match_threshold": self.music_match_threshold,
+            "music_buffer_mb": self.music_buffer_mb,
+            "radio_stations": self.radio_stations,
+            "radio_directory_url": self.radio_directory_url,
+            "ffmpeg_path": self.ffmpeg_path or "",
+            "tts_rate": self.speech.get_property('rate') if self.speech else self.tts_settings.get("rate", 150),
+            "tts_volume": self.speech.get_property('volume') if self.speech else self.tts_settings.get("volume", 1.0),
+            "tts_voice": (self.speech.get_property('voice') or "") if self.speech else self.tts_settings.get("voice", "")
         }
         try:
             os.makedirs(os.path.dirname(self.config_file), exist_ok=True)
@@ -643,7 +5228,7 @@ class VoiceAssistantGUI(QMainWindow):
                     json.dump({
                         "aliases": self.aliases,
                         "bookmarks": self.bookmarks,
-                        "command_history": self.command_history
+                        "command_history": self.command_history.recent(len(self.command_history))[::-1]
                     }, f, indent=4)
                 self.append_to_log(f"Configuration exported to {file_path}", "System")
                 self.speak("Configuration exported successfully")
@@ -659,9 +5244,11 @@ class VoiceAssistantGUI(QMainWindow):
                 with open(file_path, "r") as f:
                     config = json.load(f)
                     self.aliases.update(config.get("aliases", {}))
+                    for alias in self.aliases:
+                        self.fuzzy_index.add(alias, "alias")
                     self.bookmarks.update(config.get("bookmarks", {}))
-                    self.command_history.extend(config.get("command_history", []))
-                    self.command_history = self.command_history[-20:]
+                    for command in config.get("command_history", []):
+                        self.remember_command(command)
                     self.save_config()
                     self.update_command_history()
                     self.list_bookmarks()
@@ -671,50 +5258,132 @@ class VoiceAssistantGUI(QMainWindow):
                 self.append_to_log(f"Failed to import config: {str(e)}", "Error")
                 self.speak("Failed to import configuration")
 
-    def update_command_history(self):
-        """Update the command input dropdown with history."""
-        self.command_input.clear()
-        self.command_input.addItems(self.command_history)
+    def init_command_history(self):
+        """Load the command history file in the background.
 
-    def suggest_commands(self, text):
-        """Suggest commands based on partial input."""
-        if not text:
-            return
-        suggestions = [cmd for cmd in self.command_history if text.lower() in cmd.lower()]
-        self.command_input.clear()
-        self.command_input.addItems(suggestions)
-        self.command_input.lineEdit().setText(text)
+        Commands run before it finishes are kept in memory and added to the
+        loaded history afterwards.
+        """
+        self.history_pending = []
+        self.executor.submit(
+            self.load_command_history, name="load command history",
+            lane=TaskExecutor.LANE_BACKGROUND, on_done=self.on_command_history_loaded
+        )
+
+    def load_command_history(self, task):
+        history = CommandHistory(self.history_file)
+        history.load()
+        return history
+
+    def on_command_history_loaded(self, history, error):
+        pending, self.history_pending = self.history_pending, None
+        if error:
+            self.append_to_log(f"Failed to load command history: {str(error)}", "Error")
+            history = CommandHistory(self.history_file)
+        if not len(history):
+            # Carry over the short history older versions kept in the config file
+            for command in self.legacy_history:
+                history.add(command)
+        for command, when in pending:
+            history.add(command, when)
+        self.command_history = history
+        self.update_command_history()
+
+    def remember_command(self, command):
+        """Add a command to the history (in memory only until the history file has loaded)."""
+        if self.history_pending is not None:
+            when = time.time()
+            self.history_pending.append((command, when))
+            self.command_history.use(command, when)
+        else:
+            self.command_history.add(command)
+
+    def update_command_history(self):
+        """Update the command input dropdown with the most recent commands."""
+        self.show_completions(self.command_history.recent(20))
+
+    def suggest_commands(self):
+        """Suggest commands from history starting with the typed text (or with one of its words)."""
+        text = self.command_input.lineEdit().text()
+        if text.strip():
+            self.show_completions(self.command_history.complete(text, 10))
+
+    def show_completions(self, suggestions):
+        """Update the dropdown rows in place and leave what the user typed alone."""
+        combo = self.command_input
+        line_edit = combo.lineEdit()
+        text, cursor = line_edit.text(), line_edit.cursorPosition()
+        combo.blockSignals(True)
+        for row, suggestion in enumerate(suggestions):
+            if row < combo.count():
+                if combo.itemText(row) != suggestion:
+                    combo.setItemText(row, suggestion)
+            else:
+                combo.addItem(suggestion)
+        while combo.count() > len(suggestions):
+            combo.removeItem(combo.count() - 1)
+        combo.blockSignals(False)
+        if line_edit.text() != text:
+            line_edit.setText(text)
+            line_edit.setCursorPosition(cursor)
 
     def append_to_log(self, text, speaker="System"):
-        """Add text to log display with timestamp."""
+        """Add text to log display with timestamp; safe to call from any thread."""
         timestamp = dt.now().strftime("%H:%M:%S")
         log_entry = f"[{timestamp}] {speaker}: {text}"
-        self.log_display.append(log_entry)
-        self.log_display.moveCursor(QTextCursor.End)
+        self.log_signal.emit(log_entry)
         if speaker == "Error":
-            with open("error_log.txt", "a") as f:
-                f.write(f"{log_entry}\n")
-
-    def speak(self, text):
-        """Convert text to speech and log it."""
-        if not hasattr(self, 'engine') or not self.engine:
+            self.error_sink.write({
+                "ts": dt.now().isoformat(timespec="milliseconds"),
+                "level": "error",
+                "thread": threading.current_thread().name,
+                "message": text,
+            })
+
+    def add_log_entry(self, log_entry):
+        """Append an entry to the log model and keep the view scrolled to it."""
+        self.log_model.append(log_entry)
+        self.log_view.scrollToBottom()
+
+    def speak(self, text, priority=SpeechWorker.PRIORITY_NORMAL, interrupt=False):
+        """Log text and queue it for speech without blocking."""
+        if self.speech is None:
+            # Speech starts after the window is up; hold messages until then
+            self.append_to_log(text, "Assistant")
+            self.pending_speech.append((text, priority, interrupt))
+            return
+        if self.speech.error:
             self.append_to_log("TTS engine not available", "Error")
             return
-        try:
-            self.append_to_log(text, "Assistant")
-            self.engine.say(text)
-            self.engine.runAndWait()
-        except Exception as e:
-            self.append_to_log(f"Speech error: {str(e)}", "Error")
+        self.append_to_log(text, "Assistant")
+        self.speech.say(text, priority, interrupt)
+
+    def speak_alert(self, text):
+        """Speak an alarm, timer or reminder ahead of any queued chatter."""
+        self.speak(text, SpeechWorker.PRIORITY_ALARM, interrupt=True)
+
+    def stop_speaking(self):
+        """Cancel queued speech and cut off the current message."""
+        if self.speech:
+            self.speech.cancel()
+        self.append_to_log("Speech cancelled", "System")
 
     def start_listening(self):
         """Start listening for voice commands."""
-        if hasattr(self, 'voice_thread') and self.voice_thread and self.voice_thread.is_listening:
+        if self.voice_thread and self.voice_thread.persistent and self.voice_thread.isRunning():
+            # The microphone is already open; just take the next utterance
+            if not self.voice_thread.is_listening:
+                self.voice_thread.arm()
             return
-        self.voice_thread = VoiceThread()
+        if self.voice_thread and self.voice_thread.is_listening:
+            return
+        self.voice_thread = VoiceThread(self.persistent_listening, self.continuous_listening,
+                                        self.recognizer_backend)
         self.voice_thread.finished_signal.connect(self.process_voice_command)
         self.voice_thread.listening_signal.connect(self.update_listening_status)
         self.voice_thread.error_signal.connect(self.handle_voice_error)
+        if self.persistent_listening and not self.continuous_listening:
+            self.voice_thread.arm()
         self.voice_thread.start()
 
     def update_listening_status(self, is_listening):
@@ -739,8 +5408,7 @@ class VoiceAssistantGUI(QMainWindow):
         """Process a command from voice input."""
         self.append_to_log(command, "You")
         self.command_input.lineEdit().setText(command)
-        self.command_history.append(command)
-        self.command_history = self.command_history[-20:]
+        self.remember_command(command)
         self.update_command_history()
         self.process_command(command)
 
@@ -749,15 +5417,15 @@ class VoiceAssistantGUI(QMainWindow):
         command = self.command_input.currentText().strip()
         if command:
             self.append_to_log(command, "You")
-            self.command_history.append(command)
-            self.command_history = self.command_history[-20:]
+            self.remember_command(command)
             self.update_command_history()
             self.process_command(command)
             self.command_input.lineEdit().clear()
 
     def speak_selected_text(self):
         """Speak the currently selected text."""
-        selected_text = self.log_display.textCursor().selectedText()
+        rows = sorted(index.row() for index in self.log_view.selectionModel().selectedIndexes())
+        selected_text = self.log_model.text(rows) if rows else ""
         if selected_text:
             self.speak(selected_text)
         else:
@@ -765,7 +5433,17 @@ class VoiceAssistantGUI(QMainWindow):
 
     def stop_media(self):
         """Stop any currently playing media."""
-        if pygame.mixer.music.get_busy():
+        if self.radio and self.radio.state != "stopped":
+            self.radio.stop()
+            self.current_radio_station = None
+            self.append_to_log("Radio stopped", "System")
+            self.speak("Radio stopped")
+        elif self.play_queue and self.play_queue.current()[2] != "stopped":
+            self.play_queue.stop_playback()
+            self.music_playing = False
+            self.append_to_log("Media stopped", "System")
+            self.speak("Media stopped")
+        elif pygame.mixer.music.get_busy():
             pygame.mixer.music.stop()
             self.music_playing = False
             self.append_to_log("Media stopped", "System")
@@ -775,14 +5453,22 @@ class VoiceAssistantGUI(QMainWindow):
 
     def show_log_context_menu(self, position):
         """Show context menu for log display with search option."""
-        menu = self.log_display.createStandardContextMenu()
+        menu = QMenu(self)
+        copy_action = menu.addAction("Copy")
+        copy_action.triggered.connect(self.copy_log_selection)
         clear_action = menu.addAction("Clear Log")
-        clear_action.triggered.connect(self.log_display.clear)
+        clear_action.triggered.connect(self.log_model.clear)
         save_action = menu.addAction("Save Log...")
         save_action.triggered.connect(self.save_log_to_file)
         search_action = menu.addAction("Search Log...")
         search_action.triggered.connect(self.search_log)
-        menu.exec_(self.log_display.mapToGlobal(position))
+        menu.exec_(self.log_view.mapToGlobal(position))
+
+    def copy_log_selection(self):
+        """Copy the selected log lines to the clipboard."""
+        rows = sorted(index.row() for index in self.log_view.selectionModel().selectedIndexes())
+        if rows:
+            QApplication.clipboard().setText(self.log_model.text(rows))
 
     def save_log_to_file(self):
         """Save log content to a file."""
@@ -790,21 +5476,33 @@ class VoiceAssistantGUI(QMainWindow):
         if file_path:
             try:
                 with open(file_path, "w") as f:
-                    f.write(self.log_display.toPlainText())
+                    f.write(self.log_model.text())
                 self.append_to_log(f"Log saved to {file_path}", "System")
             except Exception as e:
                 self.append_to_log(f"Failed to save log: {str(e)}", "Error")
 
     def search_log(self):
-        """Search through the log display."""
+        """Search the log, stepping back through older matches on repeat searches."""
         search_dialog = QInputDialog(self)
         search_dialog.setWindowTitle("Search Log")
         search_dialog.setLabelText("Enter search term:")
+        search_dialog.setTextValue(self.log_search[0] or "")
         if search_dialog.exec_():
             term = search_dialog.textValue()
             if term:
-                self.log_display.find(term, QJsonDocument.FindCaseSensitively)
-                self.append_to_log(f"Searched log for: {term}", "System")
+                previous_term, position = self.log_search
+                position = position if term == previous_term else 0
+                rows = self.log_model.find(term)
+                if not rows:
+                    self.log_search = (term, 0)
+                    self.append_to_log(f"No log entries match: {term}", "System")
+                    return
+                row = rows[-1 - position % len(rows)]
+                self.log_search = (term, position + 1)
+                index = self.log_model.index(row)
+                self.log_view.setCurrentIndex(index)
+                self.log_view.scrollTo(index, QAbstractItemView.PositionAtCenter)
+                self.status_label.setText(f"Match {position % len(rows) + 1} of {len(rows)} for '{term}'")
 
     def get_time(self):
         """Get current time."""
@@ -825,9 +5523,7 @@ class VoiceAssistantGUI(QMainWindow):
 
     def create_file(self, filename, content=None, folder="Desktop"):
         """Create a file in a separate thread."""
-        def perform_operation():
-            self.progress_bar.setVisible(True)
-            self.progress_bar.setValue(0)
+        def perform_operation(task):
             try:
                 base_folder = os.path.join(os.path.expanduser("~"), folder.capitalize())
                 os.makedirs(base_folder, exist_ok=True)
@@ -835,21 +5531,22 @@ class VoiceAssistantGUI(QMainWindow):
                 if os.path.exists(filepath):
                     self.speak(f"File {filename} already exists.")
                     return False
-                for i in range(1, 101):
-                    time.sleep(0.01)  # Simulate work
-                    self.progress_bar.setValue(i)
+                text = content or ""
+                progress = task.progress()
+                progress.set_total(len(text))
                 with open(filepath, "w") as f:
-                    f.write(content or "")
+                    for offset in range(0, len(text), 65536):
+                        f.write(text[offset:offset + 65536])
+                        progress.update(min(offset + 65536, len(text)))
+                progress.finish()
                 self.speak(f"File {filename} created successfully in {folder}.")
                 return True
             except Exception as e:
                 self.append_to_log(f"Failed to create file: {str(e)}", "Error")
                 self.speak("Failed to create file. See log for details.")
                 return False
-            finally:
-                self.progress_bar.setVisible(False)
 
-        threading.Thread(target=perform_operation, daemon=True).start()
+        self.executor.submit(perform_operation, name=f"create {filename}", show_progress=True)
 
     def create_folder(self, foldername, folder="Desktop"):
         """Create a folder with proper error handling."""
@@ -1034,38 +5731,32 @@ class VoiceAssistantGUI(QMainWindow):
 
     def add_bookmark(self, name, url):
         """Add a bookmark with validation."""
-        def perform_operation():
-            self.progress_bar.setVisible(True)
-            self.progress_bar.setValue(0)
+        def perform_operation(task, url):
             try:
                 if not url.startswith(('http://', 'https://')):
                     url = 'https://' + url
-                response = requests.get(url, timeout=5)
-                for i in range(1, 101):
-                    time.sleep(0.01)
-                    self.progress_bar.setValue(i)
+                response = self.http.get(url, "bookmark", progress=task.progress())
                 if response.status_code >= 400:
                     self.speak(f"Warning: Website returned status code {response.status_code}")
                 self.bookmarks[name.lower()] = url
                 self.save_config()
                 self.speak(f"Bookmark '{name}' added for {url}.")
-                self.list_bookmarks()
                 return True
             except requests.RequestException:
                 self.speak("Warning: Could not verify website availability")
                 self.bookmarks[name.lower()] = url
                 self.save_config()
                 self.speak(f"Bookmark '{name}' added for {url}.")
-                self.list_bookmarks()
                 return True
             except Exception as e:
                 self.append_to_log(f"Failed to add bookmark: {str(e)}", "Error")
                 self.speak("Failed to add bookmark. See log for details.")
                 return False
-            finally:
-                self.progress_bar.setVisible(False)
 
-        threading.Thread(target=perform_operation, daemon=True).start()
+        self.executor.submit(
+            perform_operation, url, name=f"bookmark {name}", show_progress=True,
+            on_done=lambda result, error: self.list_bookmarks()
+        )
 
     def open_bookmark(self, name):
         """Open a bookmark with fuzzy matching."""
@@ -1092,6 +5783,58 @@ class VoiceAssistantGUI(QMainWindow):
             self.bookmarks_display.setText(f"Bookmarks:\n{bookmark_list}")
             self.speak(f"You have {len(self.bookmarks)} bookmarks.")
 
+    def check_bookmarks(self):
+        """Check every bookmark concurrently and show which ones respond."""
+        if not self.bookmarks:
+            self.speak("No bookmarks to check.")
+            return
+
+        names = list(self.bookmarks)
+        urls = [self.bookmarks[name] for name in names]
+
+        def perform_operation(task):
+            return self.http.get_many(urls, "bookmark")
+
+        def show_results(responses, error):
+            if error:
+                self.append_to_log(f"Failed to check bookmarks: {str(error)}", "Error")
+                self.speak("Failed to check bookmarks.")
+                return
+            lines = []
+            failed = 0
+            for name, url, response in zip(names, urls, responses):
+                if isinstance(response, Exception) or response.status_code >= 400:
+                    failed += 1
+                    status = "unreachable" if isinstance(response, Exception) else f"status {response.status_code}"
+                else:
+                    status = "ok"
+                lines.append(f"{name}: {url} ({status})")
+            self.bookmarks_display.setText("Bookmarks:\n" + "\n".join(lines))
+            if failed:
+                self.speak(f"{failed} of {len(names)} bookmarks did not respond.")
+            else:
+                self.speak(f"All {len(names)} bookmarks are reachable.")
+
+        self.executor.submit(perform_operation, name="check bookmarks", on_done=show_results)
+
+    def show_network_stats(self):
+        """Log per-host request latency and connection reuse, and response cache hit rates."""
+        stats = self.http.stats()
+        for host, s in sorted(stats.items()):
+            self.append_to_log(
+                f"{host}: {s['requests']} requests, {s['reused']} on reused connections, "
+                f"{s['errors']} errors, p50 {s['p50_ms']} ms, p95 {s['p95_ms']} ms",
+                "Network"
+            )
+        for name, cache in (("weather", self.weather_cache), ("wikipedia", self.wiki_cache)):
+            s = cache.stats()
+            self.append_to_log(
+                f"{name} cache: {s['entries']} entries, {s['hits']} hits, {s['stale_hits']} stale hits, "
+                f"{s['misses']} misses, hit rate {s['hit_rate']:.0%}",
+                "Network"
+            )
+        self.speak(f"Network stats for {len(stats)} hosts and the response caches are in the log.")
+
     def open_new_tab(self, url=None):
         """Open a new tab in the default browser."""
         try:
@@ -1134,27 +5877,22 @@ class VoiceAssistantGUI(QMainWindow):
 
     def scrape_website(self, url):
         """Scrape basic information from a website in a thread."""
-        def perform_operation():
-            self.progress_bar.setVisible(True)
-            self.progress_bar.setValue(0)
+        def perform_operation(task):
             try:
-                headers = {'User-Agent': 'Mozilla/5.0'}
-                response = requests.get(url, headers=headers)
-                for i in range(1, 101):
-                    time.sleep(0.01)
-                    self.progress_bar.setValue(i)
-                soup = BeautifulSoup(response.text, 'html.parser')
+                progress = task.progress(stages=2)
+                response = self.http.get(url, "scrape", progress=progress)
+                progress.next_stage()
+                soup = bs4.BeautifulSoup(response.text, 'html.parser')
                 title = soup.title.string if soup.title else "No title found"
+                progress.finish()
                 self.speak(f"The title of the website is: {title}")
                 return True
             except Exception as e:
                 self.append_to_log(f"Failed to scrape website: {str(e)}", "Error")
                 self.speak("Failed to scrape website. See log for details.")
                 return False
-            finally:
-                self.progress_bar.setVisible(False)
 
-        threading.Thread(target=perform_operation, daemon=True).start()
+        self.executor.submit(perform_operation, name=f"scrape {url}", deadline=60, show_progress=True)
 
     def autofill_form(self, website, query):
         """Simulate filling out a search form on a website."""
@@ -1189,26 +5927,26 @@ class VoiceAssistantGUI(QMainWindow):
         rate_label = QLabel("Speech Rate:")
         rate_slider = QSlider(Qt.Horizontal)
         rate_slider.setRange(100, 250)
-        rate_slider.setValue(self.engine.getProperty('rate'))
-        rate_slider.valueChanged.connect(lambda v: self.engine.setProperty('rate', v))
+        rate_slider.setValue(self.speech.get_property('rate'))
+        rate_slider.valueChanged.connect(lambda v: self.speech.set_property('rate', v))
         tts_layout.addWidget(rate_label)
         tts_layout.addWidget(rate_slider)
         volume_label = QLabel("Speech Volume:")
         volume_slider = QSlider(Qt.Horizontal)
         volume_slider.setRange(0, 100)
-        volume_slider.setValue(int(self.engine.getProperty('volume') * 100))
-        volume_slider.valueChanged.connect(lambda v: self.engine.setProperty('volume', v/100))
+        volume_slider.setValue(int(self.speech.get_property('volume') * 100))
+        volume_slider.valueChanged.connect(lambda v: self.speech.set_property('volume', v/100))
         tts_layout.addWidget(volume_label)
         tts_layout.addWidget(volume_slider)
         voice_label = QLabel("Voice:")
         voice_combo = QComboBox()
-        voices = self.engine.getProperty('voices')
-        current_voice = self.engine.getProperty('voice')
+        voices = self.speech.get_property('voices')
+        current_voice = self.speech.get_property('voice')
         for i, voice in enumerate(voices):
             voice_combo.addItem(voice.name)
             if voice.id == current_voice:
                 voice_combo.setCurrentIndex(i)
-        voice_combo.currentIndexChanged.connect(lambda i: self.engine.setProperty('voice', voices[i].id))
+        voice_combo.currentIndexChanged.connect(lambda i: self.speech.set_property('voice', voices[i].id))
         tts_layout.addWidget(voice_label)
         tts_layout.addWidget(voice_combo)
         language_label = QLabel("TTS Language:")
@@ -1288,65 +6026,212 @@ class VoiceAssistantGUI(QMainWindow):
         """Change the font size of the UI."""
         font = QFont("Arial", int(size))
         self.command_input.setFont(font)
-        self.log_display.setFont(QFont("Consolas", int(size)))
+        self.log_view.setFont(QFont("Consolas", int(size)))
         self.tasks_display.setFont(QFont("Consolas", int(size)))
         self.bookmarks_display.setFont(QFont("Consolas", int(size)))
+        self.plugins_display.setFont(QFont("Consolas", int(size)))
         self.append_to_log(f"Changed font size to {size}pt", "System")
 
     def load_plugins(self):
-        """Load plugins from the plugins directory."""
-        plugins_dir = os.path.join(os.path.dirname(__file__), "plugins")
-        if not os.path.exists(plugins_dir):
+        """Read the plugin manifests; only plugins without one are imported now."""
+        if not os.path.isdir(self.plugin_registry.directory):
             return
-        for filename in os.listdir(plugins_dir):
-            if filename.endswith(".py"):
-                plugin_path = os.path.join(plugins_dir, filename)
-                spec = importlib.util.spec_from_file_location(filename[:-3], plugin_path)
-                module = importlib.util.module_from_spec(spec)
-                spec.loader.exec_module(module)
-                if hasattr(module, "register_plugin"):
-                    try:
-                        self.plugins[filename[:-3]] = module.register_plugin(self)
-                        self.append_to_log(f"Loaded plugin: {filename}", "System")
-                    except Exception as e:
-                        self.append_to_log(f"Failed to load plugin {filename}: {str(e)}", "Error")
+        for name in self.scan_plugins():
+            self.startup.run(name, self.load_plugin, name, kind="plugin")
+        if any(self.plugin_registry.isolated(name, self.isolate_plugins) for name in self.plugin_registry.manifests):
+            self.init_plugin_pool()
+        self.plugin_reload_timer = QTimer(self)
+        self.plugin_reload_timer.setSingleShot(True)
+        self.plugin_reload_timer.setInterval(300)
+        self.plugin_reload_timer.timeout.connect(self.reload_plugins)
+        self.plugin_watcher = QFileSystemWatcher(self)
+        self.plugin_watcher.directoryChanged.connect(lambda path: self.plugin_reload_timer.start())
+        self.plugin_watcher.fileChanged.connect(lambda path: self.plugin_reload_timer.start())
+        self.watch_plugins()
+
+    def scan_plugins(self):
+        """Rescan the plugin directory and index the triggers; returns plugins without a manifest."""
+        legacy = self.plugin_registry.scan()
+        for name, error in self.plugin_registry.errors:
+            self.append_to_log(f"Plugin {name}: {error}", "Error")
+        phrases = {trigger for name in self.plugin_registry.manifests for trigger in self.plugin_registry.triggers(name)}
+        for phrase in self.plugin_phrases - phrases:
+            self.fuzzy_index.remove(phrase)
+        for phrase in phrases - self.plugin_phrases:
+            self.fuzzy_index.add(phrase, "plugin")
+        self.plugin_phrases = phrases
+        return legacy
+
+    def watch_plugins(self):
+        """Watch the plugin directory and its files (editors that save by renaming drop the old watch)."""
+        directory = self.plugin_registry.directory
+        paths = [directory] + [
+            os.path.join(directory, filename) for filename in os.listdir(directory)
+            if filename.endswith((".py", ".json"))
+        ]
+        watched = set(self.plugin_watcher.files()) | set(self.plugin_watcher.directories())
+        missing = [path for path in paths if path not in watched]
+        if missing:
+            self.plugin_watcher.addPaths(missing)
+
+    def reload_plugins(self):
+        """Pick up added, removed and edited plugins without restarting."""
+        legacy = self.scan_plugins()
+        for name in list(self.plugin_registry.modules):
+            if self.plugin_registry.stale(name):
+                self.load_plugin(name)
+        for name in legacy:
+            if name not in self.plugin_registry.modules:
+                self.load_plugin(name)
+        self.watch_plugins()
+
+    def load_plugin(self, name):
+        """Import (or re-import) one plugin and register it."""
+        reloading = name in self.plugin_registry.modules
+        start = time.perf_counter()
+        try:
+            plugin = self.plugin_registry.load(name, self)
+            action = "Reloaded" if reloading else "Loaded"
+            self.append_to_log(f"{action} plugin: {name} ({(time.perf_counter() - start) * 1000:.0f} ms)", "System")
+            return plugin
+        except Exception as e:
+            self.append_to_log(f"Failed to load plugin {name}: {str(e)}", "Error")
+            return None
+
+    def get_plugin(self, name):
+        """Return a plugin's registration, importing it on first use or after its file changed."""
+        if self.plugin_registry.stale(name):
+            return self.load_plugin(name)
+        return self.plugin_registry.loaded.get(name)
+
+    def run_plugin(self, name, argument):
+        """Run a plugin's execute(argument), in a worker process if it is isolated.
+
+        Returns None if the plugin could not be loaded, False if it raised,
+        True otherwise (isolated plugins report their errors when they finish).
+        """
+        if self.plugin_registry.isolated(name, self.isolate_plugins):
+            self.init_plugin_pool()
+            timeout = self.plugin_registry.timeout(name, self.plugin_timeout)
+            self.executor.submit(
+                self.call_isolated_plugin, name, argument, timeout, name=f"plugin {name}",
+                on_done=lambda outcome, error: self.on_isolated_plugin_done(name, outcome, error)
+            )
+            return True
+        plugin = self.get_plugin(name)
+        if not plugin:
+            return None
+        start, cpu_start = time.perf_counter(), time.thread_time()
+        error = None
+        try:
+            plugin["execute"](argument)
+        except Exception as e:
+            error = str(e)
+            self.append_to_log(f"Plugin {name} error: {error}", "Error")
+        self.plugin_registry.record(name, time.perf_counter() - start, time.thread_time() - cpu_start, error)
+        self.update_plugins_display()
+        return error is None
+
+    def init_plugin_pool(self):
+        """Create the plugin worker pool, starting one worker in the background."""
+        if self.plugin_pool is None:
+            self.plugin_pool = PluginProcessPool(
+                os.path.abspath(__file__), self.plugin_workers,
+                self.plugin_worker_max_calls, self.plugin_worker_max_rss_mb
+            )
+            self.executor.submit(
+                lambda task: self.plugin_pool.warm(), name="start plugin worker", lane=TaskExecutor.LANE_BACKGROUND
+            )
+
+    def call_isolated_plugin(self, task, name, argument, timeout):
+        """Worker-pool side of run_plugin; relays the plugin's messages to the app."""
+        def on_message(kind, *args):
+            if kind == "speak":
+                self.speak(args[0])
+            elif kind == "log":
+                self.append_to_log(args[0], args[1])
+            elif kind == "notify":
+                notification.notify(title=args[0], message=args[1], timeout=10)
+
+        return self.plugin_pool.call(
+            name, self.plugin_registry.path(name), argument, timeout, on_message, task.cancelled
+        )
+
+    def on_isolated_plugin_done(self, name, outcome, error):
+        if error:
+            self.plugin_registry.record(name, 0.0, error=str(error))
+            self.append_to_log(f"Plugin {name} failed: {str(error)}", "Error")
+        else:
+            self.plugin_registry.record(name, outcome["wall"], outcome["cpu"], outcome["error"], outcome["timed_out"])
+            if outcome["error"]:
+                self.append_to_log(f"Plugin {name} error: {outcome['error']}", "Error")
+            if outcome["timed_out"]:
+                self.speak(f"The {name} plugin took too long and was stopped.")
+        self.update_plugins_display()
+
+    def update_plugins_display(self):
+        """Show per-plugin calls, latency and CPU time, and the worker processes, in the Plugins tab."""
+        registry = self.plugin_registry
+        lines = [f"{'Plugin':<20} {'Runs':<8} {'Calls':>6} {'Errors':>6} {'Timeouts':>8} "
+                 f"{'Avg ms':>8} {'p95 ms':>8} {'CPU ms':>8}"]
+        for name in sorted(set(registry.manifests) | set(registry.stats)):
+            where = "process" if registry.isolated(name, self.isolate_plugins) else "inline"
+            stats = registry.stats.get(name)
+            if not stats:
+                lines.append(f"{name:<20} {where:<8} {0:>6}")
+                continue
+            latencies = sorted(stats["latencies"])
+            p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000 if latencies else 0.0
+            lines.append(
+                f"{name:<20} {where:<8} {stats['calls']:>6} {stats['errors']:>6} {stats['timeouts']:>8} "
+                f"{stats['wall'] / stats['calls'] * 1000:>8.1f} {p95:>8.1f} {stats['cpu'] * 1000:>8.1f}"
+            )
+        if self.plugin_pool:
+            pool = self.plugin_pool.stats()
+            lines.append("")
+            lines.append(f"Worker processes: {len(pool['workers'])} ({pool['idle']} idle), spawned {pool['spawned']}, "
+                         f"recycled {pool['recycled']}, killed {pool['killed']}")
+            for pid, calls, rss in pool["workers"]:
+                lines.append(f"  pid {pid}: {calls} calls, {rss / 2 ** 20:.0f} MiB")
+        self.plugins_display.setText("\n".join(lines))
+
+    def show_plugin_stats(self):
+        self.update_plugins_display()
+        self.tabs.setCurrentWidget(self.plugins_widget)
+        self.speak("Plugin statistics are in the Plugins tab.")
 
     def load_reminders_and_tasks(self):
-        """Load reminders and tasks from JSON file."""
-        try:
-            with open("reminders_tasks.json", "r") as f:
-                data = json.load(f)
-                self.reminders = [
-                    (dt.strptime(r["time"], "%Y-%m-%d %H:%M"), r["message"])
-                    for r in data.get("reminders", [])
-                ]
-                self.tasks = data.get("tasks", [])
-        except FileNotFoundError:
-            self.reminders = []
-            self.tasks = []
-
-    def save_reminders_and_tasks(self):
-        """Save reminders and tasks to JSON file."""
-        data = {
-            "reminders": [
-                {"time": r[0].strftime("%Y-%m-%d %H:%M"), "message": r[1]}
-                for r in self.reminders
-            ],
-            "tasks": self.tasks
-        }
+        """Replay scheduled events and tasks from the journal."""
         try:
-            with open("reminders_tasks.json", "w") as f:
-                json.dump(data, f, indent=4)
+            state = self.journal.open(legacy_file="reminders_tasks.json")
+            self.tasks = list(state["tasks"])
+            for event in state["events"].values():
+                self.scheduler.schedule(ScheduledEvent.from_dict(event))
+        except Exception as e:
+            self.append_to_log(f"Failed to load reminders/tasks: {str(e)}", "Error")
+
+    def journal_change(self, record):
+        """Record a task or event change in the journal."""
+        try:
+            self.journal.append(record)
         except Exception as e:
             self.append_to_log(f"Failed to save reminders/tasks: {str(e)}", "Error")
 
-    def add_reminder(self, time_str, message):
+    def schedule_event(self, event):
+        """Add an event to the scheduler and re-arm the check timer."""
+        self.scheduler.schedule(event)
+        if event.kind != "timer":
+            self.journal_change({"op": "event_put", "event": event.to_dict()})
+        self.rearm_scheduler()
+        return event
+
+    def add_reminder(self, time_str, message, repeat=None):
         """Add a reminder."""
         try:
             reminder_time = dt.strptime(time_str, "%H:%M %d-%m-%Y")
-            self.reminders.append((reminder_time, message))
-            self.save_reminders_and_tasks()
-            self.speak(f"Reminder set for {message} at {time_str}")
+            self.schedule_event(ScheduledEvent("reminder", reminder_time.timestamp(), message,
+                                               REPEAT_INTERVALS.get(repeat)))
+            self.speak(f"Reminder set for {message} at {time_str}" + (f", {repeat}" if repeat else ""))
             notification.notify(
                 title="Reminder Set",
                 message=f"{message} at {time_str}",
@@ -1357,12 +6242,34 @@ class VoiceAssistantGUI(QMainWindow):
             self.speak("Invalid time format. Use HH:MM DD-MM-YYYY")
             return False
 
+    def add_alarm(self, time_str, repeat=None):
+        """Set an alarm for the next occurrence of HH:MM."""
+        try:
+            alarm_time = dt.strptime(time_str, "%H:%M").time()
+            due = dt.combine(dt.now().date(), alarm_time).timestamp()
+            if due <= time.time():
+                due += 86400
+            self.schedule_event(ScheduledEvent("alarm", due, "It's time!", REPEAT_INTERVALS.get(repeat)))
+            self.speak(f"Alarm set for {time_str}" + (f", {repeat}" if repeat else ""))
+            return True
+        except ValueError:
+            self.speak("Invalid time format. Use HH:MM")
+            return False
+
+    def add_timer(self, amount, unit):
+        """Start a countdown timer."""
+        seconds = amount * {"second": 1, "minute": 60, "hour": 3600}[unit]
+        duration = f"{amount} {unit}{'s' if amount != 1 else ''}"
+        self.schedule_event(ScheduledEvent("timer", time.time() + seconds, duration))
+        self.speak(f"Timer set for {duration}")
+        return True
+
     def add_task(self, task):
         """Add a task with undo support."""
         try:
             self.tasks.append(task)
             self.task_history.append(("add", task))
-            self.save_reminders_and_tasks()
+            self.journal_change({"op": "task_add", "task": task})
             self.speak(f"Task added: {task}")
             self.list_tasks()
             return True
@@ -1378,7 +6285,7 @@ class VoiceAssistantGUI(QMainWindow):
         operation, task = self.task_history.pop()
         if operation == "add":
             self.tasks.remove(task)
-            self.save_reminders_and_tasks()
+            self.journal_change({"op": "task_remove", "task": task})
             self.speak(f"Undid adding task: {task}")
             self.list_tasks()
         self.task_history.append(("remove", task))
@@ -1390,7 +6297,7 @@ class VoiceAssistantGUI(QMainWindow):
             return
         operation, task = self.task_history.pop()
         self.tasks.append(task)
-        self.save_reminders_and_tasks()
+        self.journal_change({"op": "task_add", "task": task})
         self.speak(f"Redid adding task: {task}")
         self.list_tasks()
         self.task_history.append(("add", task))
@@ -1406,24 +6313,58 @@ class VoiceAssistantGUI(QMainWindow):
             self.speak(f"You have {len(self.tasks)} tasks.")
 
     def get_weather(self, city=None):
-        """Get weather for a city or default location."""
-        api_key = "YOUR_OPENWEATHERMAP_API_KEY"
+        """Get weather for a city or default location, answering from the cache when possible."""
         if not city:
             city = "London"
-        try:
-            url = f"http://api.openweathermap.org/data/2.5/weather?q={city}&appid={api_key}&units=metric"
-            response = requests.get(url).json()
-            if response.get("cod") == 200:
-                weather = response["weather"][0]["description"]
-                temp = response["main"]["temp"]
-                self.speak(f"In {city}, it's {weather} with a temperature of {temp} degrees Celsius.")
-                return True
-            self.speak("Could not fetch weather data.")
-            return False
-        except Exception as e:
-            self.append_to_log(f"Weather error: {str(e)}", "Error")
-            self.speak("Failed to fetch weather.")
-            return False
+        key = f"{city.lower()}|{self.weather_units}"
+        report, fresh, stored = self.weather_cache.get(key)
+        if report:
+            if fresh:
+                self.speak_weather(city, report)
+            else:
+                self.speak_weather(city, report, stored)
+                self.refresh_weather(city, key)
+            return True
+        self.refresh_weather(city, key, announce=True)
+        return True
+
+    def refresh_weather(self, city, key, announce=False):
+        """Fetch the weather in the background and store it in the cache."""
+        if key in self.weather_refreshing:
+            return
+        self.weather_refreshing.add(key)
+
+        def perform_operation(task):
+            try:
+                response = self.http.get(
+                    self.weather_api_url, "weather",
+                    params={"q": city, "appid": self.weather_api_key, "units": self.weather_units}
+                ).json()
+                if str(response.get("cod")) == "200":
+                    report = {
+                        "description": response["weather"][0]["description"],
+                        "temp": response["main"]["temp"],
+                    }
+                    self.weather_cache.put(key, report)
+                    if announce:
+                        self.speak_weather(city, report)
+                elif announce:
+                    self.speak("Could not fetch weather data.")
+            except Exception as e:
+                self.append_to_log(f"Weather error: {str(e)}", "Error")
+                if announce:
+                    self.speak("Failed to fetch weather.")
+            finally:
+                self.weather_refreshing.discard(key)
+
+        lane = TaskExecutor.LANE_USER if announce else TaskExecutor.LANE_BACKGROUND
+        self.executor.submit(perform_operation, name=f"weather {city}", lane=lane)
+
+    def speak_weather(self, city, report, stored=None):
+        """Speak a cached or fresh weather report; stale ones say when they are from."""
+        unit = {"metric": "degrees Celsius", "imperial": "degrees Fahrenheit"}.get(self.weather_units, "Kelvin")
+        prefix = f"As of {dt.fromtimestamp(stored).strftime('%H:%M')}, in" if stored else "In"
+        self.speak(f"{prefix} {city}, it's {report['description']} with a temperature of {report['temp']} {unit}.")
 
     def send_email(self, recipient, subject, body):
         """Send an email."""
@@ -1444,12 +6385,65 @@ class VoiceAssistantGUI(QMainWindow):
             self.speak("Failed to send email.")
             return False
 
+    def init_notes(self):
+        """Open the notes database, importing the old notes text file once."""
+        try:
+            os.makedirs(os.path.dirname(self.notes_db), exist_ok=True)
+            self.notes = NoteStore(self.notes_db)
+            imported = self.notes.import_text_file(self.notes_file)
+            if imported:
+                self.append_to_log(f"Imported {imported} notes from {self.notes_file}", "System")
+        except Exception as e:
+            self.append_to_log(f"Failed to open notes database: {str(e)}", "Error")
+
+    def init_knowledge_base(self):
+        """Open the local knowledge base index in the background if one has been built."""
+        self.knowledge = KnowledgeBase(self.knowledge_dir)
+        if not self.knowledge.is_built():
+            return
+
+        def preload(task):
+            try:
+                self.knowledge.open()
+            except Exception as e:
+                self.append_to_log(f"Failed to open knowledge base: {str(e)}", "Error")
+
+        self.executor.submit(preload, name="open knowledge base", lane=TaskExecutor.LANE_BACKGROUND)
+
+    def build_knowledge_base(self, source):
+        """Index a directory of text files, a JSONL file or a Wikipedia XML dump into the knowledge base."""
+        if not os.path.exists(source):
+            self.speak(f"Could not find {source}.")
+            return
+
+        def perform_operation(task):
+            try:
+                self.speak("Building the knowledge base. This can take a while.")
+                start = time.time()
+                count = self.knowledge.build(KnowledgeBase.articles_from(source))
+                self.append_to_log(f"Indexed {count} articles from {source} in {time.time() - start:.1f} s", "System")
+                self.speak(f"Knowledge base ready with {count} articles.")
+            except Exception as e:
+                self.append_to_log(f"Failed to build knowledge base: {str(e)}", "Error")
+                self.speak("Failed to build the knowledge base. See log for details.")
+
+        self.executor.submit(perform_operation, name="build knowledge base", lane=TaskExecutor.LANE_BACKGROUND)
+
+    def kb_answer(self, query, min_match):
+        """Return (title, summary) of the best local article for query, or None."""
+        if not self.knowledge or not self.knowledge.is_open():
+            return None
+        try:
+            results = self.knowledge.search(query, limit=1, min_match=min_match)
+        except Exception as e:
+            self.append_to_log(f"Knowledge base error: {str(e)}", "Error")
+            return None
+        return results[0][1:] if results else None
+
     def save_note(self, note):
-        """Save a note to a file."""
+        """Save a note to the notes database."""
         try:
-            timestamp = dt.now().strftime("%Y-%m-%d %H:%M:%S")
-            with open(self.notes_file, "a") as f:
-                f.write(f"[{timestamp}] {note}\n")
+            self.notes.add(note)
             self.speak("Note saved.")
             return True
         except Exception as e:
@@ -1457,25 +6451,45 @@ class VoiceAssistantGUI(QMainWindow):
             self.speak("Failed to save note.")
             return False
 
-    def read_notes(self):
-        """Read all notes."""
+    def show_notes(self, title, rows):
+        """Write a list of (created, body) notes to the log."""
+        lines = "\n".join(f"[{created}] {body}" for created, body in rows)
+        self.append_to_log(f"{title}:\n{lines}", "Assistant")
+
+    def read_notes(self, limit=10, more=False):
+        """Read the latest page of notes, or the next older page with more."""
         try:
-            with open(self.notes_file, "r") as f:
-                notes = f.read()
-            if notes:
-                self.append_to_log(f"Notes:\n{notes}", "Assistant")
+            self.notes_offset = self.notes_offset + limit if more else 0
+            rows = self.notes.recent(limit, self.notes_offset)
+            if rows:
+                total = self.notes.count()
+                self.show_notes(f"Notes {self.notes_offset + 1}-{self.notes_offset + len(rows)} of {total}", rows)
                 self.speak("Here are your notes.")
+            elif more:
+                self.speak("No more notes.")
             else:
                 self.speak("No notes found.")
             return True
-        except FileNotFoundError:
-            self.speak("No notes found.")
-            return False
         except Exception as e:
             self.append_to_log(f"Failed to read notes: {str(e)}", "Error")
             self.speak("Failed to read notes.")
             return False
 
+    def search_notes(self, query, limit=10):
+        """Search notes with the full-text index."""
+        try:
+            rows = self.notes.search(query, limit)
+            if rows:
+                self.show_notes(f"Notes matching '{query}'", rows)
+                self.speak(f"Found {len(rows)} notes matching {query}.")
+            else:
+                self.speak(f"No notes match {query}.")
+            return True
+        except Exception as e:
+            self.append_to_log(f"Failed to search notes: {str(e)}", "Error")
+            self.speak("Failed to search notes.")
+            return False
+
     def add_calendar_event(self, title, date_str):
         """Add a calendar event (mock implementation)."""
         try:
@@ -1490,6 +6504,7 @@ class VoiceAssistantGUI(QMainWindow):
         """Add a command alias."""
         try:
             self.aliases[alias.lower()] = command
+            self.fuzzy_index.add(alias, "alias")
             self.save_config()
             self.speak(f"Alias '{alias}' set for command '{command}'")
             return True
@@ -1515,51 +6530,44 @@ class VoiceAssistantGUI(QMainWindow):
             return False
 
     def check_scheduled_events(self):
-        """Check alarms, timers, and reminders."""
-        current_time = dt.now()
-        for reminder in self.reminders[:]:
-            if reminder[0] <= current_time:
-                self.append_to_log(f"Reminder: {reminder[1]}", "System")
-                self.speak(f"Reminder: {reminder[1]}")
-                notification.notify(
-                    title="Reminder",
-                    message=reminder[1],
-                    timeout=10
-                )
-                self.reminders.remove(reminder)
-                self.save_reminders_and_tasks()
-        self.check_alarms()
-        self.check_timers()
-
-    def check_alarms(self):
-        """Check if any alarms match the current time."""
-        current_time = dt.now().strftime("%H:%M")
-        for alarm in self.alarms[:]:
-            alarm_str = alarm.strftime("%H:%M")
-            if alarm_str == current_time:
-                self.append_to_log("Alarm! It's time!", "System")
-                self.speak("Alarm! It's time!")
-                notification.notify(
-                    title="Alarm",
-                    message="It's time!",
-                    timeout=10
-                )
-                self.alarms.remove(alarm)
-
-    def check_timers(self):
-        """Check if any timers have expired."""
-        current_time = time.time()
-        for timer in self.timers[:]:
-            end_time, duration = timer
-            if current_time >= end_time:
-                self.append_to_log(f"Timer for {duration} is up!", "System")
-                self.speak(f"Timer for {duration} is up!")
-                notification.notify(
-                    title="Timer",
-                    message=f"Timer for {duration} is up!",
-                    timeout=10
-                )
-                self.timers.remove(timer)
+        """Fire every alarm, timer and reminder that is due, then re-arm the timer."""
+        now = time.time()
+        fired = self.scheduler.pop_due(now)
+        for event, due in fired:
+            if event.kind != "timer":
+                if event.repeat:
+                    self.journal_change({"op": "event_put", "event": event.to_dict()})
+                else:
+                    self.journal_change({"op": "event_remove", "id": event.id})
+            self.fire_event(event, missed=now - due > SCHEDULE_GRACE_SECONDS, due=due)
+        self.rearm_scheduler()
+
+    def rearm_scheduler(self):
+        """Sleep until the next event is due (or the wait cap, whichever is sooner)."""
+        next_due = self.scheduler.next_due()
+        if next_due is None:
+            self.check_timer.stop()
+            return
+        delay_ms = int(max(0.0, next_due - time.time()) * 1000)
+        self.check_timer.start(min(delay_ms, SCHEDULE_MAX_WAIT_MS))
+
+    def fire_event(self, event, missed=False, due=None):
+        """Announce a due event; events missed during sleep say when they were due."""
+        if event.kind == "reminder":
+            title, text = "Reminder", f"Reminder: {event.message}"
+        elif event.kind == "alarm":
+            title, text = "Alarm", f"Alarm! {event.message}"
+        else:
+            title, text = "Timer", f"Timer for {event.message} is up!"
+        if missed and due:
+            text = f"{text} (missed at {dt.fromtimestamp(due).strftime('%H:%M')})"
+        self.append_to_log(text, "System")
+        self.speak_alert(text)
+        notification.notify(
+            title=title,
+            message=text,
+            timeout=10
+        )
 
     def process_command(self, command):
         """Main command processing method."""
@@ -1573,172 +6581,365 @@ class VoiceAssistantGUI(QMainWindow):
             self.append_to_log(f"Using alias: {command}", "System")
 
         # Check for plugin commands
-        for plugin_name, plugin in self.plugins.items():
-            if command.startswith(plugin_name):
-                try:
-                    plugin["execute"](command[len(plugin_name):].strip())
-                    return
-                except Exception as e:
-                    self.append_to_log(f"Plugin {plugin_name} error: {str(e)}", "Error")
-                    return
-
-        # File/folder commands
-        file_cmd_match = re.match(
-            r"(create|delete|open) (file|folder) (?:named|called)? ?'?([^']+)'? ?(?:in|on)? ?(desktop|documents)?",
-            command
-        )
-        if file_cmd_match:
-            action, obj_type, name, location = file_cmd_match.groups()
-            location = location or "desktop"
-            if action == "create":
-                if obj_type == "file":
-                    self.create_file(name, folder=location)
-                else:
-                    self.create_folder(name, folder=location)
-            elif action == "delete":
-                if obj_type == "file":
-                    self.delete_file(name, folder=location)
-                else:
-                    self.delete_folder(name, folder=location)
-            elif action == "open":
-                self.open_file_or_folder(name, folder=location)
+        plugin_name, rest = self.plugin_registry.match(command)
+        if plugin_name and self.run_plugin(plugin_name, rest) is not None:
             return
 
-        # Bookmark commands
-        bookmark_cmd_match = re.match(
-            r"(add|open|list) bookmarks?(?: named)? ?'?([^']*)?'?(?: for)? ?(.*)?",
-            command
-        )
-        if bookmark_cmd_match:
-            action, name, url = bookmark_cmd_match.groups()
-            if action == "add" and name and url:
-                self.add_bookmark(name, url)
-            elif action == "open" and name:
-                self.open_bookmark(name)
-            elif action == "list":
-                self.list_bookmarks()
-            return
+        route, match = self.command_router.match(command)
+        if route:
+            self.command_handlers[route](command, match)
+        else:
+            self.handle_unknown_command(command)
 
-        # Other commands
-        if command == "exit" or command == "quit":
-            self.speak("Goodbye")
-            self.close()
-        elif "time" in command:
-            self.get_time()
-        elif "date" in command:
-            self.get_date()
-        elif "hello" in command or "hi" in command:
-            self.speak("Hello there! How can I help you today?")
-        elif "system resources" in command or "system info" in command:
-            self.get_system_resources()
-        elif "take screenshot" in command:
-            self.take_screenshot()
-        elif "show file manager" in command:
-            self.show_file_manager()
-        elif "open application" in command:
-            app_name = command.replace("open application", "").strip()
-            if app_name:
-                self.open_application(app_name)
-            else:
-                self.speak("Please specify an application name.")
-        elif "clipboard" in command:
-            if "read clipboard" in command:
-                self.manage_clipboard("read")
-            elif "set clipboard" in command:
-                content = command.replace("set clipboard", "").strip()
-                if content:
-                    self.manage_clipboard("set", content)
-                else:
-                    self.speak("Please specify content for the clipboard.")
-        elif "set reminder" in command:
-            match = re.search(r"set reminder (.+) at (\d{2}:\d{2} \d{2}-\d{2}-\d{4})", command)
-            if match:
-                message, time_str = match.groups()
-                self.add_reminder(time_str, message)
-            else:
-                self.speak("Please say: set reminder [message] at HH:MM DD-MM-YYYY")
-        elif "add task" in command:
-            task = command.replace("add task", "").strip()
-            if task:
-                self.add_task(task)
-            else:
-                self.speak("Please specify a task")
-        elif "list tasks" in command:
-            self.list_tasks()
-        elif "weather" in command:
-            city_match = re.search(r"weather in (\w+)", command)
-            city = city_match.group(1) if city_match else None
-            self.get_weather(city)
-        elif "send email" in command:
-            match = re.search(r"send email to (\S+) subject (.+) body (.+)", command)
-            if match:
-                recipient, subject, body = match.groups()
-                self.send_email(recipient, subject, body)
-            else:
-                self.speak("Please say: send email to [address] subject [subject] body [message]")
-        elif "take note" in command:
-            note = command.replace("take note", "").strip()
-            if note:
-                self.save_note(note)
-            else:
-                self.speak("Please specify a note")
-        elif "read notes" in command:
-            self.read_notes()
-        elif "schedule event" in command:
-            match = re.search(r"schedule event (.+) on (\d{2}-\d{2}-\d{4} \d{2}:\d{2})", command)
-            if match:
-                title, date_str = match.groups()
-                self.add_calendar_event(title, date_str)
-            else:
-                self.speak("Please say: schedule event [title] on DD-MM-YYYY HH:MM")
-        elif "set alias" in command:
-            match = re.search(r"set alias (\w+) for (.+)", command)
-            if match:
-                alias, cmd = match.groups()
-                self.add_alias(alias, cmd)
+    def init_command_router(self):
+        """Build the command routing table and bind each route to its handler."""
+        self.command_router = CommandRouter(COMMAND_ROUTES)
+        self.fuzzy_index = FuzzyCommandIndex(self.command_resolves)
+        for name, keywords, pattern in COMMAND_ROUTES:
+            for keyword in keywords:
+                self.fuzzy_index.add(keyword, "route")
+        for phrase in COMMAND_SUGGESTIONS:
+            self.fuzzy_index.add(phrase, "route")
+        # Literal words of the route and argument patterns ("create", "hourly", ...)
+        patterns = [pattern for _, _, pattern in COMMAND_ROUTES if pattern] + [regex.pattern for regex in ARGUMENT_PATTERNS]
+        for pattern in patterns:
+            self.fuzzy_index.add_words(re.findall(r"[a-z]{3,}", re.sub(r"\\[a-zA-Z]", " ", pattern)))
+        self.command_handlers = {
+            "file": self.handle_file_command,
+            "bookmark": self.handle_bookmark_command,
+            "check_bookmarks": lambda command, match: self.check_bookmarks(),
+            "exit": self.handle_exit_command,
+            "stop_speaking": lambda command, match: self.stop_speaking(),
+            "time": lambda command, match: self.get_time(),
+            "date": lambda command, match: self.get_date(),
+            "greeting": lambda command, match: self.speak("Hello there! How can I help you today?"),
+            "system_resources": lambda command, match: self.get_system_resources(),
+            "network_stats": lambda command, match: self.show_network_stats(),
+            "plugin_stats": lambda command, match: self.show_plugin_stats(),
+            "radio_stats": lambda command, match: self.show_radio_stats(),
+            "screenshot": lambda command, match: self.take_screenshot(),
+            "file_manager": lambda command, match: self.show_file_manager(),
+            "open_application": self.handle_application_command,
+            "clipboard": self.handle_clipboard_command,
+            "reminder": self.handle_reminder_command,
+            "alarm": self.handle_alarm_command,
+            "timer": self.handle_timer_command,
+            "running_tasks": lambda command, match: self.show_running_tasks(),
+            "cancel_tasks": lambda command, match: self.cancel_tasks(),
+            "add_task": self.handle_add_task_command,
+            "list_tasks": lambda command, match: self.list_tasks(),
+            "weather": self.handle_weather_command,
+            "email": self.handle_email_command,
+            "take_note": self.handle_note_command,
+            "recent_notes": self.handle_recent_notes_command,
+            "more_notes": lambda command, match: self.read_notes(more=True),
+            "read_notes": lambda command, match: self.read_notes(),
+            "search_notes": self.handle_search_notes_command,
+            "schedule_event": self.handle_event_command,
+            "build_kb": self.handle_build_kb_command,
+            "alias": self.handle_alias_command,
+            "battery": lambda command, match: self.get_battery_status(),
+            "new_tab": self.handle_new_tab_command,
+            "close_tab": lambda command, match: self.close_browser_tab(),
+            "incognito": self.handle_incognito_command,
+            "scrape": self.handle_scrape_command,
+            "fill_form": self.handle_form_command,
+            "scan_music": lambda command, match: self.rescan_music_library(),
+            "next_track": lambda command, match: self.skip_track(1),
+            "previous_track": lambda command, match: self.skip_track(-1),
+            "shuffle_queue": lambda command, match: self.shuffle_queue(not re.search(r"\b(?:off|stop|unshuffle)\b", command)),
+            "clear_queue": lambda command, match: self.clear_queue(),
+            "show_queue": lambda command, match: self.show_queue(),
+            "enqueue_music": lambda command, match: self.enqueue_music(match.group(1) or match.group(2)),
+            "play": lambda command, match: self.handle_play_command(command),
+            "pause_music": lambda command, match: self.pause_music(),
+            "stop_music": lambda command, match: self.stop_media(),
+            "resume_music": lambda command, match: self.resume_music(),
+            "volume": lambda command, match: self.handle_volume_command(command),
+            "search": lambda command, match: self.handle_search_command(command),
+            "open_site": self.handle_open_site_command,
+        }
+
+    def command_resolves(self, command):
+        """Whether process_command would act on the command rather than treat it as unknown."""
+        if command in self.aliases or self.plugin_registry.match(command)[0]:
+            return True
+        return self.command_router.match(command)[0] is not None
+
+    def handle_file_command(self, command, match):
+        """Create, delete or open a file or folder."""
+        action, obj_type, name, location = match.groups()
+        location = location or "desktop"
+        if action == "create":
+            if obj_type == "file":
+                self.create_file(name, folder=location)
             else:
-                self.speak("Please say: set alias [name] for [command]")
-        elif "battery status" in command:
-            self.get_battery_status()
-        elif "open new tab" in command:
-            url = command.replace("open new tab", "").strip()
-            self.open_new_tab(url if url else None)
-        elif "close tab" in command:
-            self.close_browser_tab()
-        elif "open incognito" in command:
-            url = command.replace("open incognito", "").strip()
-            self.open_incognito_mode(url if url else None)
-        elif "scrape website" in command:
-            url = command.replace("scrape website", "").strip()
-            if url:
-                self.scrape_website(url)
+                self.create_folder(name, folder=location)
+        elif action == "delete":
+            if obj_type == "file":
+                self.delete_file(name, folder=location)
             else:
-                self.speak("Please specify a website URL.")
-        elif "fill form" in command:
-            match = re.search(r"fill form on (.+) with (.+)", command)
-            if match:
-                website, query = match.groups()
-                self.autofill_form(website, query)
+                self.delete_folder(name, folder=location)
+        elif action == "open":
+            self.open_file_or_folder(name, folder=location)
+
+    def handle_bookmark_command(self, command, match):
+        """Add, open or list bookmarks."""
+        action, name, url = match.groups()
+        if action == "add" and name and url:
+            self.add_bookmark(name, url)
+        elif action == "open" and name:
+            self.open_bookmark(name)
+        elif action == "list":
+            self.list_bookmarks()
+
+    def handle_exit_command(self, command, match):
+        """Say goodbye and close the window."""
+        self.speak("Goodbye")
+        self.close()
+
+    def handle_application_command(self, command, match):
+        """Open a desktop application by name."""
+        app_name = command.replace("open application", "").strip()
+        if app_name:
+            self.open_application(app_name)
+        else:
+            self.speak("Please specify an application name.")
+
+    def handle_clipboard_command(self, command, match):
+        """Read or set the clipboard."""
+        if "read clipboard" in command:
+            self.manage_clipboard("read")
+        elif "set clipboard" in command:
+            content = command.replace("set clipboard", "").strip()
+            if content:
+                self.manage_clipboard("set", content)
             else:
-                self.speak("Please say: fill form on [website] with [query]")
-        elif "play" in command:
-            self.handle_play_command(command)
-        elif "pause" in command and ("music" in command or "song" in command):
-            self.pause_music()
-        elif "stop" in command and ("music" in command or "song" in command):
-            self.stop_media()
-        elif "resume" in command and ("music" in command or "song" in command):
-            self.resume_music()
-        elif "volume" in command:
-            self.handle_volume_command(command)
-        elif "search" in command and "on" in command:
-            self.handle_search_command(command)
-        elif "open" in command and ("google" in command or "youtube" in command):
-            site = "google" if "google" in command else "youtube"
-            webbrowser.open(f"https://www.{site}.com")
-            self.speak(f"Opening {site}")
+                self.speak("Please specify content for the clipboard.")
+
+    def handle_reminder_command(self, command, match):
+        """Set a reminder from a spoken time and message."""
+        match = REMINDER_RE.search(command)
+        if match:
+            message, time_str, repeat = match.groups()
+            self.add_reminder(time_str, message, repeat)
         else:
-            self.handle_unknown_command(command)
+            self.speak("Please say: set reminder [message] at HH:MM DD-MM-YYYY")
+
+    def handle_alarm_command(self, command, match):
+        """Set a one-off or recurring alarm."""
+        match = ALARM_RE.search(command)
+        if match:
+            self.add_alarm(*match.groups())
+        else:
+            self.speak("Please say: set alarm for HH:MM, optionally followed by every day")
+
+    def handle_timer_command(self, command, match):
+        """Start a countdown timer."""
+        match = TIMER_RE.search(command)
+        if match:
+            self.add_timer(int(match.group(1)), match.group(2))
+        else:
+            self.speak("Please say: set timer for [number] seconds, minutes or hours")
+
+    def handle_add_task_command(self, command, match):
+        """Add a task."""
+        task = command.replace("add task", "").strip()
+        if task:
+            self.add_task(task)
+        else:
+            self.speak("Please specify a task")
+
+    def handle_weather_command(self, command, match):
+        """Report the weather for an optional city."""
+        city_match = WEATHER_CITY_RE.search(command)
+        city = city_match.group(1) if city_match else None
+        self.get_weather(city)
+
+    def handle_email_command(self, command, match):
+        """Send an email from a spoken address, subject and body."""
+        match = EMAIL_RE.search(command)
+        if match:
+            recipient, subject, body = match.groups()
+            self.send_email(recipient, subject, body)
+        else:
+            self.speak("Please say: send email to [address] subject [subject] body [message]")
+
+    def handle_note_command(self, command, match):
+        """Save a note."""
+        note = command.replace("take note", "").strip()
+        if note:
+            self.save_note(note)
+        else:
+            self.speak("Please specify a note")
+
+    def handle_recent_notes_command(self, command, match):
+        """Read the last N notes."""
+        match = RECENT_NOTES_RE.search(command)
+        count = match.group(1) if match else "1"
+        limit = int(count) if count.isdigit() else NUMBER_WORDS.get(count)
+        if limit:
+            self.read_notes(limit)
+        else:
+            self.speak("Please say: read last [number] notes")
+
+    def handle_search_notes_command(self, command, match):
+        """Search notes for a phrase."""
+        match = SEARCH_NOTES_RE.search(command)
+        if match:
+            self.search_notes(match.group(1).strip())
+        else:
+            self.speak("Please say: search notes for [text]")
+
+    def handle_event_command(self, command, match):
+        """Schedule a calendar event."""
+        match = EVENT_RE.search(command)
+        if match:
+            title, date_str = match.groups()
+            self.add_calendar_event(title, date_str)
+        else:
+            self.speak("Please say: schedule event [title] on DD-MM-YYYY HH:MM")
+
+    def handle_build_kb_command(self, command, match):
+        """Build the knowledge base from the configured source or a spoken path."""
+        source = command.replace("build knowledge base", "", 1).strip()
+        if source.startswith("from "):
+            source = source[5:].strip()
+        self.build_knowledge_base(os.path.expanduser(source) if source else self.knowledge_source)
+
+    def handle_alias_command(self, command, match):
+        """Set a command alias."""
+        match = ALIAS_RE.search(command)
+        if match:
+            alias, cmd = match.groups()
+            self.add_alias(alias, cmd)
+        else:
+            self.speak("Please say: set alias [name] for [command]")
+
+    def handle_new_tab_command(self, command, match):
+        """Open a new browser tab with an optional URL."""
+        url = command.replace("open new tab", "").strip()
+        self.open_new_tab(url if url else None)
+
+    def handle_incognito_command(self, command, match):
+        """Open an incognito window with an optional URL."""
+        url = command.replace("open incognito", "").strip()
+        self.open_incognito_mode(url if url else None)
+
+    def handle_scrape_command(self, command, match):
+        """Scrape the title of a website."""
+        url = command.replace("scrape website", "").strip()
+        if url:
+            self.scrape_website(url)
+        else:
+            self.speak("Please specify a website URL.")
+
+    def handle_form_command(self, command, match):
+        """Fill a search form on a website."""
+        match = FORM_RE.search(command)
+        if match:
+            website, query = match.groups()
+            self.autofill_form(website, query)
+        else:
+            self.speak("Please say: fill form on [website] with [query]")
+
+    def handle_open_site_command(self, command, match):
+        """Open Google or YouTube."""
+        site = "google" if "google" in command else "youtube"
+        webbrowser.open(f"https://www.{site}.com")
+        self.speak(f"Opening {site}")
+
+    def init_music_library(self):
+        """Open the music index and bring it up to date in the background."""
+        self.music_reload_timer = QTimer(self)
+        self.music_reload_timer.setSingleShot(True)
+        self.music_reload_timer.setInterval(500)
+        self.music_reload_timer.timeout.connect(self.update_music_library)
+        self.music_watcher = QFileSystemWatcher(self)
+        self.music_watcher.directoryChanged.connect(self.on_music_directory_changed)
+        self.executor.submit(
+            self.open_music_library, name="index music", lane=TaskExecutor.LANE_BACKGROUND,
+            on_done=self.on_music_library_scanned
+        )
+
+    def open_music_library(self, task):
+        os.makedirs(os.path.dirname(self.music_db), exist_ok=True)
+        library = MusicLibrary(self.music_db, self.music_dirs)
+        # Lookups can use what was indexed last time while the folders are walked
+        self.music_library = library
+        return library.scan(task)
+
+    def on_music_library_scanned(self, changes, error):
+        if error:
+            self.append_to_log(f"Failed to index music: {str(error)}", "Error")
+            return
+        self.append_to_log(
+            f"Music library: {changes['tracks']} tracks ({changes['added']} added, "
+            f"{changes['updated']} updated, {changes['removed']} removed)", "System"
+        )
+        self.watch_music(self.music_library.directories)
+
+    def watch_music(self, directories):
+        """Watch music folders so added, edited and removed files are indexed as they change."""
+        watched = set(self.music_watcher.directories())
+        missing = [directory for directory in directories if directory not in watched]
+        if missing:
+            failed = self.music_watcher.addPaths(missing)
+            if failed:
+                self.append_to_log(f"Not watching {len(failed)} music folders; say 'rescan music' after changing them", "Warning")
+
+    def on_music_directory_changed(self, directory):
+        self.music_changed.add(directory)
+        self.music_reload_timer.start()
+
+    def update_music_library(self):
+        """Re-index the music folders the watcher reported since the last update."""
+        directories, self.music_changed = self.music_changed, set()
+        if not directories or not self.music_library:
+            return
+
+        def on_done(result, error):
+            if error:
+                self.append_to_log(f"Failed to update music library: {str(error)}", "Error")
+                return
+            changes, new = result
+            if any(changes.values()):
+                self.append_to_log(
+                    f"Music library updated: {changes['added']} added, {changes['updated']} updated, "
+                    f"{changes['removed']} removed", "System"
+                )
+            self.watch_music(new)
+
+        self.executor.submit(
+            self.music_library.update, directories, name="update music library",
+            lane=TaskExecutor.LANE_BACKGROUND, on_done=on_done
+        )
+
+    def rescan_music_library(self):
+        """Walk the music folders again, e.g. for folders the watcher couldn't cover."""
+        if not self.music_library:
+            self.speak("The music library is still loading.")
+            return
+
+        def on_done(changes, error):
+            self.on_music_library_scanned(changes, error)
+            if not error:
+                self.speak(f"Music library has {changes['tracks']} tracks.")
+
+        self.executor.submit(
+            lambda task: self.music_library.scan(task), name="rescan music",
+            lane=TaskExecutor.LANE_BACKGROUND, on_done=on_done
+        )
+
+    def find_local_music(self, query):
+        """Return (path, artist, title) of the best library match for query, or None."""
+        if not self.music_library:
+            return None
+        tracks, score = self.music_library.find(query)
+        if not tracks or score < self.music_match_threshold:
+            return None
+        path, artist, album, title = tracks[0]
+        return path, artist, title
 
     def handle_play_command(self, command):
         """Handle play commands for different media types."""
@@ -1761,88 +6962,154 @@ class VoiceAssistantGUI(QMainWindow):
             else:
                 self.speak("Please specify a video to play on YouTube.")
         else:
-            self.speak("Please specify what to play, like a song, radio, or YouTube video.")
+            # "play <title or artist>" works for music in the local library
+            query = command.replace("play", "", 1).strip()
+            if query and self.find_local_music(query):
+                self.play_music(query)
+            else:
+                self.speak("Please specify what to play, like a song, radio, or YouTube video.")
 
     def play_music(self, query):
-        """Play music using a file or online search in a thread."""
-        def perform_operation():
-            self.progress_bar.setVisible(True)
-            self.progress_bar.setValue(0)
+        """Play the best match from the music library, or search online, in a thread."""
+        def perform_operation(task):
             try:
-                # Check if query is a local file
-                music_dir = os.path.join(os.path.expanduser("~"), "Music")
-                file_path = os.path.join(music_dir, query)
-                if os.path.exists(file_path) and file_path.lower().endswith(('.mp3', '.wav')):
-                    pygame.mixer.music.load(file_path)
-                    pygame.mixer.music.play()
+                progress = task.progress(stages=2)
+                playing = query
+                track = self.find_local_music(query)
+                if track and self.play_queue:
+                    file_path, artist, title = track
+                    if self.radio:
+                        self.radio.stop()
+                    self.play_queue.play([file_path])
                     self.music_playing = True
                     self.music_file = file_path
-                    self.speak(f"Playing {query} from local music.")
+                    playing = f"{title} by {artist}" if artist else title
+                    self.speak(f"Playing {playing} from local music.")
                 else:
                     # Use pywhatkit to play music online
                     pywhatkit.playonyt(query)
                     self.music_playing = True
                     self.music_file = None
                     self.speak(f"Playing {query} on YouTube.")
-                for i in range(1, 101):
-                    time.sleep(0.01)
-                    self.progress_bar.setValue(i)
+                progress.next_stage()
                 notification.notify(
                     title="Music Playing",
-                    message=f"Now playing: {query}",
+                    message=f"Now playing: {playing}",
                     timeout=5
                 )
+                progress.finish()
             except Exception as e:
                 self.append_to_log(f"Failed to play music: {str(e)}", "Error")
                 self.speak("Failed to play music. See log for details.")
-            finally:
-                self.progress_bar.setVisible(False)
 
-        threading.Thread(target=perform_operation, daemon=True).start()
-
-    def play_radio(self, station):
-        """Play a radio station (mock implementation)."""
+        self.executor.submit(perform_operation, name=f"play {query}", show_progress=True)
+
+    def find_radio_station(self, station):
+        """Return (name, stream URL) for a station from the config, the station cache or radio-browser.info."""
+        if re.match(r"https?://", station):
+            return station, station
+        key = " ".join(station.lower().split())
+        for name, url in self.radio_stations.items():
+            if name.lower() == key:
+                return name, url
+        cached, fresh, stored = self.radio_cache.get(key)
+        if cached and fresh:
+            return cached["name"], cached["url"]
         try:
-            # In a real implementation, this would use a radio streaming API or URL
-            self.current_radio_station = station
-            self.speak(f"Playing radio station {station}. (Note: Actual radio streaming requires additional setup.)")
-            notification.notify(
-                title="Radio Playing",
-                message=f"Station: {station}",
-                timeout=5
+            response = self.http.get(
+                f"{self.radio_directory_url}/json/stations/byname/{quote(key)}", "radio",
+                params={"limit": 5, "order": "clickcount", "reverse": "true", "hidebroken": "true"}
             )
-        except Exception as e:
-            self.append_to_log(f"Failed to play radio: {str(e)}", "Error")
-            self.speak("Failed to play radio.")
+            # Checked here rather than with raise_for_status(), whose exception depends on the HTTP backend
+            if response.status_code >= 400:
+                raise requests.RequestException(f"station directory returned status {response.status_code}")
+            stations = response.json()
+        except (requests.RequestException, ValueError):
+            if cached:
+                return cached["name"], cached["url"]  # offline: the stale entry is still worth a try
+            raise
+        if not stations:
+            return None
+        entry = {"name": stations[0]["name"].strip(), "url": stations[0].get("url_resolved") or stations[0]["url"]}
+        self.radio_cache.put(key, entry)
+        return entry["name"], entry["url"]
+
+    def play_radio(self, station):
+        """Look up a radio station and stream it in the background."""
+        if not pygame.mixer.get_init():
+            self.speak("Audio is still starting.")
+            return
+
+        def perform_operation(task):
+            try:
+                found = self.find_radio_station(station)
+                if not found:
+                    self.speak(f"I couldn't find a radio station called {station}.")
+                    return
+                name, url = found
+                if self.play_queue:
+                    self.play_queue.stop_playback()
+                if self.radio is None:
+                    self.radio = RadioStreamer(
+                        self.http, self.ffmpeg_path,
+                        on_title=lambda title: self.append_to_log(f"On {self.current_radio_station}: {title}", "System"),
+                        on_error=lambda message: self.append_to_log(message, "Error")
+                    )
+                self.current_radio_station = name
+                self.radio.play(url)
+                self.append_to_log(f"Streaming {name} from {url}", "System")
+                self.speak(f"Playing radio station {name}.")
+                notification.notify(
+                    title="Radio Playing",
+                    message=f"Station: {name}",
+                    timeout=5
+                )
+            except Exception as e:
+                self.append_to_log(f"Failed to play radio: {str(e)}", "Error")
+                self.speak("Failed to play radio.")
+
+        self.executor.submit(perform_operation, name=f"radio {station}")
+
+    def show_radio_stats(self):
+        """Log the radio stream's startup time, buffer health, underruns and reconnects."""
+        if not self.radio or self.radio.state == "stopped":
+            self.speak("No radio station is playing.")
+            return
+        stats = self.radio.stats()
+        first_audio = f"{stats['first_audio_ms']:.0f} ms" if stats["first_audio_ms"] is not None else "not yet"
+        self.append_to_log(
+            f"Radio {self.current_radio_station} ({stats['state']}): first audio after {first_audio}, "
+            f"buffer {stats['buffer_seconds']:.1f} s (min {stats['min_buffer_seconds']:.1f} s, "
+            f"avg {stats['avg_buffer_seconds']:.1f} s), {stats['underruns']} underruns, "
+            f"{stats['reconnects']} reconnects, {stats['received_kb']:.0f} KB received"
+            + (f", now playing: {stats['title']}" if stats["title"] else ""), "System"
+        )
+        self.speak(f"The radio stream has {stats['underruns']} underruns and {stats['reconnects']} reconnects so far.")
 
     def play_youtube(self, query):
         """Play a YouTube video using pywhatkit."""
-        def perform_operation():
-            self.progress_bar.setVisible(True)
-            self.progress_bar.setValue(0)
+        def perform_operation(task):
             try:
+                progress = task.progress(stages=2)
                 pywhatkit.playonyt(query)
-                for i in range(1, 101):
-                    time.sleep(0.01)
-                    self.progress_bar.setValue(i)
+                progress.next_stage()
                 self.speak(f"Playing {query} on YouTube.")
                 notification.notify(
                     title="YouTube Playing",
                     message=f"Now playing: {query}",
                     timeout=5
                 )
+                progress.finish()
             except Exception as e:
                 self.append_to_log(f"Failed to play YouTube video: {str(e)}", "Error")
                 self.speak("Failed to play YouTube video.")
-            finally:
-                self.progress_bar.setVisible(False)
 
-        threading.Thread(target=perform_operation, daemon=True).start()
+        self.executor.submit(perform_operation, name=f"youtube {query}", show_progress=True)
 
     def pause_music(self):
         """Pause currently playing music."""
-        if self.music_playing and pygame.mixer.music.get_busy():
-            pygame.mixer.music.pause()
+        if self.play_queue and self.play_queue.current()[2] == "playing":
+            self.play_queue.pause()
             self.speak("Music paused.")
             self.append_to_log("Music paused", "System")
             notification.notify(
@@ -1855,8 +7122,8 @@ class VoiceAssistantGUI(QMainWindow):
 
     def resume_music(self):
         """Resume paused music."""
-        if self.music_playing and not pygame.mixer.music.get_busy():
-            pygame.mixer.music.unpause()
+        if self.play_queue and self.play_queue.current()[2] == "paused":
+            self.play_queue.resume()
             self.speak("Music resumed.")
             self.append_to_log("Music resumed", "System")
             notification.notify(
@@ -1867,6 +7134,71 @@ class VoiceAssistantGUI(QMainWindow):
         else:
             self.speak("No music is paused or playing.")
 
+    def on_track_started(self, path):
+        """Called by the play queue when a track starts."""
+        self.music_playing = True
+        self.music_file = path
+        self.append_to_log(f"Now playing: {os.path.basename(path)}", "System")
+
+    def enqueue_music(self, query):
+        """Add the best library match for query to the play queue."""
+        if not self.play_queue:
+            self.speak("Audio is still starting.")
+            return
+        track = self.find_local_music(query)
+        if not track:
+            self.speak(f"I couldn't find {query} in your music library.")
+            return
+        path, artist, title = track
+        if self.radio and self.play_queue.current()[2] == "stopped":
+            self.radio.stop()
+        self.play_queue.enqueue([path])
+        self.speak(f"Added {title} by {artist} to the queue." if artist else f"Added {title} to the queue.")
+
+    def skip_track(self, step):
+        """Play the next (step 1) or previous (step -1) track in the queue."""
+        if not self.play_queue or not self.play_queue.current()[0]:
+            self.speak("The music queue is empty.")
+            return
+        if step > 0:
+            self.play_queue.next()
+        else:
+            self.play_queue.previous()
+
+    def shuffle_queue(self, enabled):
+        if not self.play_queue or not self.play_queue.current()[1]:
+            self.speak("There is nothing queued to shuffle.")
+            return
+        self.play_queue.shuffle(enabled)
+        self.speak("Shuffled the queue." if enabled else "Shuffle off.")
+
+    def clear_queue(self):
+        if self.play_queue:
+            self.play_queue.clear()
+        self.speak("Cleared the queue.")
+
+    def show_queue(self):
+        """Log the current and upcoming tracks with the queue's playback stats."""
+        if not self.play_queue:
+            self.speak("Audio is still starting.")
+            return
+        path, upcoming, state = self.play_queue.current()
+        if not path:
+            self.speak("The music queue is empty.")
+            return
+        stats = self.play_queue.stats()
+        lines = [f"{state.capitalize()}: {os.path.basename(path)}"]
+        lines += [f"  {i}. {os.path.basename(track)}" for i, track in enumerate(upcoming[:10], 1)]
+        if len(upcoming) > 10:
+            lines.append(f"  ... and {len(upcoming) - 10} more")
+        lines.append(
+            f"{stats['switches']} switches ({stats['gapless']} gapless, {stats['underruns']} underruns), "
+            f"switch latency avg {stats['avg_switch_ms']:.0f} ms / max {stats['max_switch_ms']:.0f} ms, "
+            f"buffer {stats['buffer_mb']:.0f} MB of {self.music_buffer_mb} MB"
+        )
+        self.append_to_log("\n".join(lines), "System")
+        self.speak(f"{len(upcoming)} tracks after the current one.")
+
     def handle_volume_command(self, command):
         """Handle volume control commands."""
         if volume_control_available and platform.system() == "Windows":
@@ -1889,7 +7221,7 @@ class VoiceAssistantGUI(QMainWindow):
                 volume.SetMute(False, None)
                 self.speak("Volume unmuted.")
             elif "set volume" in command:
-                match = re.search(r"set volume to (\d+)", command)
+                match = VOLUME_RE.search(command)
                 if match:
                     level = int(match.group(1)) / 100
                     if 0 <= level <= 1:
@@ -1906,10 +7238,9 @@ class VoiceAssistantGUI(QMainWindow):
 
     def handle_search_command(self, command):
         """Handle search commands for different platforms."""
-        def perform_operation():
-            self.progress_bar.setVisible(True)
-            self.progress_bar.setValue(0)
+        def perform_operation(task):
             try:
+                progress = task.progress(stages=2)
                 query = command.replace("search", "").replace("on", "").strip()
                 if "google" in command:
                     search_url = f"https://www.google.com/search?q={quote(query)}"
@@ -1920,8 +7251,15 @@ class VoiceAssistantGUI(QMainWindow):
                     webbrowser.open(search_url)
                     self.speak(f"Searching YouTube for {query}.")
                 elif "wikipedia" in command:
+                    local = self.kb_answer(query, min_match=0.5)
+                    if local:
+                        title, summary = local
+                        self.speak(summary)
+                        self.append_to_log(f"Knowledge base summary for {query} ({title}): {summary}", "Assistant")
+                        return
+                    progress.next_stage()
                     try:
-                        summary = wikipedia.summary(query, sentences=2)
+                        summary = self.wiki_summary(query, sentences=2)
                         self.speak(summary)
                         self.append_to_log(f"Wikipedia summary for {query}: {summary}", "Assistant")
                     except wikipedia.exceptions.DisambiguationError as e:
@@ -1930,44 +7268,69 @@ class VoiceAssistantGUI(QMainWindow):
                         self.speak(f"No Wikipedia page found for {query}.")
                 else:
                     self.speak("Please specify where to search, e.g., Google, YouTube, or Wikipedia.")
-                for i in range(1, 101):
-                    time.sleep(0.01)
-                    self.progress_bar.setValue(i)
+                progress.finish()
             except Exception as e:
                 self.append_to_log(f"Search error: {str(e)}", "Error")
                 self.speak("Failed to perform search.")
-            finally:
-                self.progress_bar.setVisible(False)
 
-        threading.Thread(target=perform_operation, daemon=True).start()
+        self.executor.submit(perform_operation, name=f"search {command}", deadline=60, show_progress=True)
+
+    def wiki_summary(self, query, sentences=1):
+        """wikipedia.summary through the on-disk cache, including cached PageError/DisambiguationError."""
+        key = " ".join(re.findall(r"\w+", query.lower())) + f"|{sentences}"
+        cached, fresh, stored = self.wiki_cache.get(key)
+        if cached is None or not fresh:
+            try:
+                cached = {"summary": wikipedia.summary(query, sentences=sentences)}
+                self.wiki_cache.put(key, cached)
+            except wikipedia.exceptions.DisambiguationError as e:
+                cached = {"error": "disambiguation", "options": e.options[:20]}
+                self.wiki_cache.put(key, cached, ttl=self.wiki_negative_ttl)
+            except wikipedia.exceptions.PageError:
+                cached = {"error": "page"}
+                self.wiki_cache.put(key, cached, ttl=self.wiki_negative_ttl)
+            except Exception:
+                if cached is None:
+                    raise
+                # Offline: answer from the expired entry
+        if cached.get("error") == "disambiguation":
+            raise wikipedia.exceptions.DisambiguationError(query, cached["options"])
+        if cached.get("error") == "page":
+            raise wikipedia.exceptions.PageError(query)
+        return cached["summary"]
 
     def handle_unknown_command(self, command):
         """Handle unrecognized commands with suggestions or plugin fallback."""
-        # Try fuzzy matching with known commands
-        known_commands = [
-            "time", "date", "weather", "set reminder", "add task", "list tasks",
-            "take screenshot", "open application", "play music", "volume up",
-            "search on google", "open bookmark", "add bookmark", "list bookmarks",
-            "create file", "delete folder", "open file", "take note", "read notes",
-            "send email", "schedule event", "set alias", "battery status"
-        ]
-        matches = [cmd for cmd in known_commands if command in cmd or cmd in command]
-        if matches:
-            self.speak(f"Did you mean '{matches[0]}'? Please try again.")
+        # Misheard command words ("whether in paris"): run confident corrections
+        # straight away, otherwise suggest the closest command
+        corrected, score = self.fuzzy_index.match(command)
+        if corrected and score >= self.fuzzy_execute_threshold:
+            self.append_to_log(f"Heard '{command}', running '{corrected}' (match {score:.2f})", "System")
+            self.process_command(corrected)
             return
+        suggestions = self.fuzzy_index.suggest(command, limit=1)
+        if corrected:
+            suggestions.append((corrected, score))
+        if suggestions:
+            suggestion, score = max(suggestions, key=lambda item: item[1])
+            if score >= self.fuzzy_suggest_threshold:
+                self.speak(f"Did you mean '{suggestion}'? Please try again.")
+                return
 
         # Try plugins for custom commands
-        for plugin_name, plugin in self.plugins.items():
-            if plugin.get("handles_unknown", False):
-                try:
-                    plugin["execute"](command)
-                    return
-                except Exception as e:
-                    self.append_to_log(f"Plugin {plugin_name} error on unknown command: {str(e)}", "Error")
+        for plugin_name in self.plugin_registry.unknown_handlers():
+            if self.run_plugin(plugin_name, command):
+                return
 
-        # Default to Wikipedia search as a fallback
+        # Then the local knowledge base, then Wikipedia
+        local = self.kb_answer(command, min_match=1.0)
+        if local:
+            title, summary = local
+            self.speak(f"I didn't understand the command, but here's a brief info: {summary}")
+            self.append_to_log(f"Knowledge base fallback for {command} ({title}): {summary}", "Assistant")
+            return
         try:
-            summary = wikipedia.summary(command, sentences=1)
+            summary = self.wiki_summary(command, sentences=1)
             self.speak(f"I didn't understand the command, but here's a brief info: {summary}")
             self.append_to_log(f"Wikipedia fallback for {command}: {summary}", "Assistant")
         except wikipedia.exceptions.DisambiguationError:
@@ -1994,10 +7357,35 @@ class VoiceAssistantGUI(QMainWindow):
         else:
             # Actually close the application
             self.save_config()
-            self.save_reminders_and_tasks()
-            pygame.mixer.quit()
+            # Stop everything that can still produce work or log lines before closing the stores and sinks
+            if self.voice_thread and self.voice_thread.isRunning():
+                self.voice_thread.stop()
+                self.voice_thread.wait(1000)
+            self.executor.shutdown()
+            if self.plugin_pool:
+                self.plugin_pool.close()
+            if self.speech:
+                self.speech.stop()
+            if self.play_queue:
+                self.play_queue.stop()
+                self.play_queue.join(1)
+            if self.radio:
+                self.radio.stop()
+            if "pygame" in sys.modules:
+                pygame.mixer.quit()
+            self.journal.close()
+            if self.notes:
+                self.notes.close()
+            if self.knowledge:
+                self.knowledge.close()
+            if self.music_library:
+                self.music_library.close()
+            self.http.close()
+            self.log_spill_sink.close()
+            self.error_sink.close()
             try:
-                keyboard.unhook_all()
+                if "keyboard" in sys.modules:
+                    keyboard.unhook_all()
             except:
                 pass
             if self.tray_icon:
@@ -2023,6 +7411,10 @@ class VoiceAssistantGUI(QMainWindow):
     # ... [rest of the existing methods remain the same] ...
 
 if __name__ == '__main__':
+    if "--plugin-worker" in sys.argv:
+        plugin_worker_main()
+        sys.exit(0)
+
     app = QApplication(sys.argv)
     
     # Ensure the application doesn't quit when last window is closed
@@ -2030,4 +7422,5 @@ if __name__ == '__main__':
     
     assistant = VoiceAssistantGUI()
     assistant.show()
+    assistant.startup.mark("window shown")
     sys.exit(app.exec_())
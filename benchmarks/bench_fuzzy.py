@@ -0,0 +1,118 @@
+"""Misheard commands: the old substring "Did you mean" vs. the fuzzy command index.
+
+Usage: python benchmarks/bench_fuzzy.py [--repeat N]
+
+Each case is an utterance the router rejects and the route the user meant
+(None for questions that should go on to the knowledge lookup).
+"""
+import argparse
+import time
+
+from common import load_assistant, percentile, report
+
+CASES = [
+    ("whether in paris", "weather"), ("wether in london", "weather"),
+    ("tak screenshot", "screenshot"), ("take screen shot", "screenshot"),
+    ("set remainder call mom at 18:30 12-05-2026", "reminder"),
+    ("batery status", "battery"), ("battery statis", "battery"),
+    ("creat file named report.txt", "file"), ("scedule event standup on 12-05-2026 09:00", "schedule_event"),
+    ("open aplication notepad", "open_application"), ("ad task buy milk", "add_task"),
+    ("list task", "list_tasks"), ("sent email to a@b.com subject lunch body noon", "email"),
+    ("tek note buy eggs", "take_note"), ("reed notes", "read_notes"),
+    ("sistem resources", "system_resources"), ("hallo", "greeting"),
+    ("who is albert einstein", None), ("what is the capital of france", None),
+    ("who is tim cook", None), ("tell me a joke", None), ("how tall is mount everest", None),
+]
+KNOWN_COMMANDS = [
+    "time", "date", "weather", "set reminder", "add task", "list tasks",
+    "take screenshot", "open application", "play music", "volume up",
+    "search on google", "open bookmark", "add bookmark", "list bookmarks",
+    "create file", "delete folder", "open file", "take note", "read notes",
+    "send email", "schedule event", "set alias", "battery status"
+]
+
+
+def legacy(command):
+    """The original handle_unknown_command suggestion: bare substring containment."""
+    known_commands = list(KNOWN_COMMANDS)
+    matches = [cmd for cmd in known_commands if command in cmd or cmd in command]
+    return ("suggest", matches[0]) if matches else ("lookup", None)
+
+
+def make_host(assistant):
+    """A bare object carrying the router and the fuzzy index."""
+    gui = assistant.VoiceAssistantGUI
+
+    class Host:
+        command_resolves = gui.command_resolves
+
+    host = Host()
+    host.aliases, host.plugins = {}, {}
+    host.command_router = assistant.CommandRouter(assistant.COMMAND_ROUTES)
+    host.fuzzy_index = assistant.FuzzyCommandIndex(host.command_resolves)
+    # Same phrases init_command_router indexes
+    for name, keywords, pattern in assistant.COMMAND_ROUTES:
+        for keyword in keywords:
+            host.fuzzy_index.add(keyword, "route")
+    for phrase in assistant.COMMAND_SUGGESTIONS:
+        host.fuzzy_index.add(phrase, "route")
+    patterns = [p for _, _, p in assistant.COMMAND_ROUTES if p] + [r.pattern for r in assistant.ARGUMENT_PATTERNS]
+    for pattern in patterns:
+        host.fuzzy_index.add_words(assistant.re.findall(r"[a-z]{3,}", assistant.re.sub(r"\\[a-zA-Z]", " ", pattern)))
+    return host
+
+
+def fuzzy(host, execute=0.75, suggest=0.6):
+    """The decision handle_unknown_command now makes."""
+    def decide(command):
+        corrected, score = host.fuzzy_index.match(command)
+        if corrected and score >= execute:
+            return "run", host.command_router.match(corrected)[0]
+        suggestions = host.fuzzy_index.suggest(command, limit=1)
+        if corrected:
+            suggestions.append((corrected, score))
+        if suggestions and max(score for _, score in suggestions) >= suggest:
+            return "suggest", max(suggestions, key=lambda item: item[1])[0]
+        return "lookup", None
+    return decide
+
+
+def evaluate(decide, repeat):
+    latencies, outcomes = [], []
+    for _ in range(repeat):
+        outcomes = []
+        for command, wanted in CASES:
+            t0 = time.perf_counter()
+            action, target = decide(command)
+            latencies.append((time.perf_counter() - t0) * 1e6)
+            outcomes.append((action, target, wanted))
+    ran = sum(1 for action, target, wanted in outcomes if action == "run" and target == wanted)
+    wrong = sum(1 for action, target, wanted in outcomes if action == "run" and target != wanted)
+    suggested = sum(1 for action, _, wanted in outcomes if action == "suggest" and wanted)
+    lookups = sum(1 for action, _, wanted in outcomes if action == "lookup" and wanted)
+    blocked = sum(1 for action, _, wanted in outcomes if action != "lookup" and wanted is None)
+    return latencies, (f"{ran} run directly, {wrong} run wrongly, {suggested} suggested, "
+                       f"{lookups} misheard sent to lookup, {blocked} questions intercepted")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    assistant = load_assistant()
+    t0 = time.perf_counter()
+    host = make_host(assistant)
+    build_ms = (time.perf_counter() - t0) * 1000
+
+    rows = [("index build", f"{build_ms:.1f} ms, {host.fuzzy_index.stats()}")]
+    for label, decide in (("substring", legacy), ("fuzzy, first call", fuzzy(host))):
+        latencies, outcome = evaluate(decide, 1)
+        rows.append((label, f"p50 {percentile(latencies, 50):.1f} us, p99 {percentile(latencies, 99):.1f} us; {outcome}"))
+    latencies, _ = evaluate(fuzzy(host), args.repeat)
+    rows.append(("fuzzy, warm", f"p50 {percentile(latencies, 50):.1f} us, p99 {percentile(latencies, 99):.1f} us"))
+    report(f"{len(CASES)} unrecognised utterances", rows)
+
+
+if __name__ == "__main__":
+    main()
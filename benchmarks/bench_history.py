@@ -0,0 +1,98 @@
+"""Autocomplete over a large command history: old linear substring scan vs. the prefix-indexed history.
+
+Usage: python benchmarks/bench_history.py [--entries N] [--lookups N] [--memory]
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+
+from common import load_assistant, percentile, report
+
+TEMPLATES = [
+    "what's the weather in {city}", "set reminder {thing} at {hh}:{mm} {dd}-05-2026",
+    "take note {thing}", "search {thing} on google", "play {thing}", "open bookmark {word}",
+    "add task {thing}", "set timer for {n} minutes", "send email to {word}@example.com subject {word} body {thing}",
+    "open application {word}", "search notes {thing}", "create file named {word}.txt in documents",
+]
+WORDS = ["alpha", "bravo", "charlie", "delta", "echo", "foxtrot", "golf", "hotel", "india", "juliet",
+         "kilo", "lima", "mike", "november", "oscar", "papa", "quebec", "romeo", "sierra", "tango"]
+CITIES = ["paris", "london", "tokyo", "berlin", "madrid", "rome", "oslo", "lima", "cairo", "delhi"]
+
+
+def make_history(count, seed=1):
+    """count uses over the last year; a fifth of them repeats earlier commands."""
+    rng = random.Random(seed)
+    now = time.time()
+    uses = []
+    for i in range(count):
+        if uses and rng.random() < 0.2:
+            command = rng.choice(uses)[0]
+        else:
+            command = rng.choice(TEMPLATES).format(
+                city=rng.choice(CITIES), thing=" ".join(rng.choices(WORDS, k=rng.randint(1, 4))),
+                word=rng.choice(WORDS) + str(rng.randint(0, 999)), n=rng.randint(1, 60),
+                hh=f"{rng.randint(0, 23):02d}", mm=f"{rng.randint(0, 59):02d}", dd=f"{rng.randint(1, 28):02d}",
+            )
+        uses.append((command, now - (count - i) * 365 * 86400 / count))
+    return uses
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entries", type=int, default=100000)
+    parser.add_argument("--lookups", type=int, default=2000)
+    parser.add_argument("--memory", action="store_true", help="also measure peak memory of a load (slow)")
+    args = parser.parse_args()
+
+    assistant = load_assistant()
+    uses = make_history(args.entries)
+    path = os.path.join(tempfile.mkdtemp(prefix="history-bench-"), "history.jsonl")
+
+    history = assistant.CommandHistory(path)
+    t0 = time.perf_counter()
+    for command, when in uses:
+        history.add(command, when)
+    add_time = time.perf_counter() - t0
+
+    loaded = assistant.CommandHistory(path)
+    t0 = time.perf_counter()
+    loaded.load()
+    load_time = time.perf_counter() - t0
+    memory = ""
+    if args.memory:
+        tracemalloc.start()
+        assistant.CommandHistory(path).load()
+        memory = f", peak {tracemalloc.get_traced_memory()[1] / 2 ** 20:.0f} MiB"
+        tracemalloc.stop()
+
+    legacy = [command for command, _ in uses]
+    rng = random.Random(2)
+    prefixes = []
+    for _ in range(args.lookups):
+        command = rng.choice(legacy).lower()
+        start = rng.choice([0] + [i + 1 for i, c in enumerate(command) if c == " "])
+        prefixes.append(command[start:start + rng.randint(1, 16)])
+
+    def timed(func):
+        latencies = []
+        for prefix in prefixes:
+            t = time.perf_counter()
+            func(prefix)
+            latencies.append((time.perf_counter() - t) * 1000)
+        return latencies
+
+    old = timed(lambda text: [cmd for cmd in legacy if text.lower() in cmd.lower()])
+    new = timed(lambda text: loaded.complete(text, 10))
+    report(f"{args.entries} history uses, {len(loaded)} distinct commands", [
+        ("append", f"{add_time / args.entries * 1e6:.1f} us per command ({history.lines} lines on disk)"),
+        ("load at startup", f"{load_time * 1000:.0f} ms{memory}"),
+        ("substring scan", f"p50 {percentile(old, 50):.2f} ms, p99 {percentile(old, 99):.2f} ms per keystroke"),
+        ("prefix index", f"p50 {percentile(new, 50) * 1000:.1f} us, p99 {percentile(new, 99) * 1000:.1f} us per keystroke"),
+    ])
+
+
+if __name__ == "__main__":
+    main()
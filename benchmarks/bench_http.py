@@ -0,0 +1,88 @@
+"""Bare requests.get per call vs. the shared pooled HttpClient against a local server.
+
+Usage: python benchmarks/bench_http.py [--requests N] [--delay MS]
+"""
+import argparse
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from common import load_assistant, percentile, report
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+    disable_nagle_algorithm = True
+    delay = 0.0
+    connections = 0
+
+    def setup(self):
+        super().setup()
+        Handler.connections += 1
+
+    def do_GET(self):
+        time.sleep(self.delay)
+        body = b'{"cod": 200, "weather": [{"description": "clear sky"}], "main": {"temp": 21.5}}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def timed(func, rounds):
+    """Return per-call latencies in ms."""
+    latencies = []
+    for _ in range(rounds):
+        t0 = time.perf_counter()
+        func()
+        latencies.append((time.perf_counter() - t0) * 1000)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--delay", type=float, default=0.0, help="server think time per request in ms")
+    args = parser.parse_args()
+
+    assistant = load_assistant()
+    Handler.delay = args.delay / 1000
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/weather"
+
+    Handler.connections = 0
+    bare = timed(lambda: requests.get(url, timeout=5), args.requests)
+    bare_connections = Handler.connections
+
+    client = assistant.HttpClient()
+    Handler.connections = 0
+    pooled = timed(lambda: client.get(url, "weather"), args.requests)
+    pooled_connections = Handler.connections
+
+    Handler.connections = 0
+    t0 = time.perf_counter()
+    client.get_many([url] * args.requests, "weather")
+    batch_time = time.perf_counter() - t0
+    batch_connections = Handler.connections
+
+    backend = "httpx" + (" (http2 capable)" if client.http2 else "") if client.client else "requests.Session"
+    report(f"{args.requests} GETs, server delay {args.delay:g} ms, client {backend}", [
+        ("bare requests.get", f"p50 {percentile(bare, 50):.2f} ms, p99 {percentile(bare, 99):.2f} ms, "
+                              f"{bare_connections} connections"),
+        ("shared client", f"p50 {percentile(pooled, 50):.2f} ms, p99 {percentile(pooled, 99):.2f} ms, "
+                          f"{pooled_connections} connections"),
+        ("fetch_many", f"{batch_time * 1000:.1f} ms total, {batch_connections} connections"),
+    ])
+    client.close()
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""Build time, throughput and on-disk size of the local knowledge base index.
+
+Usage: python benchmarks/bench_kb_build.py [--articles N] [--words N]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from common import load_assistant, report
+
+
+def make_vocabulary(size, rng):
+    """Random pseudo-words."""
+    letters = np.frombuffer(b"abcdefghijklmnopqrstuvwxyz", dtype=np.uint8)
+    lengths = rng.integers(3, 11, size)
+    chars = letters[rng.integers(0, 26, lengths.sum())].tobytes().decode()
+    ends = np.cumsum(lengths)
+    return [chars[end - length:end] for end, length in zip(ends, lengths)]
+
+
+def make_articles(count, words, seed=11, vocabulary_size=50000):
+    """Yield (title, text) pairs of synthetic articles; word frequencies follow Zipf's law."""
+    rng = np.random.default_rng(seed)
+    vocabulary = make_vocabulary(vocabulary_size, rng)
+    cdf = np.cumsum(1 / np.arange(1, vocabulary_size + 1))
+    cdf /= cdf[-1]
+    for i in range(count):
+        body = [vocabulary[j] for j in np.searchsorted(cdf, rng.random(words))]
+        title = " ".join(vocabulary[j] for j in rng.integers(100, vocabulary_size, 2))
+        sentences = [" ".join(body[j:j + 12]).capitalize() + "." for j in range(0, words, 12)]
+        yield f"{title} {i}", " ".join(sentences)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--articles", type=int, default=100000)
+    parser.add_argument("--words", type=int, default=200, help="words per article")
+    args = parser.parse_args()
+
+    assistant = load_assistant()
+    directory = tempfile.mkdtemp(prefix="kb-bench-")
+    kb = assistant.KnowledgeBase(directory)
+    t0 = time.perf_counter()
+    documents = kb.build(make_articles(args.articles, args.words))
+    build_time = time.perf_counter() - t0
+    sizes = {name: os.path.getsize(kb.path(name)) for name in kb.FILES}
+    t0 = time.perf_counter()
+    kb.open()
+    open_time = time.perf_counter() - t0
+
+    report(f"knowledge base build, {documents:,} articles x {args.words} words", [
+        ("build", f"{build_time:.1f} s ({documents / build_time:,.0f} articles/s)"),
+        ("terms", f"{kb.meta['terms']:,}"),
+        ("on disk", ", ".join(f"{name} {size / 1e6:.1f} MB" for name, size in sizes.items())),
+        ("open", f"{open_time * 1000:.0f} ms"),
+    ])
+
+
+if __name__ == "__main__":
+    main()
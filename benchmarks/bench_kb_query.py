@@ -0,0 +1,47 @@
+"""BM25 query latency on the local knowledge base index.
+
+Usage: python benchmarks/bench_kb_query.py [--articles N] [--queries N]
+"""
+import argparse
+import random
+import tempfile
+import time
+
+from bench_kb_build import make_articles
+from common import load_assistant, percentile, report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--articles", type=int, default=100000)
+    parser.add_argument("--words", type=int, default=200, help="words per article")
+    parser.add_argument("--queries", type=int, default=500)
+    args = parser.parse_args()
+
+    assistant = load_assistant()
+    kb = assistant.KnowledgeBase(tempfile.mkdtemp(prefix="kb-bench-"))
+    kb.build(make_articles(args.articles, args.words))
+    rng = random.Random(5)
+    by_df = [term for term, _, _ in sorted(kb.iter_terms(), key=lambda entry: entry[2])]
+    rare, common = by_df[:len(by_df) // 2], by_df[-200:]
+
+    cases = {
+        "1 rare word": lambda: [rng.choice(rare)],
+        "2 rare words": lambda: rng.sample(rare, 2),
+        "3 words, 1 common": lambda: rng.sample(rare, 2) + [rng.choice(common)],
+        "2 common words": lambda: rng.sample(common, 2),
+    }
+    rows = [("articles", f"{kb.meta['documents']:,}, {kb.meta['terms']:,} terms")]
+    for name, make_query in cases.items():
+        latencies = []
+        for _ in range(args.queries):
+            query = " ".join(make_query())
+            t0 = time.perf_counter()
+            kb.search(query)
+            latencies.append((time.perf_counter() - t0) * 1000)
+        rows.append((name, f"p50 {percentile(latencies, 50):.2f} ms, p99 {percentile(latencies, 99):.2f} ms"))
+    report("knowledge base query", rows)
+
+
+if __name__ == "__main__":
+    main()
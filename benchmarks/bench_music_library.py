@@ -0,0 +1,132 @@
+"""Music library on a synthetic collection: index and rescan cost, and "play song X" lookups, old file name check vs. the tag index.
+
+Usage: python benchmarks/bench_music_library.py [--tracks N] [--queries N]
+"""
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import time
+
+from common import load_assistant, percentile, report
+
+SYLLABLES = [c + v for c in "bcdfghklmnprstvz" for v in "aeiou"] + ["ing", "er", "on", "el", "ar", "ey"]
+
+
+def make_words(count, rng):
+    words = set()
+    while len(words) < count:
+        words.add("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))))
+    return sorted(words)
+
+
+def make_collection(root, count, seed=1):
+    """Write count empty tracks as root/Artist/Album/NN Title.mp3; returns (path, artist, title) for each."""
+    rng = random.Random(seed)
+    vocabulary = make_words(20000, rng)
+    tracks = []
+    while len(tracks) < count:
+        artist = " ".join(rng.choices(vocabulary, k=rng.randint(1, 3))).title()
+        for _ in range(rng.randint(1, 6)):
+            album = " ".join(rng.choices(vocabulary, k=rng.randint(1, 3))).title()
+            directory = os.path.join(root, artist, album)
+            os.makedirs(directory, exist_ok=True)
+            for number in range(1, rng.randint(8, 15)):
+                title = " ".join(rng.choices(vocabulary, k=rng.randint(1, 4))).title()
+                path = os.path.join(directory, f"{number:02d} {title}.mp3")
+                open(path, "wb").close()
+                tracks.append((path, artist, title))
+    return tracks[:count]
+
+
+def mishear(text, rng):
+    """Swap or drop one letter of the longest word, as a recognizer might."""
+    words = text.split()
+    i = max(range(len(words)), key=lambda n: len(words[n]))
+    word = words[i]
+    at = rng.randrange(1, len(word))
+    if rng.random() < 0.5:
+        words[i] = word[:at] + word[at + 1:]
+    else:
+        words[i] = word[:at] + rng.choice("aeiou" if word[at] in "aeiou" else "bdgkmnpst") + word[at + 1:]
+    return " ".join(words)
+
+
+def lookups(library, queries):
+    """Return (latencies in ms, share of queries whose track was among the results)."""
+    latencies, found = [], 0
+    for query, path in queries:
+        t0 = time.perf_counter()
+        tracks, score = library.find(query)
+        latencies.append((time.perf_counter() - t0) * 1000)
+        found += any(track[0] == path for track in tracks)
+    return latencies, found / len(queries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tracks", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=500)
+    args = parser.parse_args()
+
+    assistant = load_assistant()
+    workdir = tempfile.mkdtemp(prefix="music-bench-")
+    root = os.path.join(workdir, "Music")
+    try:
+        t0 = time.perf_counter()
+        tracks = make_collection(root, args.tracks)
+        generate_time = time.perf_counter() - t0
+        db = os.path.join(workdir, "music.db")
+
+        t0 = time.perf_counter()
+        library = assistant.MusicLibrary(db, [root])
+        changes = library.scan()
+        scan_time = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        rescan = library.scan()
+        rescan_time = time.perf_counter() - t0
+
+        album = os.path.dirname(tracks[len(tracks) // 2][0])
+        open(os.path.join(album, "99 Bonus Track.mp3"), "wb").close()
+        t0 = time.perf_counter()
+        update, _ = library.update([album])
+        update_time = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        reopened = assistant.MusicLibrary(db, [root])
+        open_time = time.perf_counter() - t0
+
+        rng = random.Random(2)
+        sample = rng.sample(tracks, args.queries)
+        exact = [(f"{title} by {artist}".lower(), path) for path, artist, title in sample]
+        titles = [(title.lower(), path) for path, artist, title in sample]
+        misheard = [(mishear(query, rng), path) for query, path in exact]
+
+        t0 = time.perf_counter()
+        old_hits = sum(os.path.exists(os.path.join(root, query)) for query, _ in exact)
+        old_time = (time.perf_counter() - t0) * 1000 / len(exact)
+
+        rows = [
+            ("write collection", f"{generate_time:.1f} s"),
+            ("first scan", f"{scan_time:.1f} s, {changes}"),
+            ("rescan, nothing changed", f"{rescan_time:.2f} s, {rescan}"),
+            ("update one album", f"{update_time * 1000:.1f} ms, {update}"),
+            ("open existing index", f"{open_time * 1000:.0f} ms, {len(reopened.words)} tag words"),
+            ("index size", f"{os.path.getsize(db) / 1e6:.1f} MB"),
+            ("old: file name in ~/Music", f"{old_time:.3f} ms, {old_hits / len(exact):.0%} found"),
+        ]
+        for label, queries in (("title by artist", exact), ("title only", titles), ("one word misheard", misheard)):
+            latencies, found = lookups(reopened, queries)
+            rows.append((label, f"p50 {percentile(latencies, 50):.2f} ms, p99 {percentile(latencies, 99):.2f} ms, "
+                                f"{found:.0%} found"))
+        report(f"music library, {len(tracks)} tracks, fts {library.fts}", rows)
+        library.close()
+        reopened.close()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
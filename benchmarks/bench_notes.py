@@ -0,0 +1,64 @@
+"""Full-file note reads vs. indexed queries on the SQLite note store.
+
+Usage: python benchmarks/bench_notes.py [--notes N]
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from common import load_assistant, percentile, report
+
+WORDS = ("meeting groceries project invoice dentist python release garden "
+         "call email budget travel birthday review deploy lunch book gym").split()
+
+
+def timed(func, rounds):
+    """Return per-call latencies in ms."""
+    latencies = []
+    for _ in range(rounds):
+        t0 = time.perf_counter()
+        func()
+        latencies.append((time.perf_counter() - t0) * 1000)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--notes", type=int, default=100000)
+    parser.add_argument("--rounds", type=int, default=50)
+    args = parser.parse_args()
+
+    assistant = load_assistant()
+    rng = random.Random(7)
+    workdir = tempfile.mkdtemp(prefix="notes-bench-")
+    text_path = os.path.join(workdir, "assistant_notes.txt")
+    with open(text_path, "w") as f:
+        for i in range(args.notes):
+            body = " ".join(rng.choice(WORDS) for _ in range(8))
+            f.write(f"[2026-01-01 00:00:00] note {i} {body}\n")
+
+    def read_whole_file():
+        with open(text_path, "r") as f:
+            f.read()
+
+    store = assistant.NoteStore(os.path.join(workdir, "notes.db"))
+    t0 = time.perf_counter()
+    store.import_text_file(text_path)
+    import_time = time.perf_counter() - t0
+
+    results = {
+        "old full-file read": timed(read_whole_file, args.rounds),
+        "read last 5 notes": timed(lambda: store.recent(5), args.rounds),
+        "search one word": timed(lambda: store.search(rng.choice(WORDS)), args.rounds),
+        "search two words": timed(lambda: store.search(" ".join(rng.sample(WORDS, 2))), args.rounds),
+    }
+    rows = [("notes", f"{args.notes:,} (fts5: {store.fts})"), ("one-time import", f"{import_time:.2f} s")]
+    for name, latencies in results.items():
+        rows.append((name, f"p50 {percentile(latencies, 50):.2f} ms, p99 {percentile(latencies, 99):.2f} ms"))
+    report("notes", rows)
+
+
+if __name__ == "__main__":
+    main()
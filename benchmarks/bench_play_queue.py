@@ -0,0 +1,112 @@
+"""Track switches on the pygame mixer: old load-and-play per track vs. the gapless play queue with decode-ahead.
+
+Plays silent WAV tracks in real time (through SDL's dummy audio driver
+unless SDL_AUDIODRIVER is set), so a run takes about tracks x seconds x 2.
+
+Usage: python benchmarks/bench_play_queue.py [--tracks N] [--seconds S] [--buffer-mb MB] [--skips N]
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+import wave
+
+from common import load_assistant, percentile, report
+
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+
+def write_tracks(directory, count, seconds):
+    paths = []
+    for i in range(count):
+        path = os.path.join(directory, f"{i:02d} Track.wav")
+        with wave.open(path, "wb") as f:
+            f.setnchannels(2)
+            f.setsampwidth(2)
+            f.setframerate(44100)
+            f.writeframes(bytes(int(44100 * seconds) * 4))
+        paths.append(path)
+    return paths
+
+
+def old_playback(pygame, paths, seconds, poll=0.02):
+    """What play_music did, chained: load and play each file once the previous one stopped.
+
+    A gap is the time between two starts beyond the length of the track.
+    """
+    starts = []
+    for path in paths:
+        pygame.mixer.music.load(path)
+        pygame.mixer.music.play()
+        starts.append(time.perf_counter())
+        while pygame.mixer.music.get_busy():
+            time.sleep(poll)
+    return [(b - a - seconds) * 1000 for a, b in zip(starts, starts[1:])]
+
+
+def queue_playback(assistant, paths, buffer_mb, seconds):
+    queue = assistant.PlayQueue(buffer_mb)
+    queue.start()
+    queue.play(paths)
+    time.sleep(len(paths) * seconds + 0.5)
+    stats = queue.stats()
+    queue.stop()
+    queue.join(1)
+    return stats
+
+
+def skip_latencies(assistant, paths, buffer_mb, skips):
+    """Time "next song" from the command until the track is playing."""
+    queue = assistant.PlayQueue(buffer_mb)
+    queue.start()
+    queue.play(paths * (skips // len(paths) + 2))
+    time.sleep(0.2)
+    for _ in range(skips):
+        queue.next()
+        time.sleep(0.1)
+    latencies = [latency * 1000 for latency in list(queue.switch_latencies)[-skips:]]
+    stats = queue.stats()
+    queue.stop()
+    queue.join(1)
+    return latencies, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tracks", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=1.0, help="length of each track")
+    parser.add_argument("--buffer-mb", type=float, default=64, help="decode-ahead budget of the play queue")
+    parser.add_argument("--skips", type=int, default=20)
+    args = parser.parse_args()
+
+    assistant = load_assistant()
+    pygame = assistant.pygame
+    pygame.mixer.init(frequency=44100, size=-16, channels=2, buffer=4096)
+    directory = tempfile.mkdtemp(prefix="queue-bench-")
+    try:
+        paths = write_tracks(directory, args.tracks, args.seconds)
+        track_mb = os.path.getsize(paths[0]) / 1048576
+        gaps = old_playback(pygame, paths, args.seconds)
+        stats = queue_playback(assistant, paths, args.buffer_mb, args.seconds)
+        tight = queue_playback(assistant, paths, track_mb * 0.9, args.seconds)
+        skips, skip_stats = skip_latencies(assistant, paths, args.buffer_mb, args.skips)
+
+        report(f"{args.tracks} tracks of {args.seconds:g} s ({track_mb:.1f} MB decoded each)", [
+            ("old: load + play", f"gap p50 {percentile(gaps, 50):.1f} ms, max {max(gaps):.1f} ms"),
+            ("play queue", f"{stats['gapless']}/{stats['switches'] - 1} switches gapless, "
+                           f"{stats['underruns']} underruns, decode avg {stats['avg_decode_ms']:.1f} ms, "
+                           f"peak buffer {stats['peak_buffer_mb']:.1f} of {args.buffer_mb:g} MB"),
+            ("buffer below one track", f"{tight['gapless']}/{tight['switches'] - 1} gapless (streamed), "
+                                       f"switch max {tight['max_switch_ms']:.1f} ms, "
+                                       f"peak buffer {tight['peak_buffer_mb']:.1f} MB"),
+            ("next song", f"p50 {percentile(skips, 50):.2f} ms, p99 {percentile(skips, 99):.2f} ms, "
+                          f"{skip_stats['underruns']} underruns"),
+        ])
+        pygame.mixer.quit()
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Plugin call latency inline vs. in the worker pool, and the cost of a timeout, a crash and a recycle.
+
+Usage: python benchmarks/bench_plugin_pool.py [--calls N] [--workers N]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from common import ROOT, load_assistant, percentile, report
+
+PLUGINS = {
+    "echo": "def register_plugin(assistant):\n"
+            "    return {'execute': lambda arg: assistant.append_to_log(arg, 'Plugin')}\n",
+    "hang": "import time\n"
+            "def register_plugin(assistant):\n"
+            "    return {'execute': lambda arg: time.sleep(3600)}\n",
+    "crash": "import os\n"
+             "def register_plugin(assistant):\n"
+             "    return {'execute': lambda arg: os._exit(1)}\n",
+}
+
+
+class InlineHost:
+    def append_to_log(self, text, speaker="System"):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=500)
+    parser.add_argument("--workers", type=int, default=2)
+    args = parser.parse_args()
+
+    assistant = load_assistant()
+    directory = tempfile.mkdtemp(prefix="plugin-pool-bench-")
+    paths = {}
+    for name, source in PLUGINS.items():
+        paths[name] = os.path.join(directory, name + ".py")
+        with open(paths[name], "w") as f:
+            f.write(source)
+
+    registry = assistant.PluginRegistry(directory, os.path.join(directory, "cache.json"))
+    registry.scan()
+    echo = registry.load("echo", InlineHost())
+    inline = []
+    for i in range(args.calls):
+        t0 = time.perf_counter()
+        echo["execute"](str(i))
+        inline.append((time.perf_counter() - t0) * 1e6)
+
+    pool = assistant.PluginProcessPool(os.path.join(ROOT, "Voice Assistant.py"), size=args.workers, max_calls=args.calls // 2)
+    t0 = time.perf_counter()
+    pool.warm()
+    spawn_ms = (time.perf_counter() - t0) * 1000
+    messages = []
+    isolated = []
+    for i in range(args.calls):
+        outcome = pool.call("echo", paths["echo"], str(i), 5.0, lambda *message: messages.append(message))
+        isolated.append(outcome["wall"] * 1e6)
+
+    pool.warm()
+    t0 = time.perf_counter()
+    timed_out = pool.call("hang", paths["hang"], "", 0.5, lambda *message: None)
+    timeout_ms = (time.perf_counter() - t0) * 1000
+    pool.warm()
+    t0 = time.perf_counter()
+    crashed = pool.call("crash", paths["crash"], "", 5.0, lambda *message: None)
+    crash_ms = (time.perf_counter() - t0) * 1000
+    t0 = time.perf_counter()
+    pool.call("echo", paths["echo"], "after", 5.0, lambda *message: None)
+    recover_ms = (time.perf_counter() - t0) * 1000
+    stats = pool.stats()
+    pool.close()
+
+    report(f"{args.calls} plugin calls, {args.workers} workers", [
+        ("inline (GUI thread)", f"p50 {percentile(inline, 50):.1f} us, p99 {percentile(inline, 99):.1f} us"),
+        ("worker process", f"p50 {percentile(isolated, 50):.0f} us, p99 {percentile(isolated, 99):.0f} us, "
+                           f"{len(messages)} messages relayed"),
+        ("worker start", f"{spawn_ms:.0f} ms"),
+        ("0.5 s deadline", f"returned after {timeout_ms:.0f} ms: {timed_out['error']}"),
+        ("crash", f"returned after {crash_ms:.0f} ms: {crashed['error']}"),
+        ("next call", f"{recover_ms:.0f} ms (includes starting a replacement)"),
+        ("pool", f"spawned {stats['spawned']}, recycled {stats['recycled']}, killed {stats['killed']}"),
+    ])
+
+
+if __name__ == "__main__":
+    main()
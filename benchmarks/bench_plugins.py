@@ -0,0 +1,101 @@
+"""Plugin startup and dispatch cost as plugins are added: import-everything + startswith loop vs. manifests + trigger trie.
+
+Usage: python benchmarks/bench_plugins.py [--counts 10,100,1000] [--dispatches N]
+"""
+import argparse
+import importlib.util
+import json
+import os
+import random
+import tempfile
+import time
+
+from common import load_assistant, percentile, report
+
+PLUGIN_SOURCE = '''import json, xml.dom.minidom  # typical plugin-level imports
+STATE = {"calls": 0}
+
+def register_plugin(assistant):
+    def execute(rest):
+        STATE["calls"] += 1
+    return {"execute": execute, "handles_unknown": False}
+'''
+
+
+def make_plugins(directory, count):
+    """count plugins, each with a manifest declaring two triggers."""
+    os.makedirs(directory)
+    for i in range(count):
+        name = f"plugin{i:04d}"
+        with open(os.path.join(directory, name + ".py"), "w") as f:
+            f.write(PLUGIN_SOURCE)
+        with open(os.path.join(directory, name + ".json"), "w") as f:
+            json.dump({"triggers": [name, f"run task {i}"]}, f)
+
+
+def legacy_startup(directory):
+    """What load_plugins used to do: exec every module at startup."""
+    plugins = {}
+    for filename in os.listdir(directory):
+        if filename.endswith(".py"):
+            spec = importlib.util.spec_from_file_location(filename[:-3], os.path.join(directory, filename))
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+            plugins[filename[:-3]] = module.register_plugin(None)
+    return plugins
+
+
+def legacy_dispatch(plugins, command):
+    for plugin_name, plugin in plugins.items():
+        if command.startswith(plugin_name):
+            return plugin_name
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--counts", default="10,100,1000")
+    parser.add_argument("--dispatches", type=int, default=5000)
+    args = parser.parse_args()
+
+    assistant = load_assistant()
+    root = tempfile.mkdtemp(prefix="plugin-bench-")
+    rng = random.Random(3)
+    for count in [int(c) for c in args.counts.split(",")]:
+        directory = os.path.join(root, str(count))
+        make_plugins(directory, count)
+        # Built-in commands never match a plugin: the old loop pays for every plugin
+        commands = [f"plugin{rng.randrange(count):04d} go" for _ in range(args.dispatches // 2)]
+        commands += ["what time is it"] * (args.dispatches - len(commands))
+
+        t0 = time.perf_counter()
+        plugins = legacy_startup(directory)
+        old_startup = time.perf_counter() - t0
+        old = []
+        for command in commands:
+            t = time.perf_counter()
+            legacy_dispatch(plugins, command)
+            old.append((time.perf_counter() - t) * 1e6)
+
+        registry = assistant.PluginRegistry(directory, os.path.join(root, f"cache-{count}.json"))
+        registry.scan()  # first scan fills the manifest cache
+        registry = assistant.PluginRegistry(directory, os.path.join(root, f"cache-{count}.json"))
+        t0 = time.perf_counter()
+        registry.scan()
+        new_startup = time.perf_counter() - t0
+        new = []
+        for command in commands:
+            t = time.perf_counter()
+            registry.match(command)
+            new.append((time.perf_counter() - t) * 1e6)
+
+        report(f"{count} plugins", [
+            ("import all + startswith", f"startup {old_startup * 1000:.1f} ms, dispatch p50 {percentile(old, 50):.2f} us, "
+                                        f"p99 {percentile(old, 99):.2f} us"),
+            ("manifests + trie", f"startup {new_startup * 1000:.1f} ms, dispatch p50 {percentile(new, 50):.2f} us, "
+                                 f"p99 {percentile(new, 99):.2f} us"),
+        ])
+
+
+if __name__ == "__main__":
+    main()
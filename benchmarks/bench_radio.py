@@ -0,0 +1,182 @@
+"""Internet radio against a local Icecast stand-in: time to first audio, buffer health, underruns and reconnects.
+
+The server sends a live stream at its real rate (after a short burst, as
+Icecast does), with ICY metadata and optional network jitter, and drops
+the connection once mid-run. WAV streams need nothing else; --format mp3
+needs ffmpeg. Audio goes to SDL's dummy driver unless SDL_AUDIODRIVER is set.
+
+Usage: python benchmarks/bench_radio.py [--format wav|mp3] [--seconds S] [--jitter MS] [--starts N]
+"""
+import argparse
+import os
+import random
+import shutil
+import subprocess
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from common import load_assistant, percentile, report
+
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+
+class Station(BaseHTTPRequestHandler):
+    """Serves one endless stream per request, paced in 100 ms slices."""
+    protocol_version = "HTTP/1.0"
+    disable_nagle_algorithm = True
+    content_type = "audio/wav"
+    header = b""
+    body = b""
+    bytes_per_second = 176400
+    burst_seconds = 0.5
+    jitter = 0.0
+    metaint = 16000
+    drop_after = None  # seconds into the next connection to drop it
+    connections = 0
+
+    def do_GET(self):
+        Station.connections += 1
+        drop_after, Station.drop_after = Station.drop_after, None
+        icy = self.headers.get("Icy-MetaData") == "1"
+        self.send_response(200)
+        self.send_header("Content-Type", self.content_type)
+        self.send_header("icy-name", "Bench FM")
+        if icy:
+            self.send_header("icy-metaint", str(self.metaint))
+        self.end_headers()
+        self.until_meta = self.metaint
+        self.song = 0
+        looped = self.body + self.body[:int(self.burst_seconds * self.bytes_per_second) + 1]
+        start = time.perf_counter()
+        position = 0
+        sent = 0.0
+        try:
+            self.send(self.header, icy)
+            while True:
+                seconds = self.burst_seconds if not sent else 0.1
+                size = int(seconds * self.bytes_per_second) // 4 * 4
+                chunk = looped[position:position + size]
+                position = (position + size) % len(self.body)
+                self.send(chunk, icy)
+                sent += seconds
+                if drop_after is not None and sent >= drop_after:
+                    return
+                due = start + sent - self.burst_seconds + random.uniform(-self.jitter, self.jitter)
+                time.sleep(max(0.0, due - time.perf_counter()))
+        except OSError:
+            pass
+
+    def send(self, data, icy):
+        """Write audio, with a metadata block after every metaint bytes when asked for."""
+        while data:
+            if not icy:
+                self.wfile.write(data)
+                return
+            take = min(self.until_meta, len(data))
+            self.wfile.write(data[:take])
+            data = data[take:]
+            self.until_meta -= take
+            if not self.until_meta:
+                self.song += 1
+                text = f"StreamTitle='Song {self.song}';".encode()
+                text += b"\0" * (-len(text) % 16)
+                self.wfile.write(bytes([len(text) // 16]) + text)
+                self.until_meta = self.metaint
+
+    def log_message(self, *args):
+        pass
+
+
+def wav_stream(seconds=10):
+    """A WAV header claiming an endless data chunk, and a body of quiet noise."""
+    rate, channels = 44100, 2
+    header = (b"RIFF" + (0xFFFFFFFF).to_bytes(4, "little") + b"WAVEfmt " + (16).to_bytes(4, "little")
+              + (1).to_bytes(2, "little") + channels.to_bytes(2, "little") + rate.to_bytes(4, "little")
+              + (rate * channels * 2).to_bytes(4, "little") + (channels * 2).to_bytes(2, "little")
+              + (16).to_bytes(2, "little") + b"data" + (0xFFFFFFFF).to_bytes(4, "little"))
+    rng = random.Random(1)
+    body = rng.randbytes(rate * channels * 2 * seconds).translate(bytes(i & 7 for i in range(256)))
+    return header, body, rate * channels * 2
+
+
+def mp3_stream(ffmpeg, seconds=10):
+    body = subprocess.run(
+        [ffmpeg, "-loglevel", "error", "-f", "lavfi", "-i", f"sine=frequency=440:duration={seconds}",
+         "-ac", "2", "-b:a", "128k", "-f", "mp3", "pipe:1"], check=True, capture_output=True
+    ).stdout
+    return b"", body, 16000
+
+
+def listen(radio, url, seconds):
+    """Play url for seconds; returns the streamer's stats at the end."""
+    radio.play(url)
+    time.sleep(seconds)
+    stats = radio.stats()
+    radio.stop()
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--format", choices=("wav", "mp3"), default="wav")
+    parser.add_argument("--seconds", type=float, default=10.0, help="listening time for the buffer health run")
+    parser.add_argument("--jitter", type=float, default=50.0, help="server send jitter in ms")
+    parser.add_argument("--starts", type=int, default=10, help="station starts to time")
+    parser.add_argument("--prebuffer", type=float, default=1.0, help="seconds buffered before playback starts")
+    parser.add_argument("--ffmpeg", default=shutil.which("ffmpeg"))
+    args = parser.parse_args()
+
+    assistant = load_assistant()
+    pygame = assistant.pygame
+    pygame.mixer.init(frequency=44100, size=-16, channels=2, buffer=4096)
+    if args.format == "mp3":
+        if not args.ffmpeg:
+            parser.error("--format mp3 needs ffmpeg (on PATH or --ffmpeg)")
+        Station.header, Station.body, Station.bytes_per_second = mp3_stream(args.ffmpeg)
+        Station.content_type = "audio/mpeg"
+    else:
+        Station.header, Station.body, Station.bytes_per_second = wav_stream()
+    Station.metaint = Station.bytes_per_second  # a new title every second
+    Station.jitter = args.jitter / 1000
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Station)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/stream"
+
+    http = assistant.HttpClient()
+    errors = []
+    titles = []
+    radio = assistant.RadioStreamer(http, args.ffmpeg, prebuffer_seconds=args.prebuffer,
+                                    on_title=titles.append, on_error=errors.append)
+    starts = []
+    for _ in range(args.starts):
+        radio.play(url)
+        deadline = time.time() + 10
+        while radio.stats()["first_audio_ms"] is None and time.time() < deadline:
+            time.sleep(0.005)
+        starts.append(radio.stats()["first_audio_ms"] or float("inf"))
+        radio.stop()
+
+    steady = listen(radio, url, args.seconds)
+    Station.drop_after = args.seconds / 2
+    dropped = listen(radio, url, args.seconds)
+
+    report(f"radio, {args.format} stream at {Station.bytes_per_second / 1000:.0f} KB/s, "
+           f"jitter ±{args.jitter:g} ms, prebuffer {args.prebuffer:g} s", [
+        ("time to first audio", f"p50 {percentile(starts, 50):.0f} ms, max {max(starts):.0f} ms "
+                                f"over {args.starts} starts"),
+        ("steady listening", f"buffer min {steady['min_buffer_seconds']:.2f} s, "
+                             f"avg {steady['avg_buffer_seconds']:.2f} s, {steady['underruns']} underruns, "
+                             f"{steady['received_kb']:.0f} KB"),
+        ("connection dropped", f"{dropped['reconnects']} reconnects, {dropped['underruns']} underruns, "
+                               f"buffer min {dropped['min_buffer_seconds']:.2f} s"),
+        ("stream titles seen", f"{len(titles)}, last {titles[-1]!r}" if titles else "0"),
+        ("errors", f"{len(errors)}" + (f", e.g. {errors[0]}" if errors else "")),
+    ])
+    http.close()
+    server.shutdown()
+    pygame.mixer.quit()
+
+
+if __name__ == "__main__":
+    main()
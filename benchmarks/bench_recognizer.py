@@ -0,0 +1,129 @@
+"""Real-time factor and per-utterance latency of a recognizer backend.
+
+Usage: python benchmarks/bench_recognizer.py [--backend stub|vosk|google]
+                                             [--model PATH] [--fixtures DIR]
+
+Fixtures are WAV files; a sibling .txt file holds the expected transcript.
+Without a fixtures directory a few synthetic clips are generated.
+"""
+import argparse
+import glob
+import math
+import os
+import struct
+import tempfile
+import threading
+import time
+import wave
+
+from common import load_assistant, percentile, report
+
+
+def write_synthetic_fixtures(directory, count=8, rate=16000):
+    """Write short tone clips of increasing length into directory."""
+    for i in range(count):
+        seconds = 1.0 + i * 0.5
+        frames = b"".join(
+            struct.pack("<h", int(8000 * math.sin(2 * math.pi * 220 * n / rate)))
+            for n in range(int(seconds * rate))
+        )
+        with wave.open(os.path.join(directory, f"clip{i}.wav"), "wb") as f:
+            f.setnchannels(1)
+            f.setsampwidth(2)
+            f.setframerate(rate)
+            f.writeframes(frames)
+
+
+def load_fixtures(assistant, directory):
+    """Return [(name, AudioData, duration, expected transcript or None)]."""
+    clips = []
+    for path in sorted(glob.glob(os.path.join(directory, "*.wav"))):
+        with wave.open(path, "rb") as f:
+            frames = f.readframes(f.getnframes())
+            rate, width = f.getframerate(), f.getsampwidth()
+            duration = f.getnframes() / rate
+        expected_path = os.path.splitext(path)[0] + ".txt"
+        expected = None
+        if os.path.exists(expected_path):
+            with open(expected_path) as f:
+                expected = f.read().strip().lower()
+        clips.append((os.path.basename(path), assistant.sr.AudioData(frames, rate, width), duration, expected))
+    return clips
+
+
+def batcher_waits(assistant, backend, clips, window=None, gap=0.1):
+    """Submit clips gap seconds apart through a RecognitionBatcher; returns the queue waits in ms."""
+    done = threading.Semaphore(0)
+    batcher = assistant.RecognitionBatcher(backend, lambda text: done.release(), lambda error: done.release(),
+                                           window=window)
+    batcher.start()
+    for audio in clips:
+        batcher.submit(audio)
+        time.sleep(gap)
+    for _ in clips:
+        done.acquire(timeout=10)
+    batcher.stop()
+    return [wait * 1000 for wait in batcher.waits], batcher.window
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--backend", default="stub", choices=["stub", "vosk", "google"])
+    parser.add_argument("--model", help="model directory for local backends")
+    parser.add_argument("--fixtures", default=os.path.join(os.path.dirname(__file__), "fixtures"))
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    assistant = load_assistant()
+    fixtures = args.fixtures
+    if not glob.glob(os.path.join(fixtures, "*.wav")):
+        fixtures = tempfile.mkdtemp(prefix="recognizer-fixtures-")
+        write_synthetic_fixtures(fixtures)
+    clips = load_fixtures(assistant, fixtures)
+
+    backend = assistant.create_recognizer_backend(args.backend, args.model)
+    t0 = time.perf_counter()
+    backend.ensure_loaded()
+    load_time = time.perf_counter() - t0
+
+    latencies, decode_time, audio_time, correct, scored = [], 0.0, 0.0, 0, 0
+    for _ in range(args.rounds):
+        for name, audio, duration, expected in clips:
+            t0 = time.perf_counter()
+            text = backend.transcribe_batch([audio])[0]
+            elapsed = time.perf_counter() - t0
+            latencies.append(elapsed * 1000)
+            decode_time += elapsed
+            audio_time += duration
+            if expected is not None:
+                scored += 1
+                correct += (text or "").lower() == expected
+
+    t0 = time.perf_counter()
+    for _ in range(args.rounds):
+        backend.transcribe_batch([audio for _, audio, _, _ in clips])
+    batch_time = time.perf_counter() - t0
+
+    audios = [audio for _, audio, _, _ in clips]
+    waits, window = batcher_waits(assistant, backend, audios)
+    old_waits, _ = batcher_waits(assistant, backend, audios, window=0.15)
+
+    rows = [
+        ("clips", f"{len(clips)} from {fixtures}"),
+        ("model load", f"{load_time * 1000:.1f} ms"),
+        ("p50 latency", f"{percentile(latencies, 50):.1f} ms"),
+        ("p99 latency", f"{percentile(latencies, 99):.1f} ms"),
+        ("RTF (one call per clip)", f"{decode_time / audio_time:.3f}"),
+        ("RTF (one batched call)", f"{batch_time / audio_time:.3f}"),
+        (f"batcher wait ({window * 1000:g} ms window)",
+         f"p50 {percentile(waits, 50):.1f} ms, max {max(waits):.1f} ms added per utterance"),
+        ("batcher wait (old 150 ms window)",
+         f"p50 {percentile(old_waits, 50):.1f} ms, max {max(old_waits):.1f} ms added per utterance"),
+    ]
+    if scored:
+        rows.append(("exact transcripts", f"{correct}/{scored}"))
+    report(f"{backend.name} recognizer", rows)
+
+
+if __name__ == "__main__":
+    main()
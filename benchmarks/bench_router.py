@@ -0,0 +1,172 @@
+"""Replay a command corpus through the old if/elif chain and the command router.
+
+Usage: python benchmarks/bench_router.py [--repeat N] [--extra-routes N ...]
+
+Extra routes stand in for plugin triggers and aliases; the legacy chain gets
+one more substring test per route, the router gets one more table entry.
+"""
+import argparse
+import re
+import time
+
+from common import load_assistant, percentile, report
+
+CORPUS = [
+    "what time is it", "what's the date today", "hello", "system info",
+    "take screenshot", "show file manager", "open application notepad",
+    "read clipboard", "set reminder call mom at 18:30 12-05-2026",
+    "add task buy milk", "list tasks", "what's the weather in paris",
+    "send email to a@b.com subject hi body see you", "take note buy eggs",
+    "read notes", "schedule event standup on 12-05-2026 09:00",
+    "set alias tm for what time is it", "battery status", "open new tab",
+    "close tab", "open incognito example.com", "scrape website example.com",
+    "fill form on google.com with cats", "play song bohemian rhapsody",
+    "pause the music", "stop the song", "resume music", "volume up",
+    "search python on google", "open youtube",
+    "create file named report.txt in documents", "list bookmarks",
+    "open bookmark news", "tell me about the eiffel tower", "exit",
+]
+
+
+def legacy_route(command):
+    """The routing decisions of the original process_command chain."""
+    file_cmd_match = re.match(
+        r"(create|delete|open) (file|folder) (?:named|called)? ?'?([^']+)'? ?(?:in|on)? ?(desktop|documents)?",
+        command
+    )
+    if file_cmd_match:
+        return "file"
+    bookmark_cmd_match = re.match(
+        r"(add|open|list) bookmarks?(?: named)? ?'?([^']*)?'?(?: for)? ?(.*)?",
+        command
+    )
+    if bookmark_cmd_match:
+        return "bookmark"
+    if command == "exit" or command == "quit":
+        return "exit"
+    elif "time" in command:
+        return "time"
+    elif "date" in command:
+        return "date"
+    elif "hello" in command or "hi" in command:
+        return "greeting"
+    elif "system resources" in command or "system info" in command:
+        return "system_resources"
+    elif "take screenshot" in command:
+        return "screenshot"
+    elif "show file manager" in command:
+        return "file_manager"
+    elif "open application" in command:
+        return "open_application"
+    elif "clipboard" in command:
+        return "clipboard"
+    elif "set reminder" in command:
+        re.search(r"set reminder (.+) at (\d{2}:\d{2} \d{2}-\d{2}-\d{4})", command)
+        return "reminder"
+    elif "add task" in command:
+        return "add_task"
+    elif "list tasks" in command:
+        return "list_tasks"
+    elif "weather" in command:
+        re.search(r"weather in (\w+)", command)
+        return "weather"
+    elif "send email" in command:
+        re.search(r"send email to (\S+) subject (.+) body (.+)", command)
+        return "email"
+    elif "take note" in command:
+        return "take_note"
+    elif "read notes" in command:
+        return "read_notes"
+    elif "schedule event" in command:
+        re.search(r"schedule event (.+) on (\d{2}-\d{2}-\d{4} \d{2}:\d{2})", command)
+        return "schedule_event"
+    elif "set alias" in command:
+        re.search(r"set alias (\w+) for (.+)", command)
+        return "alias"
+    elif "battery status" in command:
+        return "battery"
+    elif "open new tab" in command:
+        return "new_tab"
+    elif "close tab" in command:
+        return "close_tab"
+    elif "open incognito" in command:
+        return "incognito"
+    elif "scrape website" in command:
+        return "scrape"
+    elif "fill form" in command:
+        re.search(r"fill form on (.+) with (.+)", command)
+        return "fill_form"
+    elif "play" in command:
+        return "play"
+    elif "pause" in command and ("music" in command or "song" in command):
+        return "pause_music"
+    elif "stop" in command and ("music" in command or "song" in command):
+        return "stop_music"
+    elif "resume" in command and ("music" in command or "song" in command):
+        return "resume_music"
+    elif "volume" in command:
+        return "volume"
+    elif "search" in command and "on" in command:
+        return "search"
+    elif "open" in command and ("google" in command or "youtube" in command):
+        return "open_site"
+    return None
+
+
+def legacy_with_extras(extras):
+    """Legacy chain followed by one substring test per extra route."""
+    def route(command):
+        name = legacy_route(command)
+        if name is None:
+            for phrase in extras:
+                if phrase in command:
+                    return phrase
+        return name
+    return route
+
+
+def run(route, corpus):
+    """Time every dispatch and return (commands/sec, latencies in µs)."""
+    latencies = []
+    start = time.perf_counter()
+    for command in corpus:
+        t0 = time.perf_counter()
+        route(command)
+        latencies.append((time.perf_counter() - t0) * 1e6)
+    elapsed = time.perf_counter() - start
+    return len(corpus) / elapsed, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=2000)
+    parser.add_argument("--extra-routes", type=int, nargs="*", default=[0, 100, 1000])
+    args = parser.parse_args()
+
+    assistant = load_assistant()
+    corpus = CORPUS * args.repeat
+
+    for count in args.extra_routes:
+        extras = [f"plugin{i} action" for i in range(count)]
+        router = assistant.CommandRouter(assistant.COMMAND_ROUTES)
+        for phrase in extras:
+            router.add_route(phrase, (phrase,))
+        for name, route in (("legacy if/elif", legacy_with_extras(extras)), ("command router", router.match)):
+            rate, latencies = run(route, corpus)
+            report(f"{name} (+{count} routes)", [
+                ("commands/sec", f"{rate:,.0f}"),
+                ("p50 latency", f"{percentile(latencies, 50):.2f} µs"),
+                ("p99 latency", f"{percentile(latencies, 99):.2f} µs"),
+            ])
+
+    router = assistant.CommandRouter(assistant.COMMAND_ROUTES)
+
+    changed = [c for c in CORPUS if legacy_route(c) != router.match(c)[0]]
+    if changed:
+        print("Routes that differ (whole-word keyword matching):")
+        for command in changed:
+            print(f"  {command!r}: {legacy_route(command)} -> {router.match(command)[0]}")
+
+
+if __name__ == "__main__":
+    main()
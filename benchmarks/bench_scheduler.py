@@ -0,0 +1,64 @@
+"""Insert/fire cost of the heap scheduler vs. the old per-second list scans.
+
+Usage: python benchmarks/bench_scheduler.py [--sizes N ...]
+"""
+import argparse
+import random
+import time
+
+from common import load_assistant, report
+
+
+def legacy_tick(reminders, now):
+    """One 1 Hz tick of the old check: scan and remove every due entry."""
+    for reminder in reminders[:]:
+        if reminder[0] <= now:
+            reminders.remove(reminder)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="*", default=[1000, 10000, 50000])
+    args = parser.parse_args()
+
+    assistant = load_assistant()
+    rng = random.Random(42)
+    for size in args.sizes:
+        base = 1_000_000.0
+        dues = [base + rng.uniform(0, 86400) for _ in range(size)]
+
+        scheduler = assistant.EventScheduler()
+        t0 = time.perf_counter()
+        for due in dues:
+            scheduler.schedule(assistant.ScheduledEvent("reminder", due, "x"))
+        insert_time = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        for _ in range(1000):
+            scheduler.next_due()
+        idle_time = (time.perf_counter() - t0) / 1000
+
+        t0 = time.perf_counter()
+        fired = 0
+        for due in sorted(dues):
+            fired += len(scheduler.pop_due(due))
+        fire_time = time.perf_counter() - t0
+        assert fired == size
+
+        reminders = [(due, "x") for due in dues]
+        ticks = min(size, 200)
+        t0 = time.perf_counter()
+        for due in sorted(dues)[:ticks]:
+            legacy_tick(reminders, due)
+        legacy_time = (time.perf_counter() - t0) / ticks
+
+        report(f"{size:,} events", [
+            ("heap insert", f"{insert_time / size * 1e6:.2f} µs/event"),
+            ("heap fire", f"{fire_time / size * 1e6:.2f} µs/event"),
+            ("heap idle wake-up", f"{idle_time * 1e6:.2f} µs"),
+            ("legacy 1 Hz scan", f"{legacy_time * 1e6:.2f} µs/tick"),
+        ])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""Weather answer latency: cache miss vs. fresh hit vs. stale hit, and offline, against a local API stand-in.
+
+Usage: python benchmarks/bench_weather.py [--delay MS] [--rounds N]
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from common import load_assistant, percentile, report
+
+
+class WeatherAPI(BaseHTTPRequestHandler):
+    """Answers like OpenWeatherMap's /data/2.5/weather."""
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    delay = 0.0
+    calls = 0
+
+    def do_GET(self):
+        WeatherAPI.calls += 1
+        time.sleep(self.delay)
+        city = parse_qs(urlparse(self.path).query).get("q", ["?"])[0]
+        body = ('{"cod": 200, "name": "%s", "weather": [{"description": "light rain"}], '
+                '"main": {"temp": 12.3}}' % city).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class ThreadTasks:
+    """Runs each task on its own thread, in place of the GUI's TaskExecutor."""
+    def submit(self, func, *args, **kwargs):
+        threading.Thread(target=func, args=(None,) + args, daemon=True).start()
+
+
+def make_weather_host(assistant, api_url, cache_path):
+    """A bare object carrying just the state and methods get_weather needs."""
+    gui = assistant.VoiceAssistantGUI
+    spoken = threading.Event()
+
+    class Host:
+        get_weather = gui.get_weather
+        refresh_weather = gui.refresh_weather
+        speak_weather = gui.speak_weather
+
+        def speak(self, text, *args, **kwargs):
+            self.last = text
+            spoken.set()
+
+        def append_to_log(self, text, speaker):
+            self.last = text
+
+    host = Host()
+    host.http = assistant.HttpClient()
+    host.executor = ThreadTasks()
+    host.weather_api_url = api_url
+    host.weather_api_key = "test"
+    host.weather_units = "metric"
+    host.weather_refreshing = set()
+    host.weather_cache = assistant.PersistentCache(cache_path, ttl=600)
+    host.spoken = spoken
+    return host
+
+
+def ask(host, city):
+    """Time from the command to the spoken answer, in ms."""
+    host.spoken.clear()
+    t0 = time.perf_counter()
+    host.get_weather(city)
+    host.spoken.wait(10)
+    return (time.perf_counter() - t0) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--delay", type=float, default=150.0, help="API response time in ms")
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    assistant = load_assistant()
+    WeatherAPI.delay = args.delay / 1000
+    server = ThreadingHTTPServer(("127.0.0.1", 0), WeatherAPI)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    api_url = f"http://127.0.0.1:{server.server_port}/data/2.5/weather"
+    cache_path = os.path.join(tempfile.mkdtemp(prefix="weather-bench-"), "weather.json")
+    host = make_weather_host(assistant, api_url, cache_path)
+
+    cities = [f"city{i}" for i in range(args.rounds)]
+    miss = [ask(host, city) for city in cities]
+    hit = [ask(host, city) for city in cities]
+
+    for entry in host.weather_cache.entries.values():
+        entry["expires"] = 0
+    calls_before = WeatherAPI.calls
+    stale = [ask(host, city) for city in cities]
+    deadline = time.time() + 5
+    while host.weather_refreshing and time.time() < deadline:
+        time.sleep(0.01)
+    refreshed = WeatherAPI.calls - calls_before
+
+    # Restart from disk with the API gone
+    server.shutdown()
+    server.server_close()
+    offline_host = make_weather_host(assistant, api_url, cache_path)
+    offline = [ask(offline_host, city) for city in cities]
+
+    report(f"weather, API delay {args.delay:g} ms", [
+        ("cache miss", f"p50 {percentile(miss, 50):.2f} ms"),
+        ("fresh hit", f"p50 {percentile(hit, 50):.3f} ms"),
+        ("stale hit", f"p50 {percentile(stale, 50):.3f} ms ({refreshed} background refreshes)"),
+        ("offline after restart", f"p50 {percentile(offline, 50):.3f} ms, said: {offline_host.last!r}"),
+        ("cache", str(host.weather_cache.stats())),
+    ])
+
+
+if __name__ == "__main__":
+    main()
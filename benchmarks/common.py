@@ -0,0 +1,31 @@
+"""Shared helpers for the benchmark scripts."""
+import importlib.util
+import os
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def load_assistant():
+    """Import 'Voice Assistant.py' as a module (the file name has a space)."""
+    path = os.path.join(ROOT, "Voice Assistant.py")
+    spec = importlib.util.spec_from_file_location("voice_assistant", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def percentile(samples, pct):
+    """Return the pct-th percentile of a list of numbers."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def report(title, rows):
+    """Print a small aligned table of (label, value) rows."""
+    print(title)
+    width = max(len(label) for label, _ in rows)
+    for label, value in rows:
+        print(f"  {label.ljust(width)}  {value}")
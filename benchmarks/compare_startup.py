@@ -0,0 +1,81 @@
+"""Compare two startup profiles written by --profile-startup and flag regressions.
+
+Usage: python benchmarks/compare_startup.py OLD.json NEW.json [--threshold PCT] [--min-ms MS] [--top N]
+"""
+import argparse
+import json
+import sys
+
+from common import report
+
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def timings(profile, key):
+    """Map of name -> duration_ms for the phases or plugins list."""
+    return {item["name"]: item["duration_ms"] for item in profile.get(key, [])}
+
+
+def import_times(profile):
+    """Map of module -> cumulative ms for top-level imports (depth 0)."""
+    return {
+        item["module"]: item["cumulative_us"] / 1000
+        for item in profile.get("imports", []) if item["depth"] == 0
+    }
+
+
+def compare(old, new, threshold, min_ms):
+    """Return (rows, regressions) for every name present in either profile."""
+    rows, regressions = [], []
+    for name in sorted(set(old) | set(new), key=lambda n: -max(old.get(n, 0), new.get(n, 0))):
+        before, after = old.get(name), new.get(name)
+        if before is None or after is None:
+            rows.append((name, f"{'new' if before is None else 'removed'}: {after if before is None else before:.1f} ms"))
+            if before is None and after >= min_ms:
+                regressions.append(name)
+            continue
+        if before:
+            change = (after - before) / before * 100
+        else:
+            change = float("inf") if after > before else 0.0
+        rows.append((name, f"{before:.1f} -> {after:.1f} ms ({change:+.0f}%)"))
+        if after - before >= min_ms and change > threshold:
+            regressions.append(name)
+    return rows, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("old")
+    parser.add_argument("new")
+    parser.add_argument("--threshold", type=float, default=10.0, help="percent slowdown counted as a regression")
+    parser.add_argument("--min-ms", type=float, default=5.0, help="ignore changes smaller than this")
+    parser.add_argument("--top", type=int, default=15, help="imports to show")
+    args = parser.parse_args()
+
+    old, new = load(args.old), load(args.new)
+    regressions = []
+    total_rows, total_regressions = compare({"total": old["total_ms"]}, {"total": new["total_ms"]},
+                                            args.threshold, args.min_ms)
+    regressions += total_regressions
+    for title, key in (("phases", "phases"), ("plugins", "plugins")):
+        rows, found = compare(timings(old, key), timings(new, key), args.threshold, args.min_ms)
+        regressions += found
+        if rows:
+            report(f"{title}:", rows)
+    rows, found = compare(import_times(old), import_times(new), args.threshold, args.min_ms)
+    regressions += found
+    if rows:
+        report(f"top-level imports (top {args.top}):", rows[:args.top])
+    report("startup:", total_rows)
+
+    if regressions:
+        print(f"\nregressions over {args.threshold:g}%: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""Shared fixtures: the assistant module and local HTTP servers standing in for remote APIs."""
+import importlib.util
+import os
+import threading
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(scope="session")
+def assistant():
+    """'Voice Assistant.py' imported as a module (the file name has a space)."""
+    for name in ("PyQt5", "pyperclip", "plyer"):
+        pytest.importorskip(name)
+    spec = importlib.util.spec_from_file_location("voice_assistant", os.path.join(ROOT, "Voice Assistant.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture
+def serve():
+    """Start a request handler class on 127.0.0.1; returns (server, base URL). Stopped after the test."""
+    servers = []
+
+    def start(handler):
+        server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return server, f"http://127.0.0.1:{server.server_port}"
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+class ThreadExecutor:
+    """Runs each submitted task on its own thread and records (name, lane) per task, like TaskExecutor.submit."""
+    def __init__(self):
+        self.submitted = []
+        self.threads = []
+
+    def submit(self, func, *args, name=None, lane="user", **kwargs):
+        self.submitted.append((name, lane))
+        thread = threading.Thread(target=func, args=(None,) + args, daemon=True)
+        self.threads.append(thread)
+        thread.start()
+
+    def join(self, timeout=5):
+        for thread in self.threads:
+            thread.join(timeout)
+
+
+@pytest.fixture
+def executor():
+    return ThreadExecutor()
@@ -0,0 +1,80 @@
+"""Building the offline knowledge base from a MediaWiki XML dump."""
+import bz2
+import tracemalloc
+
+import pytest
+
+pytest.importorskip("numpy")
+
+NAMESPACE = "http://www.mediawiki.org/xml/export-0.10/"
+
+
+def write_dump(path, pages):
+    """Write (title, namespace, text) pages as a MediaWiki export; .bz2 paths are compressed."""
+    parts = [f'<mediawiki xmlns="{NAMESPACE}" xml:lang="en"><siteinfo><sitename>Test</sitename></siteinfo>']
+    for i, (title, namespace, text) in enumerate(pages):
+        parts.append(f"<page><title>{title}</title><ns>{namespace}</ns><id>{i + 1}</id>"
+                     f"<revision><id>{i + 100}</id><text xml:space=\"preserve\">{text}</text></revision></page>")
+    parts.append("</mediawiki>")
+    data = "".join(parts).encode("utf-8")
+    opener = bz2.open if str(path).endswith(".bz2") else open
+    with opener(path, "wb") as f:
+        f.write(data)
+
+
+PAGES = [
+    ("Alan Turing", "0", "'''Alan Turing''' was a [[mathematician]] who formalised computation. "
+                         "He worked at [[Bletchley Park|Bletchley]].{{Infobox person}}"),
+    ("Turing (disambiguation)", "0", "#REDIRECT [[Alan Turing]]"),
+    ("Talk:Alan Turing", "1", "Discussion about the mathematician and computation."),
+    ("Ada Lovelace", "0", "Ada Lovelace wrote the first published algorithm for a computing engine."),
+    ("Bletchley Park", "0", "Bletchley Park was the home of British codebreaking. [[Category:Codebreaking]]"),
+]
+
+
+def test_dump_pages_are_read_without_redirects_or_other_namespaces(assistant, tmp_path):
+    path = tmp_path / "dump.xml"
+    write_dump(path, PAGES)
+    articles = list(assistant.KnowledgeBase.articles_from(str(path)))
+    assert [title for title, _ in articles] == ["Alan Turing", "Ada Lovelace", "Bletchley Park"]
+    assert articles[0][1] == "Alan Turing was a mathematician who formalised computation. He worked at Bletchley."
+
+
+@pytest.mark.parametrize("name", ["dump.xml", "dump.xml.bz2"])
+def test_build_from_a_multi_page_dump(assistant, tmp_path, name):
+    path = tmp_path / name
+    filler = [(f"Filler {i}", "0", f"Article number {i} about topic{i % 7}.") for i in range(300)]
+    write_dump(path, PAGES + filler)
+    kb = assistant.KnowledgeBase(str(tmp_path / "kb"))
+    kb.RUN_TOKENS = 50  # several sorted runs to merge
+    assert kb.build(assistant.KnowledgeBase.articles_from(str(path))) == 303
+    try:
+        title = kb.search("mathematician computation", limit=1)[0][1]
+        assert title == "Alan Turing"
+        assert kb.search("algorithm", limit=1)[0][1] == "Ada Lovelace"
+        assert {result[1] for result in kb.search("topic3", limit=100)} == {
+            f"Filler {i}" for i in range(300) if i % 7 == 3}
+        assert kb.meta["documents"] == 303
+    finally:
+        kb.close()
+
+    reopened = assistant.KnowledgeBase(str(tmp_path / "kb"))
+    assert reopened.is_built()
+    reopened.open()
+    assert reopened.search("codebreaking", limit=1)[0][1] == "Bletchley Park"
+    reopened.close()
+
+
+def test_dump_memory_does_not_grow_with_page_count(assistant, tmp_path):
+    def peak(pages):
+        path = tmp_path / f"dump{pages}.xml"
+        write_dump(path, [(f"Page {i}", "0", "Some text.") for i in range(pages)])
+        tracemalloc.start()
+        for _ in assistant.KnowledgeBase.iter_wiki_dump(str(path)):
+            pass
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return peak
+
+    small, large = peak(2000), peak(20000)
+    assert large < small * 1.5
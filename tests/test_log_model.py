@@ -0,0 +1,57 @@
+"""Search in the log tab's ring buffer."""
+import pytest
+
+
+@pytest.fixture
+def model(assistant):
+    model = assistant.LogModel(capacity=10)
+    model.append("[10:00:00] Error: Weather error: timeout")
+    model.append("[10:00:01] You: what's the weather")
+    model.append("[10:00:02] Assistant: It's light rain\nwith a temperature of 12 degrees")
+    return model
+
+
+def test_whole_words_case_insensitive(model):
+    assert model.find("weather") == [0, 1]
+    assert model.find("WEATHER error") == [0]
+
+
+def test_partial_terms(model):
+    assert model.find("weath") == [0, 1]
+    assert model.find("err") == [0]
+    assert model.find("eout") == [0]
+    assert model.find("emperat") == [3]
+
+
+def test_terms_across_word_boundaries_and_short_terms(model):
+    assert model.find("r: w") == [0]
+    assert model.find("'s light") == [2]
+    assert model.find("12") == [3]
+    assert model.find("o") == [0, 1, 3]
+
+
+def test_no_match_and_blank_terms(model):
+    assert model.find("snow") == []
+    assert model.find("weathers") == []
+    assert model.find("") == []
+    assert model.find("   ") == []
+
+
+def test_rows_follow_eviction(assistant):
+    class Sink:
+        def __init__(self):
+            self.written = []
+
+        def write(self, text):
+            self.written.append(text)
+
+    sink = Sink()
+    model = assistant.LogModel(capacity=10, spill_sink=sink)
+    for i in range(25):
+        model.append(f"line {i} {'even' if i % 2 == 0 else 'odd'}")
+    assert len(model.entries) <= 10
+    rows = model.find("eve")
+    assert rows and all("even" in model.entries[row] for row in rows)
+    assert [model.entries[row] for row in model.find("line 24")] == ["line 24 even"]
+    assert model.find("line 3 ") == []
+    assert "line 3 odd" in "".join(sink.written)
@@ -0,0 +1,342 @@
+"""Internet radio: the jitter buffer, ICY metadata and the streamer against a local Icecast stand-in."""
+import json
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler
+
+import pytest
+
+RATE, CHANNELS = 44100, 2
+BYTES_PER_SECOND = RATE * CHANNELS * 2
+
+
+def wav_header():
+    """A WAV header claiming an endless data chunk, as live WAV streams send."""
+    return (b"RIFF" + (0xFFFFFFFF).to_bytes(4, "little") + b"WAVEfmt " + (16).to_bytes(4, "little")
+            + (1).to_bytes(2, "little") + CHANNELS.to_bytes(2, "little") + RATE.to_bytes(4, "little")
+            + BYTES_PER_SECOND.to_bytes(4, "little") + (CHANNELS * 2).to_bytes(2, "little")
+            + (16).to_bytes(2, "little") + b"data" + (0xFFFFFFFF).to_bytes(4, "little"))
+
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.time() + timeout
+    while not condition() and time.time() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+@pytest.fixture(scope="module")
+def mixer():
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    pygame = pytest.importorskip("pygame")
+    pygame.mixer.init(frequency=RATE, size=-16, channels=CHANNELS, buffer=1024)
+    yield pygame
+    pygame.mixer.quit()
+
+
+@pytest.fixture
+def station(serve):
+    """A WAV station playing one script per connection.
+
+    A script is a list of ("audio", seconds) and ("wait", Event) steps; the
+    connection is closed at its end. Connections past the scripts get none.
+    """
+    class Station(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.0"
+        scripts = []
+        connections = 0
+        released = threading.Event()
+
+        def do_GET(self):
+            Station.connections += 1
+            steps = Station.scripts.pop(0) if Station.scripts else []
+            self.send_response(200)
+            self.send_header("Content-Type", "audio/wav")
+            self.end_headers()
+            try:
+                self.wfile.write(wav_header())
+                for step, value in steps:
+                    if step == "audio":
+                        self.wfile.write(bytes(int(value * BYTES_PER_SECOND) // 4 * 4))
+                        self.wfile.flush()
+                    else:
+                        value.wait(10)
+                Station.released.wait(0.1 if not steps else 0)
+            except OSError:
+                pass
+
+        def log_message(self, *args):
+            pass
+
+    server, url = serve(Station)
+    Station.url = url + "/stream"
+    yield Station
+    # Let handlers still holding a connection finish
+    Station.released.set()
+
+
+@pytest.fixture
+def radio(assistant, mixer, station):
+    """Makes RadioStreamers with a fresh HttpClient; errors go to .errors. All are stopped after the test."""
+    made = []
+
+    def make(**kwargs):
+        errors = []
+        streamer = assistant.RadioStreamer(assistant.HttpClient(), None, on_error=errors.append, **kwargs)
+        streamer.errors = errors
+        made.append(streamer)
+        return streamer
+
+    yield make
+    for streamer in made:
+        streamer.stop()
+        streamer.http.close()
+
+
+def test_jitter_buffer_read_returns_whole_frames(assistant):
+    buffer = assistant.JitterBuffer(capacity=64, frame_size=4)
+    buffer.write(bytes(range(10)))
+    assert buffer.read(100) == bytes(range(8))
+    assert len(buffer) == 2
+    assert buffer.read(100) == b""
+
+
+def test_jitter_buffer_write_blocks_while_full(assistant):
+    buffer = assistant.JitterBuffer(capacity=16, frame_size=4)
+    assert buffer.write(bytes(16))
+    writer = threading.Thread(target=buffer.write, args=(bytes(8),), daemon=True)
+    writer.start()
+    writer.join(0.2)
+    assert writer.is_alive()
+    assert len(buffer) == 16
+
+    buffer.read(8)
+    writer.join(1)
+    assert not writer.is_alive()
+    assert len(buffer) == 16
+
+
+def test_jitter_buffer_close_releases_a_blocked_writer(assistant):
+    buffer = assistant.JitterBuffer(capacity=4, frame_size=4)
+    buffer.write(bytes(4))
+    results = []
+    writer = threading.Thread(target=lambda: results.append(buffer.write(bytes(4))), daemon=True)
+    writer.start()
+    buffer.close()
+    writer.join(1)
+    assert results == [False]
+    assert not buffer.wait_for(1, 0.1)
+
+
+def test_jitter_buffer_wait_for_prebuffer(assistant):
+    buffer = assistant.JitterBuffer(capacity=1024, frame_size=4)
+    buffer.write(bytes(100))
+    assert not buffer.wait_for(200, 0.05)
+    threading.Timer(0.05, buffer.write, args=(bytes(100),)).start()
+    assert buffer.wait_for(200, 1)
+
+
+def icy_stream(audio, metaint, titles):
+    """Interleave audio with a metadata block every metaint bytes; titles[i] (or None for an empty block)."""
+    stream = bytearray()
+    for i, offset in enumerate(range(0, len(audio), metaint)):
+        stream += audio[offset:offset + metaint]
+        if offset + metaint > len(audio):
+            break
+        title = titles[i % len(titles)]
+        text = f"StreamTitle='{title}';".encode() if title else b""
+        text += b"\0" * (-len(text) % 16)
+        stream += bytes([len(text) // 16]) + text
+    return bytes(stream)
+
+
+def test_icy_metadata_is_stripped_from_the_audio(assistant):
+    audio = bytes(random.Random(1).randbytes(1000))
+    stream = icy_stream(audio, 64, ["One", None, "Two - Three"])
+    reader = assistant.IcyMetadataReader(64)
+    rng = random.Random(2)
+    output = bytearray()
+    position = 0
+    while position < len(stream):
+        size = rng.randint(1, 50)
+        output += reader.feed(stream[position:position + size])
+        position += size
+    assert bytes(output) == audio
+    assert reader.title == "Two - Three"
+
+
+def test_icy_title_split_across_chunks(assistant):
+    audio = bytes(32)
+    stream = icy_stream(audio, 16, ["Artist - Song"])
+    reader = assistant.IcyMetadataReader(16)
+    block_end = 16 + 1 + 32
+    output = bytearray()
+    for i in range(block_end - 1):
+        output += reader.feed(stream[i:i + 1])
+    assert reader.title is None
+    output += reader.feed(stream[block_end - 1:block_end])
+    assert reader.title == "Artist - Song"
+    output += reader.feed(stream[block_end:])
+    assert bytes(output) == audio
+
+
+def test_icy_without_metaint_passes_everything_through(assistant):
+    reader = assistant.IcyMetadataReader(0)
+    assert reader.feed(b"StreamTitle='x';") == b"StreamTitle='x';"
+    assert reader.title is None
+
+
+def test_playback_waits_for_the_prebuffer(radio, station):
+    more, done = threading.Event(), threading.Event()
+    station.scripts = [[("audio", 0.5), ("wait", more), ("audio", 1.0), ("wait", done)]]
+    streamer = radio(prebuffer_seconds=1.0)
+    streamer.play(station.url)
+    # The last partial network chunk can stay in the client until more arrives
+    assert wait_until(lambda: streamer.stats()["received_kb"] * 1024 >= 0.5 * BYTES_PER_SECOND - 4096)
+    time.sleep(0.2)
+    stats = streamer.stats()
+    assert stats["first_audio_ms"] is None
+    assert stats["state"] == "connecting"
+
+    released = time.perf_counter()
+    more.set()
+    assert wait_until(lambda: streamer.stats()["first_audio_ms"] is not None)
+    assert streamer.stats()["state"] == "playing"
+    assert streamer.first_audio >= released
+    done.set()
+
+
+def test_underrun_is_counted_once_and_playback_resumes(radio, station):
+    resume, done = threading.Event(), threading.Event()
+    station.scripts = [[("audio", 0.5), ("wait", resume), ("audio", 1.0), ("wait", done)]]
+    streamer = radio(prebuffer_seconds=0.3, chunk_seconds=0.1)
+    streamer.play(station.url)
+    assert wait_until(lambda: streamer.stats()["state"] == "buffering")
+    time.sleep(0.3)
+    assert streamer.stats()["underruns"] == 1
+
+    resume.set()
+    assert wait_until(lambda: streamer.stats()["state"] == "playing")
+    assert streamer.stats()["underruns"] == 1
+    assert streamer.stats()["reconnects"] == 0
+    done.set()
+
+
+def test_buffer_stays_bounded(radio, station):
+    done = threading.Event()
+    station.scripts = [[("audio", 5.0), ("wait", done)]]
+    streamer = radio(prebuffer_seconds=0.2, buffer_seconds=1.0)
+    streamer.play(station.url)
+    assert wait_until(lambda: streamer.stats()["first_audio_ms"] is not None)
+    levels = []
+    for _ in range(50):
+        levels.append(streamer.stats()["buffer_seconds"])
+        time.sleep(0.01)
+    # write() lets one network chunk land past capacity before it blocks
+    assert max(levels) <= 1.0 + 4096 / BYTES_PER_SECOND
+    assert max(levels) > 0.5
+    done.set()
+
+
+def test_reconnects_after_the_server_drops_the_connection(radio, station):
+    done = threading.Event()
+    station.scripts = [[("audio", 1.0)], [("audio", 2.0), ("wait", done)]]
+    streamer = radio(prebuffer_seconds=0.2)
+    streamer.play(station.url)
+    assert wait_until(lambda: streamer.stats()["reconnects"] == 1 and station.connections == 2)
+    assert wait_until(lambda: streamer.stats()["received_kb"] * 1024 >= 2.9 * BYTES_PER_SECOND)
+    stats = streamer.stats()
+    assert stats["state"] == "playing"
+    assert stats["first_audio_ms"] is not None
+    assert len(streamer.errors) == 1 and "reconnecting" in streamer.errors[0]
+    done.set()
+
+
+def test_stream_it_cannot_decode_fails_without_retrying(assistant, mixer, serve):
+    class Mp3Station(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.0"
+        connections = 0
+
+        def do_GET(self):
+            Mp3Station.connections += 1
+            self.send_response(200)
+            self.send_header("Content-Type", "audio/mpeg")
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    _, url = serve(Mp3Station)
+    errors = []
+    streamer = assistant.RadioStreamer(assistant.HttpClient(), None, on_error=errors.append)
+    streamer.play(url)
+    assert wait_until(lambda: streamer.stats()["state"] == "failed")
+    time.sleep(0.7)
+    streamer.stop()
+    streamer.http.close()
+    assert Mp3Station.connections == 1
+    assert errors == ["Radio: Playing audio/mpeg streams needs ffmpeg"]
+
+
+@pytest.fixture
+def directory(serve):
+    """A radio-browser.info stand-in answering /json/stations/byname/<name> with status (and one station)."""
+    class Directory(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        status = 200
+        calls = 0
+
+        def do_GET(self):
+            Directory.calls += 1
+            body = json.dumps([{"name": " Jazz FM ", "url": "http://jazz.example/m3u",
+                                "url_resolved": "http://jazz.example/stream"}]).encode()
+            if self.status != 200:
+                body = b"Service Unavailable"
+            self.send_response(self.status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    _, Directory.url = serve(Directory)
+    return Directory
+
+
+@pytest.fixture
+def finder(assistant, directory, tmp_path):
+    """Just the state and method of the GUI that find_radio_station uses."""
+    class Host:
+        find_radio_station = assistant.VoiceAssistantGUI.find_radio_station
+
+    host = Host()
+    host.http = assistant.HttpClient()
+    host.radio_stations = {"Local": "http://local.example/stream"}
+    host.radio_cache = assistant.PersistentCache(str(tmp_path / "radio.json"), ttl=3600)
+    host.radio_directory_url = directory.url
+    yield host
+    host.http.close()
+
+
+def test_station_lookup_uses_config_then_directory_then_cache(finder, directory):
+    assert finder.find_radio_station("local") == ("Local", "http://local.example/stream")
+    assert finder.find_radio_station("http://x.example/s") == ("http://x.example/s", "http://x.example/s")
+    assert directory.calls == 0
+    assert finder.find_radio_station("jazz  fm") == ("Jazz FM", "http://jazz.example/stream")
+    assert finder.find_radio_station("Jazz FM") == ("Jazz FM", "http://jazz.example/stream")
+    assert directory.calls == 1
+
+
+def test_directory_error_falls_back_to_a_stale_entry(assistant, finder, directory):
+    finder.find_radio_station("jazz fm")
+    for entry in finder.radio_cache.entries.values():
+        entry["expires"] = 0
+    directory.status = 503
+    assert finder.find_radio_station("jazz fm") == ("Jazz FM", "http://jazz.example/stream")
+    assert directory.calls == 2
+    with pytest.raises(assistant.requests.RequestException):
+        finder.find_radio_station("rock fm")
@@ -0,0 +1,68 @@
+"""Batching of queued utterances before recognition."""
+import threading
+import time
+
+
+class Clip:
+    def __init__(self, frame_data):
+        self.frame_data = frame_data
+
+
+def run_batcher(assistant, backend, expected, submit, **kwargs):
+    results, done = [], threading.Event()
+
+    def on_result(text):
+        results.append(text)
+        if len(results) == expected:
+            done.set()
+
+    batches = []
+    transcribe = backend.transcribe_batch
+    backend.transcribe_batch = lambda clips: batches.append(len(clips)) or transcribe(clips)
+    batcher = assistant.RecognitionBatcher(backend, on_result, lambda error: None, **kwargs)
+    batcher.start()
+    submit(batcher)
+    done.wait(5)
+    batcher.stop()
+    batcher.join(1)
+    return results, batches, batcher
+
+
+def test_lone_utterance_is_decoded_without_waiting(assistant):
+    backend = assistant.StubRecognizerBackend({b"a": "time"})
+
+    def submit(batcher):
+        batcher.submit(Clip(b"a"))
+
+    results, batches, batcher = run_batcher(assistant, backend, 1, submit)
+    assert results == ["time"]
+    assert batcher.window == 0
+    assert max(batcher.waits) < 0.05
+
+
+def test_utterances_queued_during_a_decode_go_in_one_batch(assistant):
+    backend = assistant.StubRecognizerBackend({b"a": "one", b"b": "two", b"c": "three", b"d": "four"}, delay=0.1)
+
+    def submit(batcher):
+        batcher.submit(Clip(b"a"))
+        time.sleep(0.03)
+        for data in (b"b", b"c", b"d"):
+            batcher.submit(Clip(data))
+
+    results, batches, _ = run_batcher(assistant, backend, 4, submit)
+    assert results == ["one", "two", "three", "four"]
+    assert batches == [1, 3]
+
+
+def test_batch_window_only_for_backends_that_ask_for_it(assistant):
+    backend = assistant.StubRecognizerBackend(batch_window=0.1)
+
+    def submit(batcher):
+        batcher.submit(Clip(b"a"))
+        time.sleep(0.03)
+        batcher.submit(Clip(b"b"))
+
+    results, batches, batcher = run_batcher(assistant, backend, 2, submit)
+    assert results == ["hello", "hello"]
+    assert batches == [2]
+    assert batcher.window == 0.1
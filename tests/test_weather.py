@@ -0,0 +1,154 @@
+"""Weather answers from the TTL cache, against a local stand-in for the OpenWeatherMap API."""
+import json
+import re
+import threading
+import time
+from datetime import datetime as dt
+from http.server import BaseHTTPRequestHandler
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+
+@pytest.fixture
+def api(serve):
+    """A /data/2.5/weather endpoint counting calls; set hold to make it wait until released."""
+    class WeatherAPI(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        calls = 0
+        hold = None
+
+        def do_GET(self):
+            WeatherAPI.calls += 1
+            if WeatherAPI.hold:
+                WeatherAPI.hold.wait(5)
+            city = parse_qs(urlparse(self.path).query)["q"][0]
+            body = json.dumps({"cod": 200, "name": city, "weather": [{"description": "light rain"}],
+                               "main": {"temp": 12.3}}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server, url = serve(WeatherAPI)
+    WeatherAPI.server = server
+    WeatherAPI.url = url + "/data/2.5/weather"
+    return WeatherAPI
+
+
+@pytest.fixture
+def host(assistant, api, executor, tmp_path):
+    """Just the state and methods of the GUI that get_weather uses."""
+    gui = assistant.VoiceAssistantGUI
+
+    class Host:
+        get_weather = gui.get_weather
+        refresh_weather = gui.refresh_weather
+        speak_weather = gui.speak_weather
+
+        def __init__(self):
+            self.spoken = []
+            self.log = []
+
+        def speak(self, text, *args, **kwargs):
+            self.spoken.append(text)
+
+        def append_to_log(self, text, speaker):
+            self.log.append((speaker, text))
+
+    host = Host()
+    host.http = assistant.HttpClient()
+    host.executor = executor
+    host.weather_api_url = api.url
+    host.weather_api_key = "test"
+    host.weather_units = "metric"
+    host.weather_refreshing = set()
+    host.weather_cache = assistant.PersistentCache(str(tmp_path / "weather.json"), ttl=600)
+    yield host
+    executor.join()
+    host.http.close()
+
+
+def expire(cache):
+    for entry in cache.entries.values():
+        entry["expires"] = 0
+
+
+def test_miss_fetches_and_caches(host, api, executor):
+    host.get_weather("Paris")
+    executor.join()
+    assert api.calls == 1
+    assert executor.submitted == [("weather Paris", "user")]
+    assert host.spoken == ["In Paris, it's light rain with a temperature of 12.3 degrees Celsius."]
+    report, fresh, _ = host.weather_cache.get("paris|metric")
+    assert fresh and report == {"description": "light rain", "temp": 12.3}
+
+
+def test_fresh_hit_makes_no_api_call(host, api, executor):
+    host.weather_cache.put("paris|metric", {"description": "sunny", "temp": 20})
+    host.get_weather("Paris")
+    assert api.calls == 0
+    assert executor.submitted == []
+    assert host.spoken == ["In Paris, it's sunny with a temperature of 20 degrees Celsius."]
+
+
+def test_stale_hit_answers_with_its_time_and_refreshes_once(host, api, executor):
+    host.weather_cache.put("paris|metric", {"description": "sunny", "temp": 20})
+    expire(host.weather_cache)
+    stored = host.weather_cache.entries["paris|metric"]["stored"]
+    host.get_weather("Paris")
+    assert host.spoken == [f"As of {dt.fromtimestamp(stored).strftime('%H:%M')}, in Paris, "
+                           f"it's sunny with a temperature of 20 degrees Celsius."]
+    executor.join()
+    assert executor.submitted == [("weather Paris", "background")]
+    assert api.calls == 1
+    # The refresh stores the new report without speaking again
+    assert len(host.spoken) == 1
+    report, fresh, _ = host.weather_cache.get("paris|metric")
+    assert fresh and report["description"] == "light rain"
+
+
+def test_cached_report_is_served_while_the_api_is_down(assistant, host, api, executor):
+    host.get_weather("Paris")
+    executor.join()
+    api.server.shutdown()
+    api.server.server_close()
+    expire(host.weather_cache)
+    host.weather_cache.save()
+
+    # A restart reads the cache back from disk and has no kept-alive connection to the old server
+    host.weather_cache = assistant.PersistentCache(host.weather_cache.path, ttl=600)
+    host.http.close()
+    host.http = assistant.HttpClient()
+    host.spoken.clear()
+    host.get_weather("Paris")
+    executor.join()
+    assert len(host.spoken) == 1
+    assert re.match(r"As of \d\d:\d\d, in Paris, it's light rain", host.spoken[0])
+    assert [speaker for speaker, _ in host.log] == ["Error"]
+    assert host.weather_cache.get("paris|metric")[0]["description"] == "light rain"
+    assert not host.weather_refreshing
+
+
+def test_refresh_in_flight_is_not_repeated(host, api, executor):
+    host.weather_cache.put("paris|metric", {"description": "sunny", "temp": 20})
+    expire(host.weather_cache)
+    api.hold = threading.Event()
+    host.get_weather("Paris")
+    deadline = time.time() + 5
+    while api.calls == 0 and time.time() < deadline:
+        time.sleep(0.01)
+    assert host.weather_refreshing == {"paris|metric"}
+
+    host.get_weather("Paris")
+    assert len(host.spoken) == 2
+    assert executor.submitted == [("weather Paris", "background")]
+
+    api.hold.set()
+    executor.join()
+    assert api.calls == 1
+    assert not host.weather_refreshing